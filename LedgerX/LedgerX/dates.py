@@ -0,0 +1,60 @@
+"""
+Shop-local calendar days as aware datetime windows.
+
+`transaction_date__date=day` makes the database cast every row to the
+local timezone before comparing, so no index on transaction_date can be
+used. Filtering on a half-open [start, end) window of aware datetimes
+compares the raw column instead, which is a plain index range scan.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+def local_today():
+    """Today's date in the shop timezone (settings.TIME_ZONE)."""
+    return timezone.localdate()
+
+
+def parse_day(value):
+    """A date from a date or 'YYYY-MM-DD' string; None if missing or invalid."""
+    if isinstance(value, date):
+        return value
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def start_of_day(day):
+    """Aware local midnight at the start of `day`."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_window(start_day, end_day=None):
+    """
+    [start, end) aware datetimes covering start_day..end_day (inclusive,
+    local days). end_day defaults to start_day; pass start_day=None for
+    a window with no lower bound.
+    """
+    if end_day is None and start_day is not None:
+        end_day = start_day
+    start = start_of_day(start_day) if start_day else None
+    end = start_of_day(end_day + timedelta(days=1)) if end_day else None
+    return start, end
+
+
+def window_filter(field, start_day, end_day=None):
+    """
+    Filter kwargs for `field` within the local days, e.g.
+        Transaction.objects.filter(**window_filter('transaction_date', today))
+    """
+    start, end = day_window(start_day, end_day)
+    lookups = {}
+    if start:
+        lookups[f'{field}__gte'] = start
+    if end:
+        lookups[f'{field}__lt'] = end
+    return lookups
@@ -0,0 +1,204 @@
+"""
+Shared client for outbound HTTP calls (email provider, etc.).
+
+One HTTPClient per upstream service, shared by the whole process through
+get_client(name), so calls reuse keep-alive connections from a bounded
+pool instead of opening a fresh TLS connection each time. Every call has
+(connect, read) timeouts, and a circuit breaker fails fast while the
+upstream is down:
+
+    closed     -> calls go through; `failure_threshold` consecutive
+                  failures (connection errors, timeouts, 5xx, 429) open it
+    open       -> calls raise CircuitOpenError without touching the network
+    half-open  -> after `reset_timeout` seconds one trial call is let
+                  through; success closes the circuit, failure re-opens it
+
+client.metrics() reports call counts, errors and latency percentiles.
+"""
+
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class HTTPClientError(Exception):
+    """The call failed before a response came back (or was never made)."""
+
+
+class CircuitOpenError(HTTPClientError):
+    """The upstream is marked down; the call was not attempted."""
+
+
+class CircuitBreaker:
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if self.clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        """True if a call may go out now."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+            self._trial_running = False
+
+
+class HTTPClient:
+
+    LATENCY_SAMPLES = 1000
+
+    def __init__(self, name, timeout=(5, 15), pool_size=10, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        # No transport-level retries: callers own their retry policy
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.LATENCY_SAMPLES)   # seconds
+        self._counts = {'requests': 0, 'errors': 0, 'rejected': 0}
+
+    def request(self, method, url, **kwargs):
+        """
+        Like Session.request, with the client's timeout by default.
+        Returns the response (of any status); raises CircuitOpenError when
+        the circuit is open and HTTPClientError on connection errors/timeouts.
+        """
+        if not self.breaker.allow():
+            self._count('rejected')
+            raise CircuitOpenError(f'{self.name}: circuit open, upstream marked down')
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 500 or response.status_code == 429
+        except requests.RequestException as e:
+            raise HTTPClientError(f'{self.name}: {e}') from e
+        finally:
+            # Always reported, whatever was raised (a response hook, a decode
+            # error), so a half-open trial can never leave the breaker stuck
+            self._observe(started, failed=failed)
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _observe(self, started, failed):
+        with self._lock:
+            self._latencies.append(time.perf_counter() - started)
+            self._counts['requests'] += 1
+            if failed:
+                self._counts['errors'] += 1
+
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = dict(self._counts)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        return {
+            'name': self.name,
+            'circuit': self.breaker.state,
+            **counts,
+            'latency_ms': {
+                'p50': percentile(0.50),
+                'p95': percentile(0.95),
+                'max': percentile(1.0),
+            },
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    """
+    The process-wide client for `name`, created on first use. Defaults
+    come from settings.HTTP_CLIENT_DEFAULTS; `options` override them.
+    """
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = HTTPClient(name, **{**settings.HTTP_CLIENT_DEFAULTS, **options})
+            _clients[name] = client
+        return client
+
+
+def reset_clients():
+    """Drops every shared client (tests, settings changes)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def all_metrics():
+    with _clients_lock:
+        clients = list(_clients.values())
+    return [client.metrics() for client in clients]
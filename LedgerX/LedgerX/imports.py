@@ -0,0 +1,89 @@
+"""
+Chunked CSV reading shared by the bulk importers.
+
+The upload is decoded as a stream (UTF-8, with or without the BOM our own
+exports write) and handed out CHUNK_SIZE rows at a time, so each importer
+validates and writes one chunk with a fixed number of queries and never
+holds the whole file in memory.
+"""
+
+import csv
+import io
+
+
+CHUNK_SIZE = 1000
+MAX_ERRORS = 500    # keep the error report readable for a badly broken file
+
+
+class ImportFileError(Exception):
+    """The file itself can't be read (not CSV / UTF-8, required columns missing)."""
+
+
+def _normalise(header):
+    return ' '.join((header or '').replace('(₹)', '').strip().lower().split())
+
+
+def read_csv_chunks(uploaded_file, columns, chunk_size=CHUNK_SIZE):
+    """
+    Yields lists of (line_number, {field: value}) from an uploaded CSV.
+
+    `columns` maps field -> (required, accepted header spellings), e.g.
+        {'mobile': (True, ('mobile', 'mobile number', 'phone'))}
+    Headers are matched case-insensitively, so our exports re-import as is.
+    """
+    stream = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+
+    try:
+        reader = csv.reader(stream)
+        header = [_normalise(h) for h in next(reader, [])]
+
+        positions = {}
+        for field, (required, spellings) in columns.items():
+            matches = [i for i, h in enumerate(header) if h in spellings]
+            if matches:
+                positions[field] = matches[0]
+            elif required:
+                raise ImportFileError(f'Missing column "{spellings[0]}"')
+
+        chunk = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            values = {
+                field: row[index].strip() if index < len(row) else ''
+                for field, index in positions.items()
+            }
+            chunk.append((reader.line_num, values))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    except UnicodeDecodeError:
+        raise ImportFileError('File must be a UTF-8 encoded CSV')
+    except csv.Error as e:
+        raise ImportFileError(f'Invalid CSV: {e}')
+    finally:
+        stream.detach()
+
+
+class ImportReport:
+    """Counts and per-row errors for one import run."""
+
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'row': line, 'message': message})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda e: e['row']),
+        }
@@ -0,0 +1,184 @@
+"""
+Per-request query and latency instrumentation.
+
+RequestMetricsMiddleware wraps every request and records, tagged with the
+URL name:
+
+    queries   number of SQL statements (all database aliases)
+    db        total time spent in the database
+    render    time spent rendering templates (includes lazy-load queries
+              fired from templates)
+    total     wall time through the middleware
+    slowest   the slowest statement and its duration
+
+They go out as one JSON log line on the 'ledgerx.requests' logger and,
+when settings.SERVER_TIMING_HEADER is on (DEBUG by default), a
+`Server-Timing` header visible in the browser's network panel.
+
+Streaming responses (the CSV / XLSX exports) run most of their queries
+while the body is sent, after the middleware has returned, so only the
+work done before the first byte is measured. They are logged with
+"streaming": true, get no Server-Timing header and skip the budget check.
+
+Views declare how many queries they may run, either with @query_budget(n)
+or by URL name in settings.QUERY_BUDGETS (which wins). What happens when a
+request goes over is settings.QUERY_BUDGET_MODE:
+
+    'raise'  QueryBudgetExceeded (the default under `manage.py test`,
+             so an N+1 fails the test that exercises the view)
+    'log'    a warning on 'ledgerx.requests' (the production default)
+    'off'    nothing
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+
+
+logger = logging.getLogger('ledgerx.requests')
+
+SLOW_SQL_CHARS = 300    # how much of the slowest statement to log
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries):
+    """Declares the most SQL statements one request to this view may run."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_sql = ''
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook: times every statement."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if elapsed > self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_sql = sql
+
+    def server_timing(self, total):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'render;dur={self.render_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+_patch_lock = threading.Lock()
+
+
+def instrument_templates():
+    """
+    Times top-level template renders (render(), TemplateResponse) into the
+    current request's metrics. Nested {% include %}s are inside that time.
+    """
+    with _patch_lock:
+        if getattr(Template.render, 'instrumented', False):
+            return
+        original = Template.render
+
+        @wraps(original)
+        def render(self, *args, **kwargs):
+            metrics = _current.get()
+            if metrics is None:
+                return original(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                metrics.render_time += time.perf_counter() - started
+
+        render.instrumented = True
+        Template.render = render
+
+
+def budget_for(request):
+    match = request.resolver_match
+    if match is None:
+        return None
+    budgets = settings.QUERY_BUDGETS
+    if match.view_name in budgets:
+        return budgets[match.view_name]
+    return getattr(match.func, 'query_budget', None)
+
+
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        if settings.SERVER_TIMING_HEADER and not response.streaming:
+            response['Server-Timing'] = metrics.server_timing(total)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = budget_for(request)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': view_name,
+                'method': request.method,
+                'status': response.status_code,
+                'streaming': response.streaming,
+                'queries': metrics.queries,
+                'query_budget': budget,
+                'db_ms': round(metrics.db_time * 1000, 2),
+                'render_ms': round(metrics.render_time * 1000, 2),
+                'total_ms': round(total * 1000, 2),
+                'slowest_sql_ms': round(metrics.slowest_time * 1000, 2),
+                'slowest_sql': metrics.slowest_sql[:SLOW_SQL_CHARS],
+            }))
+
+        if budget is not None and not response.streaming and metrics.queries > budget:
+            message = (
+                f"{view_name} ran {metrics.queries} queries (budget {budget}); "
+                f"slowest: {metrics.slowest_sql[:SLOW_SQL_CHARS]}"
+            )
+            if settings.QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(message)
+            if settings.QUERY_BUDGET_MODE == 'log':
+                logger.warning(message)
+
+        return response
@@ -0,0 +1,97 @@
+"""
+Keyset (cursor) pagination shared by the list views.
+
+Instead of OFFSET, each page continues from the sort key of the last row
+it returned, so page N costs the same as page 1 no matter how much
+history a shop has. The cursor is an opaque url-safe string.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def page_size_from(request, default=DEFAULT_PAGE_SIZE):
+    """Reads ?limit= safely, clamped to MAX_PAGE_SIZE."""
+    try:
+        size = int(request.GET.get('limit', default))
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns the list of key values, or None for a missing / tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_after(ordering, values):
+    """
+    Q for rows strictly after `values` in `ordering`, e.g. for
+    ['-created_at', '-id']:  created_at < c  OR  (created_at = c AND id < i)
+    """
+    condition = Q()
+    equal_so_far = Q()
+
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+        equal_so_far &= Q(**{name: value})
+
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    One page of `queryset` sorted by `ordering` (must end in a unique field).
+
+    Returns (rows, next_cursor). next_cursor is None on the last page.
+    """
+    model = queryset.model
+    queryset = queryset.order_by(*ordering)
+
+    values = decode_cursor(cursor)
+    if values and len(values) == len(ordering):
+        try:
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            # Well-formed JSON with the wrong types (e.g. [5, 1] for a date):
+            # treat it like any other tampered cursor and start over
+            values = None
+        if values:
+            queryset = queryset.filter(keyset_after(ordering, values))
+
+    # One extra row tells us whether another page exists
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    next_cursor = encode_cursor([
+        getattr(last, model._meta.get_field(field.lstrip('-')).attname)
+        for field in ordering
+    ])
+    return rows, next_cursor
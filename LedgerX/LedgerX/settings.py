@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 
 
 
@@ -34,6 +36,8 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG", "False") == "True"
 
+TESTING = sys.argv[1:2] == ["test"]
+
 
 # ALLOWED_HOSTS = []
 ALLOWED_HOSTS = [
@@ -67,6 +71,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LedgerX.instrumentation.RequestMetricsMiddleware',  # Query count / latency per request
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -77,6 +82,30 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# 📊 Request metrics (LedgerX.instrumentation)
+# Server-Timing exposes query counts and timings to anyone, so only on in DEBUG by default
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", str(DEBUG)) == "True"
+# 'raise' | 'log' | 'off' when a view runs more queries than its budget
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "raise" if TESTING else "log")
+# URL name -> max queries; overrides @query_budget on the view
+QUERY_BUDGETS = {}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # One JSON line per request; WARNING shows only budget overruns
+        "ledgerx.requests": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_LOG_LEVEL", "WARNING" if TESTING else "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'LedgerX.urls'
 
 TEMPLATES = [
@@ -114,6 +143,58 @@ DATABASES = {
 }
 
 
+# Cache
+# Local memory by default; set REDIS_URL (shared across workers) or CACHE_DIR (file based)
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+elif os.getenv("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "ledgerx",
+        }
+    }
+
+# Dashboard metrics (reports.dashboard_cache), invalidated on writes
+DASHBOARD_CACHE_ALIAS = os.getenv("DASHBOARD_CACHE_ALIAS", "default")
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv("DASHBOARD_CACHE_TIMEOUT", 300))
+
+# Loaded receipts / transaction details (sales.receipts), dropped on writes.
+# Rendered public QR receipts and their versions live in the same cache with no
+# timeout, so with several workers this must be a shared cache (REDIS_URL / CACHE_DIR)
+RECEIPT_CACHE_ALIAS = os.getenv("RECEIPT_CACHE_ALIAS", "default")
+RECEIPT_CACHE_TIMEOUT = int(os.getenv("RECEIPT_CACHE_TIMEOUT", 3600))
+
+# Rendered ledger QR PNGs (qr.image_cache): in-process LRU + on-disk tier
+# Set QR_IMAGE_CACHE_DIR to an empty string to keep them in memory only
+QR_IMAGE_CACHE_SIZE = int(os.getenv("QR_IMAGE_CACHE_SIZE", 512))
+QR_IMAGE_CACHE_DIR = os.getenv("QR_IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ledgerx-qr"))
+
+# Public QR token -> customer lookups (qr.token_cache): in-process LRU with a TTL,
+# optionally shared through a cache alias (empty string = in-process only)
+QR_TOKEN_CACHE_SIZE = int(os.getenv("QR_TOKEN_CACHE_SIZE", 10000))
+# Separate, smaller LRU for tokens that don't exist, so guessing can't evict real ones
+QR_TOKEN_CACHE_UNKNOWN_SIZE = int(os.getenv("QR_TOKEN_CACHE_UNKNOWN_SIZE", 1000))
+QR_TOKEN_CACHE_TTL = int(os.getenv("QR_TOKEN_CACHE_TTL", 60))
+QR_TOKEN_CACHE_ALIAS = os.getenv("QR_TOKEN_CACHE_ALIAS", "")
+
+# Days a new / rotated QR token stays valid (0 = never expires); see qr.lifecycle
+QR_TOKEN_LIFETIME_DAYS = int(os.getenv("QR_TOKEN_LIFETIME_DAYS", 0))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -182,6 +263,13 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
     },
+    # 🧾 Monthly customer statements (`generate_statements`)
+    "statements": {
+        "BACKEND": os.getenv("STATEMENT_STORAGE_BACKEND", "django.core.files.storage.FileSystemStorage"),
+        "OPTIONS": {
+            "location": os.getenv("STATEMENT_STORAGE_DIR", str(BASE_DIR / "media")),
+        },
+    },
 }
 
 
@@ -194,5 +282,21 @@ STORAGES = {
 # EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 
 BREVO_API_KEY = os.getenv("BREVO_API_KEY")
+BREVO_API_URL = os.getenv("BREVO_API_URL", "https://api.brevo.com/v3/smtp/email")
 # ⚠️ IMPORTANT: This email MUST be verified in your Brevo account (Senders & IPs)
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
+
+# 📬 Outbound email queue (accounts.emails): views only queue rows,
+# `python manage.py send_queued_emails` delivers them.
+EMAIL_TRANSPORT = os.getenv("EMAIL_TRANSPORT", "accounts.emails.BrevoTransport")
+EMAIL_TIMEOUT = (5, 15)  # (connect, read) seconds per Brevo call
+# Also send right after the request commits, for setups without a worker
+EMAIL_QUEUE_EAGER = os.getenv("EMAIL_QUEUE_EAGER", "False") == "True"
+
+# 🌐 Outbound HTTP clients (LedgerX.http_client)
+HTTP_CLIENT_DEFAULTS = {
+    "timeout": (5, 15),         # (connect, read) seconds
+    "pool_size": 10,            # keep-alive connections per upstream
+    "failure_threshold": 5,     # consecutive failures that open the circuit
+    "reset_timeout": 30.0,      # seconds before a trial call is let through
+}
@@ -1,4 +1,3 @@
-import requests
 from django.shortcuts import render, redirect
 
 def root_view(request):
@@ -25,49 +24,19 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.template.loader import render_to_string
 
+from accounts.emails import enqueue_email
 
-# --- 🛠️ HELPER: Send Email via BREVO API (Same as Accounts) ---
-def send_email_via_api(to_email, subject, html_content, reply_to_email=None, reply_to_name=None):
-    url = "https://api.brevo.com/v3/smtp/email"
-    
-    # Base Payload
-    payload = {
-        "sender": {
-            "name": "LedgerX",
-            "email": settings.DEFAULT_FROM_EMAIL
-        },
-        "to": [
-            {
-                "email": to_email
-            }
-        ],
-        "subject": subject,
-        "htmlContent": html_content
-    }
-
-    # Add Reply-To if provided (Crucial for Contact Form)
-    if reply_to_email:
-        payload["replyTo"] = {
-            "email": reply_to_email,
-            "name": reply_to_name if reply_to_name else "User"
-        }
-
-    headers = {
-        "accept": "application/json",
-        "api-key": settings.BREVO_API_KEY,
-        "content-type": "application/json"
-    }
 
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        if response.status_code in [200, 201, 202]:
-            return True
-        else:
-            print(f"Brevo Error {response.status_code}: {response.text}")
-            return False
-    except Exception as e:
-        print(f"Brevo Connection Error: {e}")
-        return False
+# --- 🛠️ HELPER: Queue Email (Same as Accounts) ---
+def send_email_via_api(to_email, subject, html_content, reply_to_email=None, reply_to_name=None):
+    enqueue_email(
+        to_email,
+        subject,
+        html_content,
+        reply_to_email=reply_to_email,
+        reply_to_name=reply_to_name
+    )
+    return True
 
 @require_POST
 def contact_ajax(request):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Shop
+from .models import Shop, OutboundEmail
 
 # Register your models here.
 
@@ -16,3 +16,21 @@ class ShopAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Shop, ShopAdmin)
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'to_email',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at',
+    )
+
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
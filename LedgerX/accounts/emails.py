@@ -0,0 +1,275 @@
+"""
+Outbound email queue.
+
+Views call enqueue_email(), which only inserts an OutboundEmail row, so a
+request never waits on the email provider. The `send_queued_emails`
+worker claims due rows in small batches and delivers them through the
+transport named by settings.EMAIL_TRANSPORT:
+
+- BrevoTransport: Brevo's HTTP API through the shared 'brevo' HTTP client
+- FakeTransport:  keeps messages in memory (tests, local development)
+
+Failures are retried with exponential backoff up to MAX_ATTEMPTS;
+permanent provider rejections (4xx other than 429) fail right away.
+"""
+
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from LedgerX.http_client import CircuitOpenError, HTTPClientError, get_client
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = timedelta(seconds=30)    # 30s, 1m, 2m, 4m, 8m ...
+BACKOFF_MAX = timedelta(hours=1)
+CLAIM_TIMEOUT = timedelta(minutes=5)    # a SENDING row is retried after this (renewed per email)
+
+
+class TransportError(Exception):
+    """
+    Delivery failed. `permanent` means retrying can't help; `deferred`
+    means nothing was attempted (provider marked down), so the try
+    doesn't count towards MAX_ATTEMPTS.
+    """
+
+    def __init__(self, message, permanent=False, deferred=False):
+        self.permanent = permanent
+        self.deferred = deferred
+        super().__init__(message)
+
+
+class BrevoTransport:
+    """
+    Brevo HTTP API. Uses the shared 'brevo' client (see LedgerX.http_client),
+    so connections are pooled and sends fail fast while Brevo is down.
+    """
+
+    @property
+    def client(self):
+        return get_client('brevo', timeout=settings.EMAIL_TIMEOUT)
+
+    def payload(self, email):
+        payload = {
+            "sender": {
+                "name": email.sender_name,
+                "email": settings.DEFAULT_FROM_EMAIL
+            },
+            "to": [
+                {
+                    "email": email.to_email
+                }
+            ],
+            "subject": email.subject,
+            "htmlContent": email.html_content
+        }
+
+        # Add Reply-To if provided (Crucial for Contact Form)
+        if email.reply_to_email:
+            payload["replyTo"] = {
+                "email": email.reply_to_email,
+                "name": email.reply_to_name or "User"
+            }
+        return payload
+
+    def send(self, email):
+        try:
+            response = self.client.post(
+                settings.BREVO_API_URL,
+                json=self.payload(email),
+                headers={
+                    "accept": "application/json",
+                    "api-key": settings.BREVO_API_KEY,
+                    "content-type": "application/json"
+                },
+            )
+        except CircuitOpenError as e:
+            raise TransportError(str(e), deferred=True)
+        except HTTPClientError as e:
+            raise TransportError(f"Brevo connection error: {e}")
+
+        if response.status_code in (200, 201, 202):
+            return
+
+        permanent = 400 <= response.status_code < 500 and response.status_code != 429
+        raise TransportError(f"Brevo error {response.status_code}: {response.text[:500]}", permanent=permanent)
+
+
+class FakeTransport:
+    """
+    In-memory transport. Sent messages are appended to FakeTransport.outbox;
+    put addresses in FakeTransport.failing to simulate provider errors.
+    """
+
+    outbox = []
+    failing = {}    # to_email -> permanent?
+
+    def send(self, email):
+        if email.to_email in self.failing:
+            raise TransportError("Simulated failure", permanent=self.failing[email.to_email])
+        self.outbox.append(email)
+
+    @classmethod
+    def reset(cls):
+        cls.outbox.clear()
+        cls.failing.clear()
+
+
+_transport = None
+
+
+def get_transport():
+    """One transport per process, so its connection pool is reused."""
+    global _transport
+    path = settings.EMAIL_TRANSPORT
+    if _transport is None or _transport.__class__.__module__ + '.' + _transport.__class__.__name__ != path:
+        _transport = import_string(path)()
+    return _transport
+
+
+def enqueue_email(to_email, subject, html_content, sender_name="LedgerX", reply_to_email=None, reply_to_name=None):
+    """
+    Queues one email and returns the OutboundEmail row.
+    With settings.EMAIL_QUEUE_EAGER it is also sent once the current
+    transaction commits (for setups without a worker).
+    """
+    email = OutboundEmail.objects.create(
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        sender_name=sender_name,
+        reply_to_email=reply_to_email or '',
+        reply_to_name=reply_to_name or '',
+    )
+
+    if settings.EMAIL_QUEUE_EAGER:
+        db_transaction.on_commit(lambda: send_now(email))
+
+    return email
+
+
+def backoff(attempts):
+    """Delay before retry number `attempts`, with ±20% jitter."""
+    delay = min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(batch_size):
+    """
+    Marks up to `batch_size` due emails as SENDING and returns them.
+    SKIP LOCKED lets several workers share the queue without waiting on
+    each other; the claim lapses after CLAIM_TIMEOUT if a worker dies.
+    """
+    now = timezone.now()
+    with db_transaction.atomic():
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status__in=[OutboundEmail.PENDING, OutboundEmail.SENDING],
+                next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboundEmail.objects.filter(id__in=[e.id for e in emails]).update(
+            status=OutboundEmail.SENDING,
+            next_attempt_at=now + CLAIM_TIMEOUT
+        )
+    for email in emails:
+        email.status, email.next_attempt_at = OutboundEmail.SENDING, now + CLAIM_TIMEOUT
+    return emails
+
+
+def renew_claim(email):
+    """
+    Pushes a claimed email's deadline out again just before it is sent,
+    so a slow provider can't let the batch's tail lapse and be sent twice.
+    False if the claim already lapsed and another worker took the row.
+    """
+    deadline = timezone.now() + CLAIM_TIMEOUT
+    renewed = OutboundEmail.objects.filter(
+        id=email.id,
+        status=OutboundEmail.SENDING,
+        next_attempt_at=email.next_attempt_at
+    ).update(next_attempt_at=deadline)
+    email.next_attempt_at = deadline
+    return bool(renewed)
+
+
+def send_now(email):
+    """Claims one freshly queued email and sends it, unless a worker got it first."""
+    claimed = OutboundEmail.objects.filter(id=email.id, status=OutboundEmail.PENDING).update(
+        status=OutboundEmail.SENDING,
+        next_attempt_at=timezone.now() + CLAIM_TIMEOUT
+    )
+    if claimed:
+        deliver(email)
+
+
+def deliver(email, transport=None):
+    """Sends one claimed email and records the outcome. Returns True on success."""
+    transport = transport or get_transport()
+    attempts = email.attempts + 1
+
+    try:
+        transport.send(email)
+    except Exception as error:
+        if not isinstance(error, TransportError):
+            # A bug (e.g. in payload()) still uses up an attempt; otherwise
+            # the row would sit in SENDING and be re-claimed forever
+            logger.exception("Email #%s to %s crashed the transport", email.id, email.to_email)
+            error = TransportError(f"{type(error).__name__}: {error}")
+        return _record_failure(email, attempts, error)
+
+    OutboundEmail.objects.filter(id=email.id).update(
+        status=OutboundEmail.SENT,
+        attempts=attempts,
+        sent_at=timezone.now(),
+        last_error=''
+    )
+    return True
+
+
+def _record_failure(email, attempts, e):
+    """Backs the email off for a retry, or fails it. Always returns False."""
+    if e.deferred:
+        OutboundEmail.objects.filter(id=email.id).update(
+            status=OutboundEmail.PENDING,
+            next_attempt_at=timezone.now() + BACKOFF_BASE,
+            last_error=str(e)
+        )
+        return False
+
+    if e.permanent or attempts >= MAX_ATTEMPTS:
+        status, next_attempt_at = OutboundEmail.FAILED, timezone.now()
+    else:
+        status, next_attempt_at = OutboundEmail.PENDING, timezone.now() + backoff(attempts)
+
+    logger.warning("Email #%s to %s failed (attempt %s): %s", email.id, email.to_email, attempts, e)
+    OutboundEmail.objects.filter(id=email.id).update(
+        status=status,
+        attempts=attempts,
+        next_attempt_at=next_attempt_at,
+        last_error=str(e)
+    )
+    return False
+
+
+def send_pending(batch_size=20):
+    """Claims and sends one batch. Returns (sent, failed)."""
+    transport = get_transport()
+    sent = failed = 0
+    for email in claim_batch(batch_size):
+        if not renew_claim(email):
+            continue  # our claim lapsed and another worker has it now
+        if deliver(email, transport):
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.emails import send_pending
+from LedgerX.http_client import all_metrics
+
+
+class Command(BaseCommand):
+    help = "Delivers queued OutboundEmail rows; runs until stopped unless --once is given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the due emails and exit')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                if options['verbosity'] > 1:
+                    for metrics in all_metrics():
+                        self.stdout.write(str(metrics))
+                continue
+
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Shop(models.Model):
     """
@@ -56,3 +57,51 @@ class PasswordResetOTP(models.Model):
     def __str__(self):
         return f"OTP for {self.user.email}"
 
+
+
+class OutboundEmail(models.Model):
+    """
+    Transactional email waiting to be sent (or already sent) by the
+    `send_queued_emails` worker. Views only insert rows here.
+    """
+
+    PENDING = 'PENDING'
+    SENDING = 'SENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html_content = models.TextField()
+    sender_name = models.CharField(max_length=100, default='LedgerX')
+    reply_to_email = models.EmailField(blank=True, default='')
+    reply_to_name = models.CharField(max_length=150, blank=True, default='')
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    # When a PENDING row may be tried (backoff), or when a SENDING
+    # row's claim lapses (worker died mid-send)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'next_attempt_at'],
+                name='email_status_next_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
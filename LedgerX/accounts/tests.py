@@ -1,3 +1,313 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from LedgerX.http_client import CircuitBreaker, CircuitOpenError, HTTPClient, HTTPClientError, reset_clients
+from .emails import FakeTransport, MAX_ATTEMPTS, enqueue_email, send_pending
+from .models import OutboundEmail
+
+
+@override_settings(
+    EMAIL_TRANSPORT='accounts.emails.FakeTransport',
+    EMAIL_QUEUE_EAGER=False,
+    DEFAULT_FROM_EMAIL='team@ledgerx.example'
+)
+class EmailQueueTests(TestCase):
+
+    def setUp(self):
+        FakeTransport.reset()
+
+    def test_views_only_queue(self):
+        User.objects.create_user('owner', 'owner@example.com', 'pass')
+
+        response = self.client.post(reverse('forgot_password'), {'email': 'owner@example.com'})
+        self.assertRedirects(response, reverse('verify_otp'))
+        self.assertEqual(FakeTransport.outbox, [])
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.to_email, 'owner@example.com')
+
+    def test_contact_form_queues_both_emails(self):
+        response = self.client.post(reverse('contact_ajax'), {
+            'name': 'Asha',
+            'email': 'asha@example.com',
+            'message': 'Hello',
+        })
+        self.assertEqual(response.json(), {'success': True})
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+        support = OutboundEmail.objects.get(reply_to_email='asha@example.com')
+        self.assertEqual(support.reply_to_name, 'Asha')
+
+    def test_worker_sends_due_emails(self):
+        enqueue_email('a@example.com', 'Hi', '<p>Hi</p>')
+        enqueue_email('b@example.com', 'Hi', '<p>Hi</p>')
+
+        call_command('send_queued_emails', '--once', stdout=StringIO())
+
+        self.assertEqual(sorted(e.to_email for e in FakeTransport.outbox), ['a@example.com', 'b@example.com'])
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+        self.assertEqual(send_pending(), (0, 0))
+
+    def test_transient_failure_backs_off_then_gives_up(self):
+        FakeTransport.failing['down@example.com'] = False
+        email = enqueue_email('down@example.com', 'Hi', '<p>Hi</p>')
+
+        with self.assertLogs('accounts.emails', 'WARNING'):
+            self.assertEqual(send_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+        # Not due yet
+        self.assertEqual(send_pending(), (0, 0))
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            OutboundEmail.objects.filter(id=email.id).update(next_attempt_at=timezone.now())
+            with self.assertLogs('accounts.emails', 'WARNING'):
+                send_pending()
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+
+    def test_permanent_failure_is_not_retried(self):
+        FakeTransport.failing['bad@example.com'] = True
+        email = enqueue_email('bad@example.com', 'Hi', '<p>Hi</p>')
+
+        with self.assertLogs('accounts.emails', 'WARNING'):
+            send_pending()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.attempts, 1)
+
+    def test_lapsed_claim_is_retried(self):
+        email = enqueue_email('a@example.com', 'Hi', '<p>Hi</p>')
+        OutboundEmail.objects.filter(id=email.id).update(status=OutboundEmail.SENDING)
+
+        self.assertEqual(send_pending(), (1, 0))
+
+    def test_transport_crash_uses_up_attempts(self):
+        email = enqueue_email('a@example.com', 'Hi', '<p>Hi</p>')
+
+        with mock.patch.object(FakeTransport, 'send', side_effect=KeyError('sender')):
+            for _ in range(MAX_ATTEMPTS):
+                OutboundEmail.objects.filter(id=email.id).update(next_attempt_at=timezone.now())
+                with self.assertLogs('accounts.emails', 'ERROR'):
+                    self.assertEqual(send_pending(), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+        self.assertIn('KeyError', email.last_error)
+
+    def test_lapsed_claim_taken_by_another_worker_is_skipped(self):
+        first = enqueue_email('a@example.com', 'Hi', '<p>Hi</p>')
+        second = enqueue_email('b@example.com', 'Hi', '<p>Hi</p>')
+        original_send = FakeTransport.send
+
+        def slow_send(transport, email):
+            # While the first one is slow, another worker re-claims the second
+            if email.id == first.id:
+                OutboundEmail.objects.filter(id=second.id).update(next_attempt_at=timezone.now() + timedelta(hours=1))
+            return original_send(transport, email)
+
+        with mock.patch.object(FakeTransport, 'send', slow_send):
+            self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual([e.to_email for e in FakeTransport.outbox], ['a@example.com'])
+
+    @override_settings(EMAIL_QUEUE_EAGER=True)
+    def test_eager_mode_sends_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_email('a@example.com', 'Hi', '<p>Hi</p>')
+
+        self.assertEqual(len(FakeTransport.outbox), 1)
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.SENT)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers with the server's scripted (status, delay) and records each call."""
+
+    protocol_version = 'HTTP/1.1'    # keep-alive
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.calls.append({'port': self.client_address[1], 'path': self.path, 'body': body})
+
+        status, delay = self.server.script
+        time.sleep(delay)
+        payload = b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass    # clients that time out hang up mid-response
+
+
+class StubServerMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer(('127.0.0.1', 0), StubHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/v3/smtp/email'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.calls = []
+        self.server.script = (201, 0)
+
+
+class HTTPClientTests(StubServerMixin, TestCase):
+
+    def make_client(self, **options):
+        client = HTTPClient('stub', **{'timeout': (1, 1), 'failure_threshold': 2, **options})
+        self.addCleanup(client.close)
+        return client
+
+    def test_connections_are_reused(self):
+        client = self.make_client()
+        for _ in range(5):
+            self.assertEqual(client.post(self.url, json={}).status_code, 201)
+
+        self.assertEqual(len(self.server.calls), 5)
+        self.assertEqual(len({c['port'] for c in self.server.calls}), 1)
+
+        metrics = client.metrics()
+        self.assertEqual((metrics['requests'], metrics['errors'], metrics['circuit']), (5, 0, 'closed'))
+        self.assertIsNotNone(metrics['latency_ms']['p95'])
+
+    def test_read_timeout(self):
+        self.server.script = (201, 0.5)
+        client = self.make_client(timeout=(1, 0.1))
+
+        started = time.perf_counter()
+        with self.assertRaises(HTTPClientError):
+            client.post(self.url, json={})
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(client.metrics()['errors'], 1)
+
+    def test_circuit_opens_and_fails_fast(self):
+        self.server.script = (503, 0)
+        client = self.make_client()
+
+        client.post(self.url, json={})
+        client.post(self.url, json={})
+        with self.assertRaises(CircuitOpenError):
+            client.post(self.url, json={})
+
+        self.assertEqual(len(self.server.calls), 2)
+        self.assertEqual(client.metrics()['rejected'], 1)
+
+    def test_half_open_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 31
+        self.assertTrue(breaker.allow())     # the one trial call
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        now[0] = 62
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trial_that_raises_still_counts(self):
+        now = [0.0]
+        client = self.make_client()
+        client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        client.breaker.record_failure()
+
+        def broken_hook(response, *args, **kwargs):
+            raise ValueError('could not decode')
+
+        now[0] = 31
+        with self.assertRaises(ValueError):
+            client.post(self.url, json={}, hooks={'response': broken_hook})
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(client.metrics()['errors'], 1)
+
+        # Not stuck: the next window gets its trial
+        now[0] = 62
+        self.assertEqual(client.post(self.url, json={}).status_code, 201)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+
+@override_settings(
+    EMAIL_TRANSPORT='accounts.emails.BrevoTransport',
+    EMAIL_QUEUE_EAGER=False,
+    DEFAULT_FROM_EMAIL='team@ledgerx.example',
+    BREVO_API_KEY='test-key'
+)
+class BrevoTransportTests(StubServerMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        reset_clients()
+        self.addCleanup(reset_clients)
+        override = override_settings(BREVO_API_URL=self.url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_sends_to_provider(self):
+        enqueue_email('a@example.com', 'Hi', '<p>Hi</p>', reply_to_email='r@example.com', reply_to_name='R')
+
+        self.assertEqual(send_pending(), (1, 0))
+        payload = json.loads(self.server.calls[0]['body'])
+        self.assertEqual(payload['to'], [{'email': 'a@example.com'}])
+        self.assertEqual(payload['replyTo'], {'email': 'r@example.com', 'name': 'R'})
+
+    def test_rejection_is_permanent(self):
+        self.server.script = (400, 0)
+        email = enqueue_email('a@example.com', 'Hi', '<p>Hi</p>')
+
+        with self.assertLogs('accounts.emails', 'WARNING'):
+            send_pending()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.FAILED)
+
+    def test_open_circuit_defers_without_using_attempts(self):
+        self.server.script = (503, 0)
+        emails = [enqueue_email(f'{i}@example.com', 'Hi', '<p>Hi</p>') for i in range(8)]
+
+        with self.assertLogs('accounts.emails', 'WARNING'):
+            self.assertEqual(send_pending(), (0, 8))
+        # Only the calls before the circuit opened reached the provider
+        self.assertEqual(len(self.server.calls), 5)
+
+        attempts = sorted(OutboundEmail.objects.values_list('attempts', flat=True))
+        self.assertEqual(attempts, [0, 0, 0, 1, 1, 1, 1, 1])
+        self.assertEqual(len(emails), OutboundEmail.objects.filter(status=OutboundEmail.PENDING).count())
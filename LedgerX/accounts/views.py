@@ -1,6 +1,5 @@
 import uuid
 import random
-import requests
 import re  # For regex checking
 
 from django.http import HttpResponse
@@ -19,47 +18,16 @@ from django.contrib.auth.password_validation import validate_password
 from django.urls import reverse
 # Models
 from .models import Shop, PasswordResetOTP
+from .emails import enqueue_email
 
 from django.contrib.auth import update_session_auth_hash # <--- NEW IMPORT
 
 
 
-# --- 🛠️ HELPER: Send Email via BREVO API ---
+# --- 🛠️ HELPER: Queue Email (sent by the `send_queued_emails` worker) ---
 def send_brevo_email(to_email, subject, html_content, sender_name="LedgerX"):
-    url = "https://api.brevo.com/v3/smtp/email"
-    
-    payload = {
-        "sender": {
-            "name": sender_name,
-            "email": settings.DEFAULT_FROM_EMAIL
-        },
-        "to": [
-            {
-                "email": to_email,
-                # "name": "User" # Optional
-            }
-        ],
-        "subject": subject,
-        "htmlContent": html_content
-    }
-    
-    headers = {
-        "accept": "application/json",
-        "api-key": settings.BREVO_API_KEY,
-        "content-type": "application/json"
-    }
-
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        # Check if successful (Status 201 Created)
-        if response.status_code in [200, 201, 202]:
-            return True
-        else:
-            print(f"Brevo Error {response.status_code}: {response.text}")
-            return False
-    except Exception as e:
-        print(f"Brevo Connection Error: {e}")
-        return False
+    enqueue_email(to_email, subject, html_content, sender_name=sender_name)
+    return True
 
 # --- HELPER: Rate Limiter ---
 def is_rate_limited(request, key_name='otp_last_sent'):
@@ -7,12 +7,14 @@ class CustomerAdmin(admin.ModelAdmin):
         'name',
         'mobile',
         'shop',
+        'balance',
         'is_active',
         'created_at',
     )
 
     list_filter = ('shop', 'is_active')
     search_fields = ('name', 'mobile')
+    readonly_fields = ('balance',)
 
 
 admin.site.register(Customer, CustomerAdmin)
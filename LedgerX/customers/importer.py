@@ -0,0 +1,93 @@
+"""
+Bulk customer import from CSV (name, mobile).
+
+Per chunk of rows: one IN-query for mobiles already in the shop, one
+bulk INSERT for the customers and one for their QR tokens.
+"""
+
+import re
+
+from django.db import transaction as db_transaction, IntegrityError
+
+from LedgerX.imports import read_csv_chunks, ImportReport
+from qr.lifecycle import new_token
+from qr.models import QRToken
+from reports.dashboard_cache import invalidate_dashboard
+from .models import Customer
+
+
+COLUMNS = {
+    'name': (True, ('name', 'customer name', 'full name')),
+    'mobile': (True, ('mobile', 'mobile number', 'phone', 'phone number')),
+}
+
+MOBILE_RE = re.compile(r'^\d{10}$')   # same rule as Customer.mobile
+NAME_MAX_LENGTH = Customer._meta.get_field('name').max_length
+
+
+def import_customers(shop, uploaded_file):
+    """
+    Imports every valid row; invalid and duplicate rows go in the report.
+    Raises LedgerX.imports.ImportFileError if the file can't be read.
+    """
+    report = ImportReport()
+    seen = set()  # mobiles earlier in this file
+
+    for chunk in read_csv_chunks(uploaded_file, COLUMNS):
+
+        # 1. Row checks in memory
+        valid = []
+        for line, row in chunk:
+            name = row['name']
+            mobile = re.sub(r'[\s-]', '', row['mobile'])
+
+            if not name:
+                report.error(line, 'Name is required')
+            elif len(name) > NAME_MAX_LENGTH:
+                report.error(line, f'Name is longer than {NAME_MAX_LENGTH} characters')
+            elif not MOBILE_RE.match(mobile):
+                report.error(line, 'Mobile number must be exactly 10 digits')
+            elif mobile in seen:
+                report.error(line, f'Mobile {mobile} appears earlier in the file')
+            else:
+                seen.add(mobile)
+                valid.append((line, name, mobile))
+
+        if not valid:
+            continue
+
+        # 2. One query for the whole chunk's duplicates
+        existing = set(
+            Customer.objects.filter(
+                shop=shop,
+                mobile__in=[mobile for _, _, mobile in valid]
+            ).values_list('mobile', flat=True)
+        )
+
+        rows = []
+        for line, name, mobile in valid:
+            if mobile in existing:
+                report.error(line, f'Customer with mobile {mobile} already exists')
+            else:
+                rows.append((line, Customer(shop=shop, name=name, mobile=mobile)))
+
+        if not rows:
+            continue
+
+        # 3. Customers + their QR tokens, all or nothing per chunk
+        try:
+            with db_transaction.atomic():
+                customers = Customer.objects.bulk_create([customer for _, customer in rows])
+                QRToken.objects.bulk_create([new_token(customer) for customer in customers])
+        except IntegrityError:
+            # Someone added one of these mobiles since step 2
+            for line, customer in rows:
+                report.error(line, f'Customer with mobile {customer.mobile} could not be saved (added concurrently?)')
+            continue
+
+        report.created += len(customers)
+
+    if report.created:
+        invalidate_dashboard(shop.id)  # bulk_create skips signals
+
+    return report
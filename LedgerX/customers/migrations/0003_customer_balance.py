@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_alter_customer_mobile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='balance',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=12),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_shop_upi_id'),
+        ('customers', '0003_customer_balance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='shop',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='customers', to='accounts.shop'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['shop', 'is_active', 'name'], name='customer_shop_active_name_idx'),
+        ),
+    ]
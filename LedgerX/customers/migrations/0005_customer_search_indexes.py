@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 18:05
+
+from django.db import migrations
+
+
+# Postgres only: SQLite (tests, local dev) falls back to a plain LIKE scan.
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # name__icontains -> UPPER(name::text) LIKE UPPER('%q%')
+    "CREATE INDEX IF NOT EXISTS customer_name_trgm_idx "
+    "ON customers_customer USING gin (UPPER(name::text) gin_trgm_ops)",
+    # mobile__startswith -> mobile::text LIKE 'q%'
+    "CREATE INDEX IF NOT EXISTS customer_shop_mobile_prefix_idx "
+    "ON customers_customer (shop_id, (mobile::text) text_pattern_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS customer_name_trgm_idx",
+    "DROP INDEX IF EXISTS customer_shop_mobile_prefix_idx",
+]
+
+
+def run_sql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(FORWARD_SQL), run_sql(REVERSE_SQL)),
+    ]
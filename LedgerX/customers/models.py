@@ -13,6 +13,7 @@ class Customer(models.Model):
     shop = models.ForeignKey(
         Shop,
         on_delete=models.CASCADE,
+        db_index=False,  # covered by the composite indexes in Meta
         related_name='customers'
     )
 
@@ -29,6 +30,15 @@ class Customer(models.Model):
         ]
     )
 
+    # Outstanding udhar (CREDIT - PAYMENT), kept in sync by sales.signals
+    # Positive = customer owes the shop, negative = advance paid
+    balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        db_index=True
+    )
+
     # Soft delete
     is_active = models.BooleanField(default=True)
 
@@ -37,6 +47,13 @@ class Customer(models.Model):
     class Meta:
         # Same mobile can exist in different shops
         unique_together = ('shop', 'mobile')
+        indexes = [
+            # Customer list / pickers: active customers of a shop by name
+            models.Index(
+                fields=['shop', 'is_active', 'name'],
+                name='customer_shop_active_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.mobile})"
@@ -1,3 +1,99 @@
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import Shop
+from qr.models import QRToken
+from .models import Customer
+
+
+class CustomerSearchTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.client.force_login(user)
+
+        for i in range(30):
+            Customer.objects.create(shop=self.shop, name=f'Ravi {i:02d}', mobile=f'98{i:08d}')
+        Customer.objects.create(shop=self.shop, name='Meena', mobile='7000000000')
+        Customer.objects.create(shop=self.shop, name='Old Ravi', mobile='7000000001', is_active=False)
+
+    def search(self, **params):
+        return self.client.get(reverse('customer_search'), params).json()
+
+    def test_name_search_pages_with_cursor(self):
+        first = self.search(q='ravi', limit=20)
+        second = self.search(q='ravi', limit=20, cursor=first['next_cursor'])
+
+        names = [c['name'] for c in first['results'] + second['results']]
+        self.assertEqual(names, [f'Ravi {i:02d}' for i in range(30)])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_mobile_prefix_search(self):
+        self.assertEqual([c['name'] for c in self.search(q='70')['results']], ['Meena'])
+
+    def test_inactive_customers_are_separate(self):
+        self.assertEqual([c['name'] for c in self.search(q='old', inactive=1)['results']], ['Old Ravi'])
+        self.assertEqual(self.search(q='old')['results'], [])
+
+    def test_list_renders_first_page_only(self):
+        response = self.client.get(reverse('customer_list'))
+        self.assertEqual(len(response.context['customers']), 25)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+
+class CustomerImportTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.client.force_login(user)
+        Customer.objects.create(shop=self.shop, name='Meena', mobile='7000000000')
+
+    def upload(self, text):
+        return self.client.post(
+            reverse('customer_import'),
+            {'file': SimpleUploadedFile('customers.csv', text.encode('utf-8-sig'))},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        ).json()
+
+    def test_valid_rows_import_with_qr_tokens(self):
+        rows = '\n'.join(f'Customer {i},{9000000000 + i}' for i in range(2500))
+        report = self.upload('Name,Mobile\n' + rows)
+
+        self.assertEqual(report['created'], 2500)
+        self.assertEqual(QRToken.objects.filter(customer__shop=self.shop).count(), 2500)
+
+    def test_bad_rows_are_reported(self):
+        report = self.upload(
+            'Mobile Number,Customer Name\n'
+            '9000000001,Ravi\n'
+            '12345,Short\n'
+            '9000000001,Repeat\n'
+            '7000000000,Existing\n'
+            '9000000002,\n'
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([e['row'] for e in report['errors']], [3, 4, 5, 6])
+        self.assertIn('already exists', report['errors'][2]['message'])
+
+    def test_queries_per_chunk_are_fixed(self):
+        rows = '\n'.join(f'Customer {i},{9000000000 + i}' for i in range(1000))
+        with CaptureQueriesContext(connection) as queries:
+            self.upload('name,mobile\n' + rows)
+
+        # Not one per row (SQLite splits each bulk INSERT into several batches)
+        self.assertLess(len(queries), 40)
+
+    def test_missing_column(self):
+        response = self.client.post(
+            reverse('customer_import'),
+            {'file': SimpleUploadedFile('customers.csv', b'name\nRavi\n')}
+        )
+        self.assertRedirects(response, reverse('customer_import'))
+        self.assertEqual(Customer.objects.count(), 1)
@@ -4,8 +4,12 @@ from . import views
 urlpatterns = [
     path('', views.customer_list, name='customer_list'),
     path('add/', views.customer_add, name='customer_add'),
+    path('import/', views.customer_import, name='customer_import'),
+    path('search/', views.customer_search, name='customer_search'),
     path('<int:customer_id>/', views.customer_detail, name='customer_detail'),
     path('<int:customer_id>/edit/', views.customer_edit, name='customer_edit'),
+    path('<int:customer_id>/export/', views.export_customer_ledger, name='export_customer_ledger'),
+    path('<int:customer_id>/rotate-qr/', views.customer_rotate_qr, name='customer_rotate_qr'),
     path('<int:customer_id>/deactivate/', views.customer_deactivate, name='customer_deactivate'),
 
     # 🟢 NEW PATHS
@@ -1,32 +1,89 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
 from django.db.models import Sum
+from django.urls import reverse
+from django.utils import timezone
 from .models import Customer
 from sales.models import Transaction
-from qr.models import QRToken
+from django.views.decorators.http import require_POST
+from qr.lifecycle import issue_token, rotate
+from sales.exports import LEDGER_HEADER, ledger_rows
+from LedgerX.pagination import keyset_page, page_size_from
+from LedgerX.exports import streaming_export
+from LedgerX.imports import ImportFileError
+from LedgerX.instrumentation import query_budget
+from .importer import import_customers
 
 
 # Create your views here.
+def search_customers(shop, query='', is_active=True):
+    """
+    Customers of a shop matching `query` by name (anywhere) or mobile prefix.
+    Backed by the trigram / pattern indexes on Postgres (customers 0005).
+    """
+    customers = Customer.objects.filter(shop=shop, is_active=is_active)
+
+    query = (query or '').strip()
+    if query:
+        if query.isdigit():
+            customers = customers.filter(mobile__startswith=query)
+        else:
+            customers = customers.filter(name__icontains=query)
+
+    return customers
+
+
+def customer_page(request, is_active=True):
+    """One cursor page of (filtered) customers, ordered by name."""
+    customers = search_customers(request.user.shop, request.GET.get('q'), is_active)
+    return keyset_page(
+        customers,
+        ('name', 'id'),
+        cursor=request.GET.get('cursor'),
+        page_size=page_size_from(request)
+    )
+
+
+@login_required
+def customer_search(request):
+    """
+    JSON search API used by the customer list and the sale screen picker.
+    ?q=<name or mobile prefix>&cursor=<next_cursor>&limit=<n>&inactive=1
+    """
+    is_active = request.GET.get('inactive') != '1'
+    customers, next_cursor = customer_page(request, is_active)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': c.id,
+                'name': c.name,
+                'mobile': c.mobile,
+                'created_at': timezone.localtime(c.created_at).strftime('%d %b %Y'),
+                'url': reverse('customer_detail', args=[c.id]),
+            }
+            for c in customers
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@query_budget(6)
 @login_required
 def customer_list(request):
     """
-    Shows all active customers.
-    Fetched ALL at once to allow instant Client-Side Search/Pagination.
+    Shows active customers, one cursor page at a time.
+    Search and "Load more" go through customer_search.
     """
-    shop = request.user.shop
-
-    # 🟢 Get ALL active customers
-    customers = Customer.objects.filter(
-        shop=shop,
-        is_active=True
-    ).order_by('name')
+    customers, next_cursor = customer_page(request, is_active=True)
 
     return render(
         request,
         'customers/customer_list.html',
-        {'customers': customers}
+        {'customers': customers, 'next_cursor': next_cursor}
     )
 
 
@@ -58,7 +115,7 @@ def customer_add(request):
         )
 
         # Create QR token immediately for transparency
-        QRToken.objects.create(customer=customer)
+        issue_token(customer)
 
         messages.success(request, 'Customer added successfully')
         return redirect('customer_list')
@@ -66,12 +123,50 @@ def customer_add(request):
     return render(request, 'customers/customer_add.html')
 
 
+@login_required
+def customer_import(request):
+    """
+    Bulk-adds customers from a CSV (name, mobile), each with its QR token.
+    Answers XHR uploads with the report as JSON.
+    """
+    report = None
+
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Please choose a CSV file')
+            return redirect('customer_import')
+
+        try:
+            report = import_customers(request.user.shop, upload)
+        except ImportFileError as e:
+            messages.error(request, str(e))
+            return redirect('customer_import')
+
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse(report.as_dict())
+
+        if report.created:
+            messages.success(request, f'{report.created} customers imported')
+
+    return render(request, 'imports/import_page.html', {
+        'title': 'Import Customers',
+        'icon': '👥',
+        'columns': ['Name', 'Mobile'],
+        'back_url': 'customer_list',
+        'back_label': 'Customers',
+        'report': report,
+    })
+
+
+@query_budget(10)
 @login_required
 def customer_detail(request, customer_id):
     shop = request.user.shop
 
+    # Token comes along in the same query; pages never create one
     customer = get_object_or_404(
-        Customer,
+        Customer.objects.select_related('qr_token'),
         id=customer_id,
         shop=shop
     )
@@ -80,23 +175,11 @@ def customer_detail(request, customer_id):
         customer=customer
     ).order_by('-transaction_date')
 
-    # ✅ Calculate outstanding balance
-    credit_total = Transaction.objects.filter(
-        customer=customer,
-        transaction_type='CREDIT'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-    payment_total = Transaction.objects.filter(
-        customer=customer,
-        transaction_type='PAYMENT'
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
+    # ✅ Outstanding balance (stored, kept in sync by sales.signals)
+    outstanding = customer.balance
 
-    outstanding = credit_total - payment_total
-
-    # ✅ GET or CREATE QR token
-    qr_token, created = QRToken.objects.get_or_create(
-        customer=customer
-    )
+    # ✅ Issued with the customer (`create_qr_tokens` backfills old ones)
+    qr_token = getattr(customer, 'qr_token', None)
 
     return render(
         request,
@@ -109,6 +192,55 @@ def customer_detail(request, customer_id):
         }
     )
 
+
+@require_POST
+@login_required
+def customer_rotate_qr(request, customer_id):
+    """
+    New QR link for a customer, with a fresh expiry. The old one stops
+    working within QR_TOKEN_CACHE_TTL (see qr.lifecycle). Issues one if
+    the customer has none yet.
+    """
+    customer = get_object_or_404(
+        Customer.objects.select_related('qr_token'),
+        id=customer_id,
+        shop=request.user.shop
+    )
+
+    qr_token = getattr(customer, 'qr_token', None)
+    if qr_token is None:
+        issue_token(customer)
+    else:
+        rotate(qr_token)
+
+    # Other workers may honour the old token until their cached copy expires
+    ttl = settings.QR_TOKEN_CACHE_TTL
+    messages.success(
+        request,
+        f'New QR code issued. The old one stops working within {ttl} seconds.' if ttl
+        else 'New QR code issued. The old one no longer works.'
+    )
+    return redirect('customer_detail', customer_id=customer.id)
+
+
+@login_required
+def export_customer_ledger(request, customer_id):
+    """Customer's ledger with running balance, streamed as CSV / XLSX."""
+    customer = get_object_or_404(
+        Customer,
+        id=customer_id,
+        shop=request.user.shop
+    )
+
+    return streaming_export(
+        request,
+        f'ledger_{customer.mobile}',
+        LEDGER_HEADER,
+        ledger_rows(customer),
+        sheet_name='Ledger'
+    )
+
+
 @login_required
 def customer_edit(request, customer_id):
     """
@@ -163,21 +295,14 @@ def customer_deactivate(request, customer_id):
 @login_required
 def customer_deactivated_list(request):
     """
-    Shows a list of inactive customers.
-    Fetched ALL at once for client-side search/pagination.
+    Shows inactive customers, one cursor page at a time.
     """
-    shop = request.user.shop
-    
-    # 🟢 Get ALL deactivated customers (No server pagination)
-    customers = Customer.objects.filter(
-        shop=shop,
-        is_active=False
-    ).order_by('name')
+    customers, next_cursor = customer_page(request, is_active=False)
 
     return render(
         request,
         'customers/customer_deactivated_list.html',
-        {'customers': customers}
+        {'customers': customers, 'next_cursor': next_cursor}
     )
 
 @login_required
@@ -0,0 +1,117 @@
+"""
+Bulk product import from CSV (name, category, price, stock).
+
+Accepts the columns of the inventory export, so an exported file can be
+edited and re-imported into another shop. Per chunk of rows: one IN-query
+for names already active in the shop and one bulk INSERT.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from LedgerX.imports import read_csv_chunks, ImportReport
+from reports.dashboard_cache import invalidate_dashboard
+from .models import Product
+
+
+COLUMNS = {
+    'name': (True, ('product name', 'name', 'product')),
+    'category': (False, ('category',)),
+    'price': (True, ('price', 'default price', 'selling price')),
+    'stock': (True, ('stock quantity', 'stock', 'quantity', 'qty')),
+    'low_stock_threshold': (False, ('low stock threshold', 'low stock')),
+}
+
+NAME_MAX_LENGTH = Product._meta.get_field('name').max_length
+CATEGORY_MAX_LENGTH = Product._meta.get_field('category').max_length
+MAX_PRICE = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+
+
+def _price(value):
+    try:
+        price = Decimal(value.replace(',', '').replace('₹', ''))
+    except InvalidOperation:
+        return None
+    if not price.is_finite() or price < 0 or price > MAX_PRICE:
+        return None
+    return price.quantize(Decimal('0.01'))
+
+
+def _count(value, default=None):
+    if not value and default is not None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    return number if number >= 0 else None
+
+
+def import_products(shop, uploaded_file):
+    """
+    Imports every valid row; invalid rows and names already active in the
+    shop go in the report. Raises LedgerX.imports.ImportFileError if the
+    file can't be read.
+    """
+    report = ImportReport()
+    seen = set()  # names earlier in this file
+
+    for chunk in read_csv_chunks(uploaded_file, COLUMNS):
+
+        # 1. Row checks in memory
+        valid = []
+        for line, row in chunk:
+            name = row['name']
+            price = _price(row['price'])
+            stock = _count(row['stock'])
+            threshold = _count(row.get('low_stock_threshold', ''), default=5)
+
+            if not name:
+                report.error(line, 'Product name is required')
+            elif len(name) > NAME_MAX_LENGTH:
+                report.error(line, f'Name is longer than {NAME_MAX_LENGTH} characters')
+            elif price is None:
+                report.error(line, 'Price must be a non-negative number')
+            elif stock is None:
+                report.error(line, 'Stock quantity must be a whole number (0 or more)')
+            elif threshold is None:
+                report.error(line, 'Low stock threshold must be a whole number (0 or more)')
+            elif name in seen:
+                report.error(line, f'"{name}" appears earlier in the file')
+            else:
+                seen.add(name)
+                valid.append((line, Product(
+                    shop=shop,
+                    name=name,
+                    category=(row.get('category') or '')[:CATEGORY_MAX_LENGTH] or None,
+                    default_price=price,
+                    stock_quantity=stock,
+                    low_stock_threshold=threshold,
+                )))
+
+        if not valid:
+            continue
+
+        # 2. One query for names this shop already sells
+        existing = set(
+            Product.objects.filter(
+                shop=shop,
+                is_active=True,
+                name__in=[product.name for _, product in valid]
+            ).values_list('name', flat=True)
+        )
+
+        rows = []
+        for line, product in valid:
+            if product.name in existing:
+                report.error(line, f'"{product.name}" already exists')
+            else:
+                rows.append(product)
+
+        # 3. One INSERT for the chunk
+        Product.objects.bulk_create(rows)
+        report.created += len(rows)
+
+    if report.created:
+        invalidate_dashboard(shop.id)  # bulk_create skips signals
+
+    return report
@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-18 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_shop_upi_id'),
+        ('products', '0002_product_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='shop',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='products', to='accounts.shop'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['shop', 'is_active', 'stock_quantity'], name='product_shop_active_stock_idx'),
+        ),
+    ]
@@ -11,6 +11,7 @@ class Product(models.Model):
     shop = models.ForeignKey(
         Shop,
         on_delete=models.CASCADE,
+        db_index=False,  # covered by the composite indexes in Meta
         related_name='products'
     )
 
@@ -36,5 +37,14 @@ class Product(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Product list / out-of-stock / low-stock count
+            models.Index(
+                fields=['shop', 'is_active', 'stock_quantity'],
+                name='product_shop_active_stock_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.shop.shop_name})"
@@ -1,3 +1,47 @@
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import Shop
+from .models import Product
+
+
+class ProductImportTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.client.force_login(user)
+
+    def upload(self, data):
+        return self.client.post(
+            reverse('product_import'),
+            {'file': SimpleUploadedFile('products.csv', data)},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        ).json()
+
+    def test_inventory_export_reimports(self):
+        Product.objects.create(shop=self.shop, name='Tea', category='Drinks', default_price='12.50', stock_quantity=40)
+        exported = b''.join(self.client.get(reverse('export_inventory_csv')).streaming_content)
+        Product.objects.all().delete()
+
+        report = self.upload(exported)
+
+        self.assertEqual(report['created'], 1)
+        tea = Product.objects.get(shop=self.shop)
+        self.assertEqual((tea.name, tea.category, str(tea.default_price), tea.stock_quantity), ('Tea', 'Drinks', '12.50', 40))
+
+    def test_bad_rows_are_reported(self):
+        Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=5)
+
+        report = self.upload(
+            b'name,price,stock\n'
+            b'Milk,25,10\n'
+            b'Sugar,abc,10\n'
+            b'Salt,5,-1\n'
+            b'Tea,10,1\n'
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([e['row'] for e in report['errors']], [3, 4, 5])
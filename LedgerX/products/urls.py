@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.product_list, name='product_list'),
     path('add/', views.product_add, name='product_add'),
+    path('import/', views.product_import, name='product_import'),
     path('out-of-stock/', views.product_out_of_stock, name='product_out_of_stock'), # 🟢 New URL
     path('<int:product_id>/', views.product_detail, name='product_detail'),
     path('<int:product_id>/edit/', views.product_edit, name='product_edit'),
@@ -1,12 +1,16 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
 from .models import Product
-import csv
+from .importer import import_products
+from LedgerX.exports import CHUNK_SIZE, streaming_export
+from LedgerX.imports import ImportFileError
+from LedgerX.instrumentation import query_budget
 
 # Create your views here.
+@query_budget(6)
 @login_required
 def product_list(request):
     """
@@ -74,6 +78,42 @@ def product_add(request):
     return render(request, 'products/product_add.html')
 
 
+@login_required
+def product_import(request):
+    """
+    Bulk-adds products from a CSV (the inventory export's columns).
+    Answers XHR uploads with the report as JSON.
+    """
+    report = None
+
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if not upload:
+            messages.error(request, 'Please choose a CSV file')
+            return redirect('product_import')
+
+        try:
+            report = import_products(request.user.shop, upload)
+        except ImportFileError as e:
+            messages.error(request, str(e))
+            return redirect('product_import')
+
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse(report.as_dict())
+
+        if report.created:
+            messages.success(request, f'{report.created} products imported')
+
+    return render(request, 'imports/import_page.html', {
+        'title': 'Import Products',
+        'icon': '📦',
+        'columns': ['Product Name', 'Category', 'Price', 'Stock Quantity'],
+        'back_url': 'product_list',
+        'back_label': 'Products',
+        'report': report,
+    })
+
+
 @login_required
 def product_detail(request, product_id):
     """
@@ -161,22 +201,22 @@ def export_inventory_csv(request):
     shop = request.user.shop
     products = Product.objects.filter(shop=shop, is_active=True).order_by('name')
 
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="inventory_export.csv"'
-
-    # 🟢 Add the UTF-8 BOM to fix the "â‚¹" symbol in Excel
-    response.write(u'\ufeff'.encode('utf8'))
-
-    writer = csv.writer(response)
-    writer.writerow(['Product Name', 'Category', 'Price (₹)', 'Stock Quantity'])
-
-    for product in products:
-        writer.writerow([
+    # 🟢 Streamed (UTF-8 BOM keeps "₹" readable in Excel); ?format=xlsx for a workbook
+    rows = (
+        [
             product.name,
             product.category or 'General',
             product.default_price,
             product.stock_quantity
-        ])
+        ]
+        for product in products.iterator(chunk_size=CHUNK_SIZE)
+    )
 
-    return response
+    return streaming_export(
+        request,
+        'inventory_export',
+        ['Product Name', 'Category', 'Price (₹)', 'Stock Quantity'],
+        rows,
+        sheet_name='Inventory'
+    )
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import QRToken
+from .lifecycle import rotate
 
 
 class QRTokenAdmin(admin.ModelAdmin):
@@ -8,9 +9,17 @@ class QRTokenAdmin(admin.ModelAdmin):
         'secure_token',
         'is_active',
         'created_at',
+        'expires_at',
     )
 
     list_filter = ('is_active',)
+    actions = ['rotate_tokens']
+
+    @admin.action(description='Issue new tokens (old links stop working)')
+    def rotate_tokens(self, request, queryset):
+        for token in queryset:
+            rotate(token)
+        self.message_user(request, f'{len(queryset)} tokens rotated')
 
 
 admin.site.register(QRToken, QRTokenAdmin)
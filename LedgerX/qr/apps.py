@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class QrConfig(AppConfig):
     name = 'qr'
+
+    def ready(self):
+        # Drops cached QR images when a token rotates or is deactivated
+        from . import signals  # noqa: F401
@@ -0,0 +1,129 @@
+"""
+Content-addressed cache for rendered ledger QR PNGs.
+
+The PNG depends only on (secure_token, ledger URL, size), so its SHA-256
+over those inputs is both the cache key and a strong ETag. Images live in
+a small in-process LRU, backed by files under settings.QR_IMAGE_CACHE_DIR
+(one folder per token). Nothing expires on its own: entries are dropped
+when their QRToken rotates or is deactivated (see qr.signals).
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+
+
+RENDER_VERSION = 1      # bump if the rendering below changes
+DEFAULT_SIZE = 10       # qrcode's default box size (pixels per module)
+MIN_SIZE, MAX_SIZE = 2, 20
+
+
+def qr_etag(token, url, size):
+    raw = f'{RENDER_VERSION}|{token}|{url}|{size}'.encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def render_qr_png(url, size=DEFAULT_SIZE):
+    qr = qrcode.QRCode(box_size=size, border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    qr.make_image().save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRImageCache:
+
+    def __init__(self, max_entries, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._images = OrderedDict()     # etag -> png bytes
+        self._by_token = {}              # token -> {etag}
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'renders': 0}
+
+    def _path(self, token, etag):
+        return os.path.join(self.directory, str(token), f'{etag}.png')
+
+    def _remember(self, token, etag, png):
+        with self._lock:
+            self._images[etag] = png
+            self._images.move_to_end(etag)
+            self._by_token.setdefault(str(token), set()).add(etag)
+
+            while len(self._images) > self.max_entries:
+                old, _ = self._images.popitem(last=False)
+                for etags in self._by_token.values():
+                    etags.discard(old)
+
+    def get(self, token, url, size=DEFAULT_SIZE):
+        """Returns (etag, png bytes), rendering only on a miss in both tiers."""
+        etag = qr_etag(token, url, size)
+
+        with self._lock:
+            png = self._images.get(etag)
+            if png is not None:
+                self._images.move_to_end(etag)
+                self.stats['memory_hits'] += 1
+                return etag, png
+
+        if self.directory:
+            try:
+                with open(self._path(token, etag), 'rb') as f:
+                    png = f.read()
+                self.stats['disk_hits'] += 1
+            except OSError:
+                png = None
+
+        if png is None:
+            png = render_qr_png(url, size)
+            self.stats['renders'] += 1
+            self._write(token, etag, png)
+
+        self._remember(token, etag, png)
+        return etag, png
+
+    def _write(self, token, etag, png):
+        if not self.directory:
+            return
+        path = self._path(token, etag)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so readers never see a half-written file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(png)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the disk tier is best effort
+
+    def invalidate(self, token):
+        """Drops every image of a token from both tiers."""
+        token = str(token)
+        with self._lock:
+            for etag in self._by_token.pop(token, ()):
+                self._images.pop(etag, None)
+
+        if self.directory:
+            shutil.rmtree(os.path.join(self.directory, token), ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._by_token.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+qr_image_cache = QRImageCache(
+    max_entries=settings.QR_IMAGE_CACHE_SIZE,
+    directory=settings.QR_IMAGE_CACHE_DIR or None,
+)
@@ -0,0 +1,62 @@
+"""
+Running-balance pages for the public QR ledger.
+
+The customer's stored balance (Customer.balance) is the balance after
+their newest transaction, so the newest page needs no history at all:
+walking the page backwards and undoing each row's ledger effect gives
+every row's running balance. Older pages start from the stored balance
+minus one indexed SUM over the rows newer than the page.
+"""
+
+from LedgerX.pagination import keyset_page, keyset_after
+from sales.balances import ledger_balance
+from sales.models import Transaction
+from sales.signals import ledger_effect
+
+
+ORDERING = ('-transaction_date', '-id')
+PAGE_SIZE = 10
+
+
+def ledger_transactions(customer):
+    """What the public ledger lists: the customer's active transactions."""
+    return Transaction.objects.filter(customer=customer, is_active=True)
+
+
+def ledger_page(customer, cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of the ledger, newest first.
+
+    Returns (rows, next_cursor); each row is {'tx', 'balance', 'abs_balance'}
+    where balance is the customer's balance right after that transaction.
+    """
+    transactions, next_cursor = keyset_page(
+        ledger_transactions(customer),
+        ORDERING,
+        cursor=cursor,
+        page_size=page_size
+    )
+
+    if not transactions:
+        return [], None
+
+    balance = customer.balance
+    newest = transactions[0]
+
+    if cursor:
+        # Undo everything newer than this page in one aggregate
+        newer = ledger_transactions(customer).filter(
+            keyset_after(('transaction_date', 'id'), (newest.transaction_date, newest.id))
+        ).aggregate(total=ledger_balance())['total']
+        balance -= newer
+
+    rows = []
+    for tx in transactions:
+        rows.append({
+            'tx': tx,
+            'balance': balance,
+            'abs_balance': abs(balance),
+        })
+        balance -= ledger_effect(tx)
+
+    return rows, next_cursor
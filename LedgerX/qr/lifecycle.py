@@ -0,0 +1,92 @@
+"""
+QR token lifecycle.
+
+Every customer gets a token when they are created (new_token / issue_token;
+`create_qr_tokens` backfills older customers), so pages only ever read
+tokens. A token lives settings.QR_TOKEN_LIFETIME_DAYS (0 = forever), after
+which the public pages answer 410 until the shop rotates it: rotate() gives
+the customer a new secure_token and a fresh lifetime. `expire_qr_tokens`
+deactivates expired tokens in bulk.
+
+Rotating or deactivating drops the token from this process's lookup cache
+and the shared tier at once, but other processes keep their in-process copy
+(see qr.token_cache) for up to settings.QR_TOKEN_CACHE_TTL seconds, so an
+old link can keep working in them for that long. Lower the TTL (0 turns the
+lookup cache off) if that window matters.
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .image_cache import qr_image_cache
+from .models import QRToken
+from .token_cache import qr_token_cache
+
+
+def token_expiry(now=None):
+    days = settings.QR_TOKEN_LIFETIME_DAYS
+    if not days:
+        return None
+    return (now or timezone.now()) + timedelta(days=days)
+
+
+def new_token(customer):
+    """An unsaved token for `customer` (for bulk_create)."""
+    return QRToken(customer=customer, expires_at=token_expiry())
+
+
+def issue_token(customer):
+    return QRToken.objects.create(customer=customer, expires_at=token_expiry())
+
+
+def rotate(token):
+    """New secret, fresh lifetime, active again. qr.signals drops the old one's caches."""
+    token.secure_token = uuid.uuid4()
+    token.is_active = True
+    token.expires_at = token_expiry()
+    token.save(update_fields=['secure_token', 'is_active', 'expires_at'])
+    return token
+
+
+def backfill_tokens(customers, batch_size=1000):
+    """Issues tokens to the customers in `customers` that have none. Returns how many."""
+    created = 0
+    last_id = 0
+    missing = customers.filter(qr_token__isnull=True).order_by('id')
+    while True:
+        batch = list(missing.filter(id__gt=last_id).only('id')[:batch_size])
+        if not batch:
+            return created
+        # ignore_conflicts: a customer may have got one since the SELECT
+        tokens = [new_token(c) for c in batch]
+        QRToken.objects.bulk_create(tokens, ignore_conflicts=True)
+        # Skipped rows report no error, so count the secrets that made it in
+        created += QRToken.objects.filter(secure_token__in=[t.secure_token for t in tokens]).count()
+        last_id = batch[-1].id
+
+
+def deactivate_expired(batch_size=1000, now=None):
+    """
+    Deactivates active tokens past expires_at, batch_size per UPDATE.
+    update() skips qr.signals, so their cached lookups and images are
+    dropped here. Returns how many were deactivated.
+    """
+    now = now or timezone.now()
+    deactivated = 0
+    while True:
+        batch = list(
+            QRToken.objects.filter(is_active=True, expires_at__lte=now)
+            .order_by('id')
+            .values_list('id', 'secure_token')[:batch_size]
+        )
+        if not batch:
+            return deactivated
+
+        QRToken.objects.filter(id__in=[pk for pk, _ in batch]).update(is_active=False)
+        for _, token in batch:
+            qr_token_cache.invalidate(token)
+            qr_image_cache.invalidate(token)
+        deactivated += len(batch)
@@ -0,0 +1,37 @@
+import statistics
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from qr.image_cache import QRImageCache, render_qr_png
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark: rendering a ledger QR PNG vs serving it from the memory and disk tiers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def timed(self, label, func, iterations):
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        self.stdout.write(f"{label:<14} median {statistics.median(timings):>10.1f} µs   p95 {sorted(timings)[int(iterations * 0.95) - 1]:>10.1f} µs")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        token = uuid.uuid4()
+        url = f'https://ledgerx.example/qr/{token}/'
+
+        with tempfile.TemporaryDirectory() as directory:
+            warm = QRImageCache(max_entries=16, directory=directory)
+            warm.get(token, url)
+            disk_only = QRImageCache(max_entries=0, directory=directory)
+
+            self.timed('render', lambda: render_qr_png(url), iterations)
+            self.timed('disk hit', lambda: disk_only.get(token, url), iterations)
+            self.timed('memory hit', lambda: warm.get(token, url), iterations)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from customers.models import Customer
+from qr.lifecycle import backfill_tokens
+
+
+class Command(BaseCommand):
+    help = "Issues a QR token to every customer that has none (customers created before tokens were eager)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only this shop id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        customers = Customer.objects.all()
+        if options['shop']:
+            customers = customers.filter(shop_id=options['shop'])
+
+        created = backfill_tokens(customers, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Issued {created} QR tokens"))
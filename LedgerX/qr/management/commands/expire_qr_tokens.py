@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from qr.lifecycle import deactivate_expired
+
+
+class Command(BaseCommand):
+    help = "Deactivates QR tokens past their expiry, in batches. Run it from cron (e.g. hourly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = deactivate_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deactivated {count} expired QR tokens"))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_customer_search_indexes'),
+        ('qr', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='qrtoken',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['expires_at'], name='qrtoken_active_expiry_idx'),
+        ),
+    ]
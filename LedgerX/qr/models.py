@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from customers.models import Customer
 import uuid
 
@@ -25,5 +26,19 @@ class QRToken(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # expire_qr_tokens: active tokens past their expiry
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(is_active=True),
+                name='qrtoken_active_expiry_idx'
+            ),
+        ]
+
+    def is_usable(self):
+        """Active and not past expires_at: the public pages will open."""
+        return self.is_active and (self.expires_at is None or self.expires_at > timezone.now())
+
     def __str__(self):
         return str(self.secure_token)
@@ -0,0 +1,87 @@
+"""
+UPI payment links and their QR images.
+
+The image for a given (upi_id, owner_name, amount) never changes, so
+renders are memoized in-process and served by payment_qr_image with
+cache headers instead of being base64-inlined into the page.
+"""
+
+import hashlib
+import urllib.parse
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.shortcuts import get_object_or_404
+
+from customers.models import Customer
+
+
+DEFAULT_UPI_ID = "example@upi"
+DEFAULT_BANKING_NAME = "Shop Owner"
+
+# UPI caps a single payment far below this; anything above is not a real bill
+MAX_AMOUNT = Decimal('99999999.99')
+
+FORMATS = {
+    'svg': 'image/svg+xml',
+    'png': 'image/png',
+}
+
+
+def format_amount(raw):
+    """
+    Strict UPI amount: "500" -> "500.00". Anything unparsable, negative or
+    above MAX_AMOUNT -> "0.00", so the string (and the QR) stays small
+    whatever exponent the query string carries ("1e3000").
+    """
+    try:
+        amount = Decimal(str(raw))
+    except (InvalidOperation, TypeError, ValueError):
+        return "0.00"
+    # Range check before quantize: a huge exponent would overflow it
+    if not amount.is_finite() or not 0 <= amount <= MAX_AMOUNT:
+        return "0.00"
+    return str(amount.quantize(Decimal('0.01')))
+
+
+def payee_for(customer_id):
+    """
+    (customer, upi_id, banking_name, display_name) for a payment request.
+    Customer and Shop come back in one query.
+    """
+    if not customer_id:
+        return None, DEFAULT_UPI_ID, DEFAULT_BANKING_NAME, None
+
+    customer = get_object_or_404(Customer.objects.select_related('shop'), id=customer_id)
+    shop = customer.shop
+    return customer, shop.upi_id or DEFAULT_UPI_ID, shop.owner_name, shop.shop_name
+
+
+def upi_link(upi_id, banking_name, amount):
+    # pa = UPI ID
+    # pn = Owner Name (Best chance of matching bank record)
+    # am = Strict Amount
+    banking_name_encoded = urllib.parse.quote(banking_name)
+    note_encoded = urllib.parse.quote("Shop Bill")
+    return f"upi://pay?pa={upi_id}&pn={banking_name_encoded}&am={amount}&cu=INR&tn={note_encoded}"
+
+
+@lru_cache(maxsize=1024)
+def render_payment_qr(upi_id, banking_name, amount, fmt='svg'):
+    """Memoized QR for one payment request, as SVG (compact) or PNG bytes."""
+    link = upi_link(upi_id, banking_name, amount)
+
+    buffer = BytesIO()
+    if fmt == 'svg':
+        qrcode.make(link, image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        qrcode.make(link).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def payment_qr_etag(upi_id, banking_name, amount, fmt):
+    raw = f'{fmt}|{upi_link(upi_id, banking_name, amount)}'.encode()
+    return hashlib.sha256(raw).hexdigest()
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import QRToken
+from .image_cache import qr_image_cache
+from .token_cache import qr_token_cache
+
+
+@receiver(post_init, sender=QRToken)
+def remember_token(sender, instance, **kwargs):
+    instance._cached_token = instance.__dict__.get('secure_token')
+
+
+@receiver(post_save, sender=QRToken)
+def invalidate_rotated_token(sender, instance, created, **kwargs):
+    old = instance._cached_token
+    if old and (old != instance.secure_token or not instance.is_active):
+        qr_image_cache.invalidate(old)
+
+    # Any change (and a new token, which may be cached as unknown)
+    if old and old != instance.secure_token:
+        qr_token_cache.invalidate(old)
+    qr_token_cache.invalidate(instance.secure_token)
+    instance._cached_token = instance.secure_token
+
+
+@receiver(post_delete, sender=QRToken)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    qr_image_cache.invalidate(instance.secure_token)
+    qr_token_cache.invalidate(instance.secure_token)
@@ -1,3 +1,412 @@
-from django.test import TestCase
+import os
+import tempfile
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import escape
+
+from accounts.models import Shop
+from customers.models import Customer
+from products.models import Product
+from sales.models import Transaction, TransactionItem
+from LedgerX.pagination import encode_cursor
+from .models import QRToken
+from .image_cache import qr_image_cache
+from .token_cache import QRTokenCache, TokenInfo, qr_token_cache
+from .lifecycle import backfill_tokens, deactivate_expired
+from .payments import format_amount, render_payment_qr
+from sales.receipts import version_key
+
+
+class QRLedgerTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+
+    def make_customer(self, mobile, history):
+        customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile=mobile)
+        token = QRToken.objects.create(customer=customer)
+        for i in range(history):
+            tx_type = Transaction.PAYMENT if i % 3 == 2 else Transaction.CREDIT
+            Transaction.objects.create(shop=self.shop, customer=customer, transaction_type=tx_type, total_amount=10 + i)
+        return customer, token
+
+    def walk(self, token):
+        """All ledger rows, following the cursor links."""
+        url = reverse('customer_ledger_qr', args=[token.secure_token])
+        rows, params = [], {}
+        while True:
+            context = self.client.get(url, params).context
+            rows += context['ledger_rows']
+            if not context['next_cursor']:
+                return rows
+            params = {'cursor': context['next_cursor'], 'page': context['page'] + 1}
+
+    def test_running_balances_match_full_replay(self):
+        customer, token = self.make_customer('9000000000', 25)
+        Transaction.objects.filter(customer=customer).order_by('id').first().delete()
+        deleted = Transaction.objects.filter(customer=customer).order_by('id')[3]
+        deleted.is_active = False
+        deleted.save()
+
+        expected, balance = [], Decimal('0')
+        for tx in Transaction.objects.filter(customer=customer, is_active=True).order_by('transaction_date', 'id'):
+            balance += tx.total_amount if tx.transaction_type == Transaction.CREDIT else -tx.total_amount
+            expected.insert(0, (tx.id, balance))
+
+        rows = self.walk(token)
+        self.assertEqual([(row['tx'].id, row['balance']) for row in rows], expected)
+
+    def test_tampered_cursor_shows_the_newest_page(self):
+        customer, token = self.make_customer('9000000003', 15)
+        url = reverse('customer_ledger_qr', args=[token.secure_token])
+        first = self.client.get(url).context['ledger_rows']
+
+        response = self.client.get(url, {'cursor': encode_cursor([5, 1])})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['ledger_rows'], first)
+
+    def test_long_history_costs_the_same(self):
+        _, short = self.make_customer('9000000001', 3)
+        _, long = self.make_customer('9000000002', 300)
+
+        counts = []
+        for token in (short, long):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('customer_ledger_qr', args=[token.secure_token]))
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(len(response.context['ledger_rows']), 10)
+        self.assertEqual(response.context['last_active'], response.context['ledger_rows'][0]['tx'].transaction_date)
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql']])
+
+
+class QRImageCacheTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.token = QRToken.objects.create(customer=self.customer)
+        self.client.force_login(user)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(setattr, qr_image_cache, 'directory', qr_image_cache.directory)
+        qr_image_cache.directory = directory.name
+        qr_image_cache.clear()
+
+    def fetch(self, **headers):
+        return self.client.get(reverse('qr_image', args=[self.customer.id]), **headers)
+
+    def test_renders_once_then_serves_304s(self):
+        first = self.fetch()
+        self.assertEqual(first['Content-Type'], 'image/png')
+        self.assertTrue(first.content.startswith(b'\x89PNG'))
+
+        self.assertEqual(self.fetch().content, first.content)
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(qr_image_cache.stats, {'memory_hits': 1, 'disk_hits': 0, 'renders': 1})
+
+    def test_rotation_invalidates(self):
+        first = self.fetch()
+        old_dir = os.path.join(qr_image_cache.directory, str(self.token.secure_token))
+        self.assertTrue(os.path.isdir(old_dir))
+
+        self.token.secure_token = uuid.uuid4()
+        self.token.save()
+
+        self.assertFalse(os.path.exists(old_dir))
+        second = self.fetch(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_other_shops_customers_are_hidden(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pass')
+        Shop.objects.create(user=other, shop_name='Other', owner_name='Other')
+        self.client.force_login(other)
+        self.assertEqual(self.fetch().status_code, 404)
+
+
+class ReceiptPageCacheTests(TestCase):
+
+    def setUp(self):
+        caches[settings.RECEIPT_CACHE_ALIAS].clear()
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.token = QRToken.objects.create(customer=self.customer)
+
+        self.sale = Transaction.objects.create(
+            shop=self.shop, customer=self.customer, transaction_type=Transaction.CREDIT, total_amount=25
+        )
+        product = Product.objects.create(shop=self.shop, name='Rice', default_price=25, stock_quantity=10)
+        TransactionItem.objects.create(transaction=self.sale, product=product, quantity=1, price_at_sale=25)
+
+    def fetch(self, token=None, **headers):
+        token = token or self.token
+        return self.client.get(
+            reverse('qr_transaction_detail', args=[token.secure_token, self.sale.id]), **headers
+        )
+
+    def test_repeat_scans_skip_the_receipt_queries(self):
+        first = self.fetch()
+        self.assertContains(first, 'Rice')
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+
+        # Token, version and page all come from cache
+        with self.assertNumQueries(0):
+            second = self.fetch()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_writes_change_the_page(self):
+        first = self.fetch()
+
+        self.sale.is_active = False
+        self.sale.save()
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 404)
+
+        self.sale.is_active = True
+        self.sale.save()
+        restored = self.fetch(HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(restored.status_code, 200)
+        self.assertNotEqual(restored['ETag'], first['ETag'])
+
+        self.customer.name = 'Ravi Kumar'
+        self.customer.save()
+        edited = self.fetch(HTTP_IF_NONE_MATCH=restored['ETag'])
+        self.assertContains(edited, 'Ravi Kumar')
+
+        self.shop.shop_name = 'Ravi Stores'
+        self.shop.save()
+        self.assertContains(self.fetch(HTTP_IF_NONE_MATCH=edited['ETag']), 'Ravi Stores')
+
+    def test_lost_version_never_brings_an_old_page_back(self):
+        first = self.fetch()
+        self.sale.is_active = False
+        self.sale.save()
+        # e.g. evicted: a fresh version is made up instead of a fixed default
+        caches[settings.RECEIPT_CACHE_ALIAS].delete(version_key('transaction', self.sale.id))
+        self.assertEqual(self.fetch(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 404)
+
+    def test_cached_page_still_checks_the_customer(self):
+        self.fetch()
+        stranger = Customer.objects.create(shop=self.shop, name='Asha', mobile='9000000001')
+        token = QRToken.objects.create(customer=stranger)
+        self.assertEqual(self.fetch(token).status_code, 404)
+
+
+class QRTokenCacheTests(TestCase):
+
+    def setUp(self):
+        qr_token_cache.clear()
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.token = QRToken.objects.create(customer=self.customer)
+
+    def ledger(self, token):
+        return self.client.get(f'/qr/{token}/')
+
+    def test_malformed_tokens_never_reach_the_database(self):
+        for token in ('not-a-token', '1234', f'{self.token.secure_token}x'):
+            with self.assertNumQueries(0):
+                self.assertEqual(self.ledger(token).status_code, 404)
+
+    def test_repeat_hits_skip_the_token_query(self):
+        self.assertEqual(self.ledger(self.token.secure_token).status_code, 200)
+        with self.assertNumQueries(0):
+            info = qr_token_cache.resolve(self.token.secure_token)
+        self.assertEqual(info.customer_id, self.customer.id)
+        self.assertEqual(info.shop_id, self.shop.id)
+
+        unknown = uuid.uuid4()
+        self.assertEqual(self.ledger(unknown).status_code, 404)
+        with self.assertNumQueries(0):
+            self.assertIsNone(qr_token_cache.resolve(unknown))
+
+    def test_deactivation_and_expiry_are_honored(self):
+        qr_token_cache.resolve(self.token.secure_token)
+
+        self.token.is_active = False
+        self.token.save()
+        self.assertEqual(self.ledger(self.token.secure_token).status_code, 410)
+
+        self.token.is_active = True
+        self.token.expires_at = timezone.now() - timedelta(minutes=1)
+        self.token.save()
+        self.assertEqual(self.ledger(self.token.secure_token).status_code, 410)
+
+        info = TokenInfo(self.customer.id, self.shop.id, True, timezone.now() + timedelta(hours=1))
+        self.assertTrue(info.usable())
+        self.assertFalse(info.usable(now=timezone.now() + timedelta(hours=2)))
+
+    def test_ttl_and_shared_tier(self):
+        now = [0]
+        first = QRTokenCache(max_entries=10, ttl=60, alias='default', clock=lambda: now[0])
+        second = QRTokenCache(max_entries=10, ttl=60, alias='default', clock=lambda: now[0])
+        self.addCleanup(first.invalidate, self.token.secure_token)
+
+        with self.assertNumQueries(1):
+            first.resolve(self.token.secure_token)
+        with self.assertNumQueries(0):
+            self.assertEqual(second.resolve(self.token.secure_token).customer_id, self.customer.id)
+        self.assertEqual(second.stats['shared_hits'], 1)
+
+        first.invalidate(self.token.secure_token)
+        now[0] = 61
+        with self.assertNumQueries(1):
+            second.resolve(self.token.secure_token)
+
+    def test_guessing_does_not_evict_real_tokens(self):
+        cache = QRTokenCache(max_entries=10, ttl=60, max_unknown=3)
+        cache.resolve(self.token.secure_token)
+
+        for _ in range(20):
+            cache.resolve(uuid.uuid4())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(cache.resolve(self.token.secure_token).customer_id, self.customer.id)
+        self.assertEqual(len(cache._unknown), 3)
+
+
+class TokenLifecycleTests(TestCase):
+
+    def setUp(self):
+        qr_token_cache.clear()
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.client.force_login(user)
+
+    def test_detail_page_only_reads_the_token(self):
+        customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        url = reverse('customer_detail', args=[customer.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, 'No QR code has been issued')
+        self.assertFalse(QRToken.objects.exists())
+        self.assertFalse([q for q in queries if not q['sql'].startswith('SELECT')])
+
+        call_command('create_qr_tokens', stdout=StringIO())
+        token = QRToken.objects.get(customer=customer)
+        self.assertContains(self.client.get(url), str(token.secure_token)[:11])
+
+    def test_new_customers_get_tokens_eagerly(self):
+        self.client.post(reverse('customer_add'), {'name': 'Ravi', 'mobile': '9000000000'})
+        self.client.post(reverse('ajax_add_customer'), {'name': 'Asha', 'mobile': '9000000001'})
+        self.assertEqual(QRToken.objects.filter(customer__shop=self.shop).count(), 2)
+
+    @override_settings(QR_TOKEN_LIFETIME_DAYS=30)
+    def test_rotation_replaces_the_link(self):
+        customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        token = QRToken.objects.create(customer=customer, expires_at=timezone.now() - timedelta(days=1))
+        old = token.secure_token
+        self.assertEqual(self.client.get(reverse('customer_ledger_qr', args=[old])).status_code, 410)
+
+        response = self.client.post(reverse('customer_rotate_qr', args=[customer.id]), follow=True)
+        self.assertContains(response, f'stops working within {settings.QR_TOKEN_CACHE_TTL} seconds')
+
+        token.refresh_from_db()
+        self.assertNotEqual(token.secure_token, old)
+        self.assertTrue(token.is_usable())
+        self.assertGreater(token.expires_at, timezone.now() + timedelta(days=29))
+        self.assertEqual(self.client.get(reverse('customer_ledger_qr', args=[old])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('customer_ledger_qr', args=[token.secure_token])).status_code, 200)
+
+    def test_backfill_counts_only_the_tokens_it_inserted(self):
+        customers = [Customer.objects.create(shop=self.shop, name='C', mobile=f'900000000{i}') for i in range(3)]
+        QRToken.objects.all().delete()
+        bulk_create = QRToken.objects.bulk_create
+
+        def racing_bulk_create(tokens, **kwargs):
+            # Someone else issues the first customer's token after our SELECT
+            QRToken.objects.create(customer=customers[0])
+            return bulk_create(tokens, **kwargs)
+
+        with mock.patch.object(QRToken.objects, 'bulk_create', racing_bulk_create):
+            self.assertEqual(backfill_tokens(Customer.objects.filter(shop=self.shop)), 2)
+        self.assertEqual(QRToken.objects.count(), 3)
+
+    def test_sweeper_deactivates_expired_tokens_in_batches(self):
+        past, future = timezone.now() - timedelta(hours=1), timezone.now() + timedelta(hours=1)
+        tokens = [
+            QRToken.objects.create(
+                customer=Customer.objects.create(shop=self.shop, name='C', mobile=f'900000000{i}'),
+                expires_at=past if i < 5 else future
+            )
+            for i in range(7)
+        ]
+        self.assertTrue(qr_token_cache.lookup(tokens[0].secure_token).active)
+
+        with self.assertNumQueries(7):  # SELECT + UPDATE for 2, 2 and 1 tokens, then an empty SELECT
+            self.assertEqual(deactivate_expired(batch_size=2), 5)
+
+        self.assertEqual(QRToken.objects.filter(is_active=True).count(), 2)
+        self.assertFalse(qr_token_cache.lookup(tokens[0].secure_token).active)
+        call_command('expire_qr_tokens', stdout=StringIO())
+        self.assertEqual(QRToken.objects.filter(is_active=True).count(), 2)
+
+
+class PaymentQRTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Chintu Sweets', owner_name='Krish Patel', upi_id='krish@upi')
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+
+    def test_bridge_links_the_image_instead_of_inlining_it(self):
+        with self.assertNumQueries(1):  # Customer + Shop together
+            response = self.client.get(reverse('payment_bridge'), {'amt': '500', 'cid': self.customer.id})
+
+        self.assertEqual(response.context['upi_link'], 'upi://pay?pa=krish@upi&pn=Krish%20Patel&am=500.00&cu=INR&tn=Shop%20Bill')
+        self.assertNotContains(response, 'base64')
+        self.assertContains(response, escape(response.context['qr_image_url']))
+
+    def test_amounts_are_clamped(self):
+        self.assertEqual(format_amount('500'), '500.00')
+        self.assertEqual(format_amount('12.345'), '12.34')
+        for raw in ('1e3000', '1e50000000', '-5', '100000000', 'nan', 'abc'):
+            self.assertEqual(format_amount(raw), '0.00', raw)
+
+        for raw in ('1e3000', '-5'):
+            response = self.client.get(reverse('payment_qr_image'), {'amt': raw, 'cid': self.customer.id})
+            self.assertEqual(response.status_code, 200)
+            bridge = self.client.get(reverse('payment_bridge'), {'amt': raw, 'cid': self.customer.id})
+            self.assertIn('am=0.00&', bridge.context['upi_link'])
+
+    def test_image_is_svg_memoized_and_cacheable(self):
+        params = {'amt': '500', 'cid': self.customer.id}
+        render_payment_qr.cache_clear()
+
+        first = self.client.get(reverse('payment_qr_image'), params)
+        self.client.get(reverse('payment_qr_image'), params)
+
+        self.assertEqual(first['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', first.content)
+        self.assertIn('max-age', first['Cache-Control'])
+        self.assertEqual(render_payment_qr.cache_info().misses, 1)
+
+        revalidated = self.client.get(reverse('payment_qr_image'), params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        png = self.client.get(reverse('payment_qr_image'), {**params, 'format': 'png'})
+        self.assertTrue(png.content.startswith(b'\x89PNG'))
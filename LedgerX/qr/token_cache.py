@@ -0,0 +1,136 @@
+"""
+Fast path from a public QR token to its customer.
+
+Every /qr/<token>/ page first needs to know which customer and shop a
+token belongs to and whether it may still be used. resolve() answers
+from a small in-process LRU whose entries live settings.QR_TOKEN_CACHE_TTL
+seconds, optionally backed by a shared Django cache
+(settings.QR_TOKEN_CACHE_ALIAS) so one worker's lookup serves the others.
+Unknown tokens are remembered as well, so guessing costs one query per
+guess at most, but in their own smaller LRU
+(settings.QR_TOKEN_CACHE_UNKNOWN_SIZE): a flood of guesses only evicts
+other guesses, never the real customers' entries. Malformed tokens never get here: the URL patterns only
+match UUIDs.
+
+qr.signals drops a token from this process and the shared tier whenever
+it is saved or deleted; other processes' in-process copies catch up
+within the TTL. expires_at is part of the entry and is checked on every
+call, so expiry takes effect on time without any invalidation.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import QRToken
+
+
+_MISSING = object()
+
+
+class TokenInfo(namedtuple('TokenInfo', 'customer_id shop_id active expires_at')):
+
+    def usable(self, now=None):
+        # Same rule as QRToken.is_usable()
+        if not self.active:
+            return False
+        return self.expires_at is None or self.expires_at > (now or timezone.now())
+
+
+def token_key(token):
+    return f'qr-token:{token}'
+
+
+class QRTokenCache:
+
+    def __init__(self, max_entries, ttl, alias=None, clock=time.monotonic, max_unknown=None):
+        self.max_entries = max_entries
+        self.max_unknown = max_unknown if max_unknown is not None else max(max_entries // 10, 1)
+        self.ttl = ttl
+        self.alias = alias
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()    # token -> (deadline, TokenInfo)
+        self._unknown = OrderedDict()    # token -> (deadline, None)
+        self.stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def _shared(self):
+        return caches[self.alias] if self.alias else None
+
+    def _remember(self, token, info):
+        if info is None:
+            entries, limit = self._unknown, self.max_unknown
+        else:
+            entries, limit = self._entries, self.max_entries
+        with self._lock:
+            entries[token] = (self.clock() + self.ttl, info)
+            entries.move_to_end(token)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+
+    def lookup(self, token):
+        """TokenInfo for any existing token (usable or not), None if there is none."""
+        token = str(token)
+
+        with self._lock:
+            for entries in (self._entries, self._unknown):
+                entry = entries.get(token)
+                if entry is not None and entry[0] > self.clock():
+                    entries.move_to_end(token)
+                    self.stats['hits'] += 1
+                    return entry[1]
+
+        shared = self._shared()
+        cached = shared.get(token_key(token), _MISSING) if shared else _MISSING
+
+        if cached is not _MISSING:
+            self.stats['shared_hits'] += 1
+            info = TokenInfo(*cached) if cached else None
+        else:
+            self.stats['misses'] += 1
+            row = (
+                QRToken.objects.filter(secure_token=token)
+                .values_list('customer_id', 'customer__shop_id', 'is_active', 'expires_at')
+                .first()
+            )
+            info = TokenInfo(*row) if row else None
+            if shared:
+                shared.set(token_key(token), tuple(info) if info else (), self.ttl)
+
+        self._remember(token, info)
+        return info
+
+    def resolve(self, token):
+        """TokenInfo of a token that may be used right now, else None."""
+        info = self.lookup(token)
+        if info is not None and info.usable():
+            return info
+        return None
+
+    def invalidate(self, token):
+        token = str(token)
+        with self._lock:
+            self._entries.pop(token, None)
+            self._unknown.pop(token, None)
+        shared = self._shared()
+        if shared:
+            shared.delete(token_key(token))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unknown.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+
+qr_token_cache = QRTokenCache(
+    max_entries=settings.QR_TOKEN_CACHE_SIZE,
+    max_unknown=settings.QR_TOKEN_CACHE_UNKNOWN_SIZE,
+    ttl=settings.QR_TOKEN_CACHE_TTL,
+    alias=settings.QR_TOKEN_CACHE_ALIAS or None,
+)
@@ -1,26 +1,43 @@
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, get_object_or_404
+from django.template.loader import render_to_string
 from django.utils import timezone
 from django.db.models import Sum
 
 from .models import QRToken
-from sales.models import Transaction
+from .token_cache import qr_token_cache
+from customers.models import Customer
+from .ledger import ledger_page, ledger_transactions
+from sales.receipts import (
+    load_receipt, receipt_version, receipt_etag, cached_receipt_page, cache_receipt_page,
+)
 
-import qrcode
-from io import BytesIO
+from django.contrib.auth.decorators import login_required
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 
-from .models import QRToken
+from .image_cache import qr_image_cache, qr_etag, DEFAULT_SIZE, MIN_SIZE, MAX_SIZE
+from .payments import (
+    FORMATS, payee_for, format_amount, upi_link, render_payment_qr, payment_qr_etag,
+)
+import urllib.parse
 
+from LedgerX.instrumentation import query_budget
+
+
+@login_required
 def generate_qr_image(request, customer_id):
     """
-    Generates QR image for a customer's ledger.
-    Returns PNG image.
+    QR image for a customer's ledger (PNG).
+    Served from qr_image_cache with a strong ETag: repeat loads are 304s
+    and a miss renders once per (token, URL, size).
     """
 
     qr_token = get_object_or_404(
         QRToken,
-        customer__id=customer_id
+        customer__id=customer_id,
+        customer__shop=request.user.shop
     )
 
     # Absolute ledger URL
@@ -28,46 +45,62 @@ def generate_qr_image(request, customer_id):
         reverse('customer_ledger_qr', args=[qr_token.secure_token])
     )
 
-    # Generate QR
-    qr = qrcode.make(ledger_url)
+    try:
+        size = min(max(int(request.GET.get('size', DEFAULT_SIZE)), MIN_SIZE), MAX_SIZE)
+    except ValueError:
+        size = DEFAULT_SIZE
 
-    buffer = BytesIO()
-    qr.save(buffer, format='PNG')
-    buffer.seek(0)
+    # Answer revalidations without touching the image at all
+    etag = quote_etag(qr_etag(qr_token.secure_token, ledger_url, size))
+    response = get_conditional_response(request, etag=etag)
 
-    return HttpResponse(buffer, content_type='image/png')
+    if response is None:
+        _, png = qr_image_cache.get(qr_token.secure_token, ledger_url, size)
+        response = HttpResponse(png, content_type='image/png')
 
-def customer_ledger_qr(request, secure_token):
-    qr = get_object_or_404(
-        QRToken,
-        secure_token=secure_token,
-        is_active=True
-    )
+    response['ETag'] = etag
+    # Same URL after a token rotation, so browsers must revalidate (a cheap 304)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def usable_token(request, secure_token):
+    """
+    (TokenInfo, None) for a token the public pages may serve, usually
+    without a query; (None, a 410 page) for one that expired or was
+    switched off. Unknown tokens (including rotated-away ones) are a 404.
+    """
+    token = qr_token_cache.lookup(secure_token)
+    if token is None:
+        raise Http404("No QRToken matches the given query.")
+    if not token.usable():
+        return None, render(request, 'qr/link_expired.html', status=410)
+    return token, None
 
-    customer = qr.customer
 
-    transactions = Transaction.objects.filter(
-        customer=customer
-    ).order_by('transaction_date')
+@query_budget(5)
+def customer_ledger_qr(request, secure_token):
+    token, gone = usable_token(request, secure_token)
+    if gone:
+        return gone
 
-    ledger_rows = []
-    running_balance = 0
+    customer = get_object_or_404(Customer.objects.select_related('shop'), id=token.customer_id)
 
-    for tx in transactions:
-        if tx.transaction_type == 'CREDIT':
-            running_balance += tx.total_amount
-        elif tx.transaction_type == 'PAYMENT':
-            running_balance -= tx.total_amount
+    # Newest first, one page at a time; balances come from the stored
+    # Customer.balance instead of replaying the whole history
+    ledger_rows, next_cursor = ledger_page(customer, cursor=request.GET.get('cursor'))
 
-        ledger_rows.insert(0, {
-            'tx': tx,
-            'balance': running_balance,
-            'abs_balance': abs(running_balance),  # ✅ added
-        })
-        
+    outstanding_amount = customer.balance
 
-    outstanding_amount = running_balance
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
 
+    # No whole-history COUNT per scan: the first page already holds the newest row
+    if ledger_rows and not request.GET.get('cursor'):
+        latest = ledger_rows[0]['tx'].transaction_date
+    else:
+        latest = ledger_transactions(customer).order_by('-transaction_date').values_list('transaction_date', flat=True).first()
 
     return render(
         request,
@@ -76,110 +109,125 @@ def customer_ledger_qr(request, secure_token):
             'customer': customer,
             'ledger_rows': ledger_rows,  # 👈 NEW
             'outstanding_amount': outstanding_amount,
-            'qr_token': qr,
+            'secure_token': secure_token,
+            'last_active': latest,
+            'page': page,
+            'next_cursor': next_cursor,
         }
     )
 
 
 
+@query_budget(4)
 def qr_transaction_detail(request, secure_token, transaction_id):
-    qr = get_object_or_404(
-        QRToken,
-        secure_token=secure_token,
-        is_active=True
-    )
-
-    transaction = get_object_or_404(
-        Transaction,
-        id=transaction_id,
-        customer=qr.customer
-    )
-
-    items = []
-    for item in transaction.items.all():
-        items.append({
-            'product': item.product,
-            'quantity': item.quantity,
-            'price': item.price_at_sale,
-            'line_total': item.quantity * item.price_at_sale,  # ✅ calculated here
-        })
-
-    return render(
-        request,
-        'qr/transaction_detail.html',
-        {
-            'transaction': transaction,
-            'customer': qr.customer,
-            'items': items,  # 👈 pass pre-calculated data
-        }
-    )
-
+    """
+    Public receipt. The rendered page is cached for good per (transaction,
+    version) with a strong ETag; the version lives in the shared cache and
+    changes on any write (sales.receipts), so a repeat scan is cache reads
+    or a 304, with no query.
+    """
+    token, gone = usable_token(request, secure_token)
+    if gone:
+        return gone
+
+    version = receipt_version(transaction_id, token.customer_id, token.shop_id)
+    cached = cached_receipt_page(transaction_id, version)
+
+    if cached is None:
+        # Transaction, shop, items and products in two (cached) queries, then the customer
+        transaction = load_receipt(transaction_id)
+        # Soft-deleted rows are hidden from the public ledger, so from here too
+        if transaction is None or not transaction.is_active:
+            raise Http404("No Transaction matches the given query.")
+
+        html = render_to_string(
+            'qr/transaction_detail.html',
+            {
+                'transaction': transaction,
+                'customer': transaction.customer,
+                'items': transaction.items.all(),  # line_total computed in SQL
+            }
+        )
+        cached = (transaction.customer_id, html)
+        cache_receipt_page(transaction_id, version, *cached)
+
+    customer_id, html = cached
+    if customer_id != token.customer_id:
+        raise Http404("No Transaction matches the given query.")
+
+    etag = quote_etag(receipt_etag(transaction_id, version))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(html)
+
+    response['ETag'] = etag
+    # Revalidate every time (a cheap 304): a soft delete must take effect
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
-import base64
-from io import BytesIO
-import urllib.parse
-from django.shortcuts import render
-from customers.models import Customer
 
 def payment_bridge_view(request):
     """
     Renders the Payment Page.
     - Uses 'Shop Name' for visual display on the HTML page.
     - Uses 'Owner Name' for the UPI Link (to match Bank Records).
+    The QR itself is an <img> served (and cached) by payment_qr_image.
     """
     # 1. Get Parameters
     amount_raw = request.GET.get('amt', '0')
-    customer_id = request.GET.get('cid') 
-    
-    # Defaults
-    shop_upi_id = "example@upi"
-    display_name = request.GET.get('name', 'Shop') # Visual Name
-    banking_name = "Shop Owner"                    # Bank Name
+    customer_id = request.GET.get('cid')
 
-    if customer_id:
-        customer = get_object_or_404(Customer, id=customer_id)
-        shop = customer.shop
-        
-        # 🟢 1. Visual Name (e.g. "Chintu Sweets")
-        display_name = shop.shop_name 
-        
-        # 🟢 2. Banking Name (e.g. "Krish Patel") - Matches Bank Account
-        banking_name = shop.owner_name 
-
-        if shop.upi_id:
-            shop_upi_id = shop.upi_id
+    # 2. Customer + Shop in one query
+    # Visual Name (e.g. "Chintu Sweets"), Banking Name (e.g. "Krish Patel") - Matches Bank Account
+    customer, upi_id, banking_name, display_name = payee_for(customer_id)
+    if display_name is None:
+        display_name = request.GET.get('name', 'Shop')
 
     # 3. Strict Amount Formatting ("500" -> "500.00")
-    try:
-        amount_formatted = "{:.2f}".format(float(amount_raw))
-    except ValueError:
-        amount_formatted = "0.00"
-
-    # 4. URL Encoding
-    # We encode the OWNER NAME for the UPI link because that matches the bank.
-    banking_name_encoded = urllib.parse.quote(banking_name)
-    note_encoded = urllib.parse.quote("Shop Bill")
+    amount_formatted = format_amount(amount_raw)
 
-    # 5. Construct UPI Link
-    # pa = UPI ID
-    # pn = Owner Name (Best chance of matching bank record)
-    # am = Strict Amount
-    upi_link = f"upi://pay?pa={shop_upi_id}&pn={banking_name_encoded}&am={amount_formatted}&cu=INR&tn={note_encoded}"
+    # 4. UPI Link with the OWNER NAME, because that matches the bank
+    link = upi_link(upi_id, banking_name, amount_formatted)
 
-    # 6. Generate QR Code
-    qr = qrcode.make(upi_link)
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    qr_params = {'amt': amount_formatted}
+    if customer_id:
+        qr_params['cid'] = customer_id
 
     context = {
         'amount': amount_raw,
         'shop_name': display_name,  # Shows "Chintu Sweets" on the website
-        'upi_link': upi_link,       # Sends "Krish Patel" to the App
-        'qr_image': img_str
+        'upi_link': link,           # Sends "Krish Patel" to the App
+        'qr_image_url': f"{reverse('payment_qr_image')}?{urllib.parse.urlencode(qr_params)}",
     }
-    
-    if customer_id:
-         context['customer'] = customer
 
-    return render(request, 'qr/payment_bridge.html', context)
\ No newline at end of file
+    if customer:
+        context['customer'] = customer
+
+    return render(request, 'qr/payment_bridge.html', context)
+
+
+def payment_qr_image(request):
+    """
+    The payment QR as SVG (default) or ?format=png.
+    Memoized on (upi_id, owner_name, amount) and cacheable by the browser.
+    """
+    fmt = request.GET.get('format', 'svg')
+    if fmt not in FORMATS:
+        fmt = 'svg'
+
+    _, upi_id, banking_name, _ = payee_for(request.GET.get('cid'))
+    amount = format_amount(request.GET.get('amt', '0'))
+
+    etag = quote_etag(payment_qr_etag(upi_id, banking_name, amount, fmt))
+    response = get_conditional_response(request, etag=etag)
+
+    if response is None:
+        response = HttpResponse(
+            render_payment_qr(upi_id, banking_name, amount, fmt),
+            content_type=FORMATS[fmt]
+        )
+
+    response['ETag'] = etag
+    # An hour, then a cheap revalidation (the shop may change its UPI id)
+    response['Cache-Control'] = 'public, max-age=3600'
+    return response
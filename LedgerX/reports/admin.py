@@ -1,3 +1,35 @@
 from django.contrib import admin
+from .models import DailyShopSummary, DailyProductSales
 
-# Register your models here.
+
+class DailyShopSummaryAdmin(admin.ModelAdmin):
+    list_display = (
+        'shop',
+        'date',
+        'cash_total',
+        'credit_total',
+        'payment_total',
+        'transaction_count',
+    )
+
+    list_filter = ('shop',)
+    date_hierarchy = 'date'
+
+
+admin.site.register(DailyShopSummary, DailyShopSummaryAdmin)
+
+
+class DailyProductSalesAdmin(admin.ModelAdmin):
+    list_display = (
+        'shop',
+        'date',
+        'product',
+        'quantity',
+        'revenue',
+    )
+
+    list_filter = ('shop',)
+    date_hierarchy = 'date'
+
+
+admin.site.register(DailyProductSales, DailyProductSalesAdmin)
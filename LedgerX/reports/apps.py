@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ReportsConfig(AppConfig):
     name = 'reports'
+
+    def ready(self):
+        # Keeps DailyShopSummary in sync with Transaction writes
+        from . import signals  # noqa: F401
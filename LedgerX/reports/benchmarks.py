@@ -0,0 +1,183 @@
+"""
+View benchmarks (`run_benchmarks`).
+
+Each case drives one view through the Django test client as the owner of
+a (usually synthetic) shop and records wall time and query count. The
+result is plain JSON, so runs from two releases can be diffed with
+compare() to catch regressions: any increase in queries, or a median
+slower than the baseline by more than the tolerance.
+
+Writes (add_sale) run inside a transaction that is rolled back after
+every request, so the data set stays the same from run to run.
+"""
+
+import platform
+import statistics
+import time
+
+import django
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from customers.models import Customer
+from products.models import Product
+from qr.models import QRToken
+from sales.models import Transaction
+from .dashboard_cache import invalidate_dashboard
+
+
+class Rollback(Exception):
+    pass
+
+
+class Case:
+
+    def __init__(self, name, url, method='get', data=None, before=None, write=False):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.data = data or {}
+        self.before = before
+        self.write = write
+
+
+def busiest_customer(shop):
+    """The customer with the longest history: the worst case for detail pages."""
+    return (
+        Customer.objects.filter(shop=shop, is_active=True)
+        .annotate(tx_count=Count('transactions'))
+        .order_by('-tx_count', 'id')
+        .first()
+    )
+
+
+def default_cases(shop):
+    customer = busiest_customer(shop)
+    token, _ = QRToken.objects.get_or_create(customer=customer) if customer else (None, False)
+    products = list(
+        Product.objects.filter(shop=shop, is_active=True, stock_quantity__gte=10).order_by('id')[:3]
+    )
+
+    sale = (
+        Transaction.objects.filter(shop=shop, transaction_type=Transaction.CREDIT, customer=customer)
+        .order_by('-id').first()
+    )
+
+    cases = [
+        Case('dashboard', reverse('dashboard'), before=lambda: invalidate_dashboard(shop.id)),
+        Case('dashboard_cached', reverse('dashboard')),
+        Case('transaction_list', reverse('transaction_list')),
+        Case('customer_report', reverse('customer_report')),
+        Case('visual_reports', reverse('visual_reports')),
+    ]
+    if customer:
+        cases += [
+            Case('customer_detail', reverse('customer_detail', args=[customer.id])),
+            Case('customer_ledger_qr', reverse('customer_ledger_qr', args=[token.secure_token])),
+        ]
+    if sale:
+        cases += [
+            Case('transaction_detail', reverse('transaction_detail', args=[sale.id])),
+            Case('qr_transaction_detail', reverse('qr_transaction_detail', args=[token.secure_token, sale.id])),
+        ]
+    if customer and products:
+        cases.append(Case(
+            'add_sale',
+            reverse('add_sale'),
+            method='post',
+            data={
+                'transaction_type': Transaction.CREDIT,
+                'customer_id': customer.id,
+                **{f'qty_{p.id}': 1 for p in products},
+            },
+            write=True,
+        ))
+    return cases
+
+
+def measure(client, case, repeat, warmup=1):
+    timings, queries, status = [], [], None
+
+    for run in range(warmup + repeat):
+        if case.before:
+            case.before()
+
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            if case.write:
+                try:
+                    with db_transaction.atomic():
+                        response = getattr(client, case.method)(case.url, case.data)
+                        raise Rollback
+                except Rollback:
+                    pass
+            else:
+                response = getattr(client, case.method)(case.url, case.data)
+            elapsed = (time.perf_counter() - started) * 1000
+
+        if run >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured))
+            status = response.status_code
+
+    timings.sort()
+    return {
+        'status': status,
+        'queries': max(queries),
+        'median_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+        'min_ms': round(timings[0], 2),
+    }
+
+
+def run_suite(shop, repeat=10, cases=None, only=None):
+    cases = cases or default_cases(shop)
+    if only:
+        cases = [case for case in cases if case.name in only]
+
+    # The test client talks to 'testserver'
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        client = Client()
+        client.force_login(shop.user)
+        results = {case.name: measure(client, case, repeat) for case in cases}
+
+    return {
+        'meta': {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'repeat': repeat,
+            'shop': {
+                'id': shop.id,
+                'customers': Customer.objects.filter(shop=shop).count(),
+                'products': Product.objects.filter(shop=shop).count(),
+                'transactions': Transaction.objects.filter(shop=shop).count(),
+            },
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, tolerance=0.25):
+    """
+    Regressions of `current` against `baseline` (both run_suite() output),
+    as human-readable strings. Fewer queries or faster is never flagged.
+    """
+    regressions = []
+    for name, now in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        if now['queries'] > before['queries']:
+            regressions.append(f"{name}: {before['queries']} -> {now['queries']} queries")
+        if now['median_ms'] > before['median_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: median {before['median_ms']} -> {now['median_ms']} ms")
+        if now['status'] != before['status']:
+            regressions.append(f"{name}: status {before['status']} -> {now['status']}")
+    return regressions
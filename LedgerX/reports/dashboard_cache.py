@@ -0,0 +1,124 @@
+"""
+Per-shop cache for the dashboard metrics.
+
+The dashboard is the landing page after login and after every sale or
+payment redirect. Its numbers are cached per shop and per local day in the
+cache configured by settings.DASHBOARD_CACHE_ALIAS (local memory unless
+REDIS_URL / CACHE_DIR say otherwise). reports.signals drops the entry on
+every Transaction, Customer and Product write; code that writes with
+bulk_create / update() calls invalidate_dashboard() itself.
+"""
+
+import threading
+from itertools import chain
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+
+from products.models import Product
+from customers.models import Customer
+from sales.models import Transaction
+from LedgerX.dates import local_today
+from .models import DailyShopSummary
+
+
+LOW_STOCK_THRESHOLD = 10
+RECENT_ACTIVITY_LIMIT = 5
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def cache_stats():
+    """Hit / miss / invalidation counters for this process, plus the hit ratio."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else None
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def _key(shop_id, day):
+    # The day is part of the key, so "today" rolls over at local midnight
+    return f'dashboard:v1:{shop_id}:{day.isoformat()}'
+
+
+def compute_dashboard(shop):
+    """The dashboard numbers straight from the database."""
+    today = local_today()
+
+    # 1 & 2. Today's Sales (CASH + CREDIT) and Inflow (PAYMENT + CASH)
+    # One row from the daily rollup instead of two aggregates over Transaction
+    summary = DailyShopSummary.objects.filter(shop=shop, date=today).first()
+
+    # 3. Recent Activity (Transactions + New Customers mixed), newest first
+    recent_txns = Transaction.objects.filter(shop=shop).select_related('customer').order_by('-created_at')[:RECENT_ACTIVITY_LIMIT]
+    recent_custs = Customer.objects.filter(shop=shop).order_by('-created_at')[:RECENT_ACTIVITY_LIMIT]
+
+    return {
+        'todays_sales': summary.sales_total if summary else 0,
+        'todays_payments': summary.collections_total if summary else 0,
+        'low_stock_count': Product.objects.filter(
+            shop=shop,
+            is_active=True,
+            stock_quantity__lt=LOW_STOCK_THRESHOLD
+        ).count(),
+        'total_customers': Customer.objects.filter(
+            shop=shop,
+            is_active=True
+        ).count(),
+        'recent_activities': sorted(
+            chain(recent_txns, recent_custs),
+            key=attrgetter('created_at'),
+            reverse=True
+        )[:RECENT_ACTIVITY_LIMIT],
+    }
+
+
+def get_dashboard(shop):
+    """Cached compute_dashboard(shop)."""
+    cache = _cache()
+    key = _key(shop.id, local_today())
+
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return data
+
+    _count('misses')
+    data = compute_dashboard(shop)
+    cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_dashboard(shop_id):
+    """
+    Drops today's entry for the shop now, and again once the surrounding
+    transaction commits, so a request that read the pre-commit state
+    can't leave it cached.
+    """
+    if not shop_id:
+        return
+
+    key = _key(shop_id, local_today())
+    cache = _cache()
+    cache.delete(key)
+    db_transaction.on_commit(lambda: cache.delete(key))
+    _count('invalidations')
@@ -0,0 +1,100 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction as db_transaction
+from django.db.models import Sum
+
+from accounts.models import Shop
+from sales.models import Transaction
+from LedgerX.dates import local_today, start_of_day, window_filter
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares transaction_date__date lookups with the [start, end) windows from "
+        "LedgerX.dates on a synthetic table: prints EXPLAIN plans and timings. "
+        "Everything is generated inside a transaction and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Transactions to generate (default 1,000,000)')
+        parser.add_argument('--days', type=int, default=365, help='Spread rows over this many past days')
+        parser.add_argument('--shops', type=int, default=20, help='Rows are split across this many shops')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+
+    def handle(self, *args, **options):
+        try:
+            with db_transaction.atomic():
+                shop = self.generate(options['rows'], options['days'], options['shops'])
+                self.compare(shop, options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Synthetic rows rolled back.')
+
+    def generate(self, rows, days, shop_count):
+        self.stdout.write(f"Generating {rows:,} transactions over {days} days and {shop_count} shops...")
+        shops = [
+            Shop.objects.create(
+                user=User.objects.create_user(f'bench-date-{i}-{time.time_ns()}'),
+                shop_name=f'Bench Shop {i}',
+                owner_name='Bench'
+            )
+            for i in range(shop_count)
+        ]
+
+        today = local_today()
+        per_day = max(1, rows // days)
+        types = (Transaction.CASH, Transaction.CREDIT, Transaction.PAYMENT)
+
+        for offset in range(days):
+            batch = Transaction.objects.bulk_create(
+                [
+                    Transaction(
+                        shop=shops[i % shop_count],
+                        transaction_type=types[i % len(types)],
+                        total_amount=10 + i % 90,
+                    )
+                    for i in range(per_day)
+                ],
+                batch_size=5000
+            )
+            # transaction_date is auto_now_add: back-date the whole day in one UPDATE
+            day_start = start_of_day(today - timedelta(days=offset)) + timedelta(hours=9)
+            Transaction.objects.filter(
+                id__gte=batch[0].id, id__lte=batch[-1].id
+            ).update(transaction_date=day_start)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Transaction._meta.db_table}')
+
+        return shops[0]
+
+    def compare(self, shop, repeat):
+        today = local_today()
+        week_ago = today - timedelta(days=6)
+
+        base = Transaction.objects.filter(shop=shop, transaction_type__in=['CASH', 'CREDIT'])
+        cases = [
+            ('today, __date', base.filter(transaction_date__date=today)),
+            ('today, window', base.filter(**window_filter('transaction_date', today))),
+            ('7 days, __date__range', base.filter(transaction_date__date__range=[week_ago, today])),
+            ('7 days, window', base.filter(**window_filter('transaction_date', week_ago, today))),
+        ]
+
+        for label, queryset in cases:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                total = queryset.aggregate(total=Sum('total_amount'))['total']
+                timings.append((time.perf_counter() - started) * 1000)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}: median {statistics.median(timings):.2f} ms (sum={total})"))
+            self.stdout.write(queryset.order_by('-transaction_date').explain())
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Shop
+from reports.statements import CHUNK_SIZE, generate_statements, month_bounds, previous_month
+
+
+class Command(BaseCommand):
+    help = "Renders monthly PDF statements for every active customer into the 'statements' storage."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="YYYY-MM (default: last month)")
+        parser.add_argument('--shop', type=int, help='Only this shop id')
+        parser.add_argument('--workers', type=int, help='Render processes (default: one per CPU, 0 = in-process)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Customers per query round')
+
+    def handle(self, *args, **options):
+        month = options['month'] or previous_month()
+        try:
+            month_bounds(month)
+        except ValueError:
+            raise CommandError(f'Invalid month "{month}", expected YYYY-MM')
+
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id=options['shop'])
+
+        started = time.monotonic()
+
+        def progress(shop, done, total):
+            self.stdout.write(f"Shop #{shop.id} {shop.shop_name}: {done}/{total} customers")
+
+        written = generate_statements(
+            shops.iterator(),
+            month,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            progress=progress,
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} statement(s) for {month} in {elapsed:.1f}s."))
@@ -0,0 +1,53 @@
+import random
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from reports.dashboard_cache import invalidate_dashboard
+from reports.synthetic import ShopGenerator, clear_synthetic_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic shops for benchmarks, e.g. "
+        "--customers 50000 --products 5000 --transactions 2000000. "
+        "Synthetic shops are owned by 'synthetic-*' users; --clear removes them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=1)
+        parser.add_argument('--customers', type=int, default=5000, help='Per shop')
+        parser.add_argument('--products', type=int, default=500, help='Per shop')
+        parser.add_argument('--transactions', type=int, default=200_000, help='Per shop')
+        parser.add_argument('--days', type=int, default=365, help='Spread transactions over this many past days')
+        parser.add_argument('--max-items', type=int, default=4, help='Most products in one sale')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete existing synthetic shops first')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write(f"Deleted {clear_synthetic_data():,} synthetic rows.")
+
+        generator = ShopGenerator(
+            random.Random(options['seed']),
+            customers=options['customers'],
+            products=options['products'],
+            transactions=options['transactions'],
+            days=options['days'],
+            max_items=options['max_items'],
+            log=self.stdout.write,
+        )
+
+        for index in range(options['shops']):
+            started = time.monotonic()
+            shop = generator.generate(index)
+
+            call_command('rebuild_daily_summaries', shop=shop.id, stdout=StringIO())
+            call_command('rebuild_product_sales', shop=shop.id, stdout=StringIO())
+            invalidate_dashboard(shop.id)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Shop #{shop.id} {shop.shop_name} ({shop.user.username}) ready in {time.monotonic() - started:.1f}s"
+            ))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from accounts.models import Shop
+from reports.models import DailyShopSummary
+from reports.rollups import TYPE_COLUMNS, computed_summaries
+from sales.models import Transaction
+
+
+COLUMNS = [col for pair in TYPE_COLUMNS.values() for col in pair]
+
+
+class Command(BaseCommand):
+    help = "Backfills (or verifies) DailyShopSummary from the raw transactions, one shop at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only this shop id')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report drift without writing anything (exits non-zero on drift)'
+        )
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id=options['shop'])
+
+        drifted_shops = 0
+        for shop in shops.iterator():
+            fresh = computed_summaries(Transaction.objects.filter(shop=shop))
+            stored = {s.date: s for s in DailyShopSummary.objects.filter(shop=shop)}
+
+            expected = {s.date: tuple(getattr(s, c) for c in COLUMNS) for s in fresh}
+            current = {d: tuple(getattr(s, c) for c in COLUMNS) for d, s in stored.items()}
+            drift = sorted(d for d in expected.keys() | current.keys() if expected.get(d) != current.get(d))
+
+            if not drift:
+                continue
+
+            drifted_shops += 1
+            self.stdout.write(f"Shop #{shop.id} {shop.shop_name}: {len(drift)} day(s) out of sync")
+
+            if not options['verify']:
+                with db_transaction.atomic():
+                    DailyShopSummary.objects.filter(shop=shop).delete()
+                    DailyShopSummary.objects.bulk_create(fresh, batch_size=1000)
+
+        if options['verify']:
+            if drifted_shops:
+                raise CommandError(f"{drifted_shops} shop(s) have drifted summaries.")
+            self.stdout.write(self.style.SUCCESS('All daily summaries match the ledger.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt summaries for {drifted_shops} shop(s)."))
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from accounts.models import Shop
+from reports.models import DailyProductSales
+from reports.rollups import computed_product_sales
+from sales.models import TransactionItem
+
+
+class Command(BaseCommand):
+    help = "Backfills (or verifies) DailyProductSales from the raw sale items, one shop at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only this shop id')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report drift without writing anything (exits non-zero on drift)'
+        )
+
+    def handle(self, *args, **options):
+        shops = Shop.objects.order_by('id')
+        if options['shop']:
+            shops = shops.filter(id=options['shop'])
+
+        drifted_shops = 0
+        for shop in shops.iterator():
+            fresh = computed_product_sales(TransactionItem.objects.filter(transaction__shop=shop))
+
+            expected = {(r.date, r.product_id): (r.quantity, r.revenue) for r in fresh}
+            current = {
+                (r.date, r.product_id): (r.quantity, r.revenue)
+                for r in DailyProductSales.objects.filter(shop=shop)
+                if r.quantity or r.revenue
+            }
+            drift = [k for k in expected.keys() | current.keys() if expected.get(k) != current.get(k)]
+
+            if not drift:
+                continue
+
+            drifted_shops += 1
+            self.stdout.write(f"Shop #{shop.id} {shop.shop_name}: {len(drift)} product-day(s) out of sync")
+
+            if not options['verify']:
+                with db_transaction.atomic():
+                    DailyProductSales.objects.filter(shop=shop).delete()
+                    DailyProductSales.objects.bulk_create(fresh, batch_size=1000)
+
+        if options['verify']:
+            if drifted_shops:
+                raise CommandError(f"{drifted_shops} shop(s) have drifted product sales.")
+            self.stdout.write(self.style.SUCCESS('All product sales match the ledger.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt product sales for {drifted_shops} shop(s)."))
@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Shop
+from reports.benchmarks import compare, run_suite
+from reports.synthetic import synthetic_shops
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the main views (and counts their queries) as a shop owner and prints JSON. "
+        "Use --baseline to fail on regressions against an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Shop id (default: the newest synthetic shop)')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed requests per view')
+        parser.add_argument('--only', nargs='+', help='Just these cases, e.g. dashboard add_sale')
+        parser.add_argument('--output', help='Write the JSON here instead of stdout')
+        parser.add_argument('--baseline', help='JSON from an earlier run to compare against')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed median slowdown vs the baseline (default 0.25 = 25%%)'
+        )
+
+    def handle(self, *args, **options):
+        if options['shop']:
+            shop = Shop.objects.filter(id=options['shop']).first()
+        else:
+            shop = synthetic_shops().order_by('-id').first()
+        if shop is None:
+            raise CommandError("No shop to benchmark: pass --shop or run generate_synthetic_data first.")
+
+        report = run_suite(shop, repeat=options['repeat'], only=options['only'])
+        output = json.dumps(report, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            for name, result in report['results'].items():
+                self.stdout.write(f"{name:<20} {result['median_ms']:>9.2f} ms  {result['queries']:>3} queries")
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                regressions = compare(json.load(f), report, options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
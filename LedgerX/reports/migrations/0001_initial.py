@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0006_alter_shop_upi_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyShopSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('cash_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payment_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash_count', models.PositiveIntegerField(default=0)),
+                ('credit_count', models.PositiveIntegerField(default=0)),
+                ('payment_count', models.PositiveIntegerField(default=0)),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='accounts.shop')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shop', 'date'), name='daily_summary_shop_date_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_outboundemail'),
+        ('reports', '0002_daily_product_sales'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyproductsales',
+            name='shop',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_product_sales', to='accounts.shop'),
+        ),
+        migrations.AlterField(
+            model_name='dailyshopsummary',
+            name='shop',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='accounts.shop'),
+        ),
+    ]
@@ -1,3 +1,84 @@
 from django.db import models
+from accounts.models import Shop
+from products.models import Product
 
-# Create your models here.
+
+class DailyShopSummary(models.Model):
+    """
+    One row per shop per LOCAL calendar day (settings.TIME_ZONE).
+    Kept in sync by reports.signals; rebuilt by `rebuild_daily_summaries`.
+    Only active transactions are counted.
+    """
+
+    shop = models.ForeignKey(
+        Shop,
+        on_delete=models.CASCADE,
+        db_index=False,  # covered by daily_summary_shop_date_uniq
+        related_name='daily_summaries'
+    )
+
+    date = models.DateField()
+
+    # Per-type totals
+    cash_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payment_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    cash_count = models.PositiveIntegerField(default=0)
+    credit_count = models.PositiveIntegerField(default=0)
+    payment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'date'], name='daily_summary_shop_date_uniq'),
+        ]
+
+    # Invoice value: CASH + CREDIT
+    @property
+    def sales_total(self):
+        return self.cash_total + self.credit_total
+
+    # Money in: CASH + PAYMENT
+    @property
+    def collections_total(self):
+        return self.cash_total + self.payment_total
+
+    @property
+    def transaction_count(self):
+        return self.cash_count + self.credit_count + self.payment_count
+
+    def __str__(self):
+        return f"{self.shop} - {self.date}"
+
+
+class DailyProductSales(models.Model):
+    """
+    Units sold and revenue per shop, product and LOCAL day (CASH + CREDIT).
+    Written alongside the sale items; rebuilt by `rebuild_product_sales`.
+    """
+
+    shop = models.ForeignKey(
+        Shop,
+        on_delete=models.CASCADE,
+        db_index=False,  # covered by daily_product_shop_date_uniq
+        related_name='daily_product_sales'
+    )
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+
+    date = models.DateField()
+
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shop', 'date', 'product'], name='daily_product_shop_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity} on {self.date}"
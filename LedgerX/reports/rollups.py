@@ -0,0 +1,245 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import F, Sum, Count, Q, Case, When, Value, DecimalField, IntegerField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyShopSummary, DailyProductSales
+from sales.models import Transaction, TransactionItem
+from LedgerX.dates import window_filter
+
+
+# transaction_type -> (amount column, count column)
+TYPE_COLUMNS = {
+    Transaction.CASH: ('cash_total', 'cash_count'),
+    Transaction.CREDIT: ('credit_total', 'credit_count'),
+    Transaction.PAYMENT: ('payment_total', 'payment_count'),
+}
+
+ROLLUP_FIELDS = ('shop_id', 'transaction_type', 'total_amount', 'is_active', 'transaction_date')
+
+
+def local_date(value):
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def rollup_effect(tx):
+    """
+    What one transaction adds to the daily rollup:
+    ((shop_id, local_date), {column: delta}), or None if it counts for nothing.
+    """
+    if not tx.is_active or tx.transaction_type not in TYPE_COLUMNS or not tx.transaction_date:
+        return None
+
+    amount_col, count_col = TYPE_COLUMNS[tx.transaction_type]
+    return (
+        (tx.shop_id, local_date(tx.transaction_date)),
+        {amount_col: Decimal(str(tx.total_amount or 0)), count_col: 1},
+    )
+
+
+def add_effect(deltas, effect, sign=1):
+    if effect is None:
+        return
+    key, columns = effect
+    for column, value in columns.items():
+        deltas[key][column] += value * sign
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Applies {(shop_id, date): {column: delta}}.
+    Missing day rows are created in one INSERT, then one F() UPDATE per day.
+    """
+    deltas = {
+        key: {col: val for col, val in cols.items() if val}
+        for key, cols in deltas.items()
+    }
+    deltas = {key: cols for key, cols in deltas.items() if cols}
+    if not deltas:
+        return
+
+    DailyShopSummary.objects.bulk_create(
+        [DailyShopSummary(shop_id=shop_id, date=day) for shop_id, day in deltas],
+        ignore_conflicts=True
+    )
+
+    for (shop_id, day), columns in deltas.items():
+        DailyShopSummary.objects.filter(shop_id=shop_id, date=day).update(
+            **{col: F(col) + val for col, val in columns.items()}
+        )
+
+
+def new_deltas():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def summaries_between(shop, start=None, end=None):
+    """Summary rows for a shop, oldest first; `start` / `end` are inclusive local dates."""
+    rows = DailyShopSummary.objects.filter(shop=shop)
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    return rows.order_by('date')
+
+
+def computed_summaries(transactions):
+    """
+    Grouped (shop, local day) totals straight from `transactions`.
+    Returns unsaved DailyShopSummary objects.
+    """
+    aggregates = {}
+    for tx_type, (amount_col, count_col) in TYPE_COLUMNS.items():
+        aggregates[amount_col] = Sum('total_amount', filter=Q(transaction_type=tx_type), default=0)
+        aggregates[count_col] = Count('id', filter=Q(transaction_type=tx_type))
+
+    rows = transactions.filter(
+        is_active=True,
+        transaction_type__in=TYPE_COLUMNS
+    ).annotate(
+        day=TruncDate('transaction_date', tzinfo=timezone.get_current_timezone())
+    ).values('shop_id', 'day').annotate(**aggregates).order_by('shop_id', 'day')
+
+    return [
+        DailyShopSummary(
+            shop_id=row.pop('shop_id'),
+            date=row.pop('day'),
+            **row
+        )
+        for row in rows
+    ]
+
+
+def rebuild_day(shop_id, day):
+    """Recomputes one shop-day from the raw transactions."""
+    fresh = computed_summaries(
+        Transaction.objects.filter(shop_id=shop_id, **window_filter('transaction_date', day))
+    )
+    DailyShopSummary.objects.filter(shop_id=shop_id, date=day).delete()
+    DailyShopSummary.objects.bulk_create(fresh)
+
+
+# ---------------------------------------------------------------------------
+# Per-product daily sales
+# ---------------------------------------------------------------------------
+
+SALE_TYPES = (Transaction.CASH, Transaction.CREDIT)
+
+
+def product_sales_key(tx):
+    """(shop_id, local_date) a sale's items count towards, or None."""
+    if not tx.is_active or tx.transaction_type not in SALE_TYPES or not tx.transaction_date:
+        return None
+    return (tx.shop_id, local_date(tx.transaction_date))
+
+
+def new_product_deltas():
+    # {(shop_id, date): {product_id: [quantity, revenue]}}
+    return defaultdict(lambda: defaultdict(lambda: [0, Decimal('0')]))
+
+
+def add_items(deltas, key, items, sign=1):
+    """`items` are TransactionItems or (product_id, quantity, price_at_sale) tuples."""
+    if key is None:
+        return
+    for item in items:
+        if isinstance(item, TransactionItem):
+            item = (item.product_id, item.quantity, item.price_at_sale)
+        product_id, qty, price = item
+        line = deltas[key][product_id]
+        line[0] += qty * sign
+        line[1] += Decimal(str(price)) * qty * sign
+
+
+def apply_product_deltas(deltas):
+    """
+    Missing rows are created in one INSERT, then ONE UPDATE per shop-day
+    covers every product sold that day (CASE on product_id).
+    """
+    deltas = {
+        key: {pid: line for pid, line in products.items() if line[0] or line[1]}
+        for key, products in deltas.items()
+    }
+    deltas = {key: products for key, products in deltas.items() if products}
+    if not deltas:
+        return
+
+    DailyProductSales.objects.bulk_create(
+        [
+            DailyProductSales(shop_id=shop_id, date=day, product_id=pid)
+            for (shop_id, day), products in deltas.items()
+            for pid in products
+        ],
+        ignore_conflicts=True
+    )
+
+    money = DecimalField(max_digits=14, decimal_places=2)
+    for (shop_id, day), products in deltas.items():
+        DailyProductSales.objects.filter(
+            shop_id=shop_id,
+            date=day,
+            product_id__in=products
+        ).update(
+            quantity=F('quantity') + Case(
+                *[When(product_id=pid, then=Value(line[0])) for pid, line in products.items()],
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            revenue=F('revenue') + Case(
+                *[When(product_id=pid, then=Value(line[1], output_field=money)) for pid, line in products.items()],
+                default=Value(Decimal('0'), output_field=money),
+                output_field=money,
+            ),
+        )
+
+
+def record_sale_items(sale, items):
+    """Call after creating a sale's items (bulk_create skips signals)."""
+    deltas = new_product_deltas()
+    add_items(deltas, product_sales_key(sale), items)
+    apply_product_deltas(deltas)
+
+
+def computed_product_sales(items):
+    """Grouped (shop, local day, product) totals straight from TransactionItem rows."""
+    rows = items.filter(
+        transaction__is_active=True,
+        transaction__transaction_type__in=SALE_TYPES
+    ).annotate(
+        day=TruncDate('transaction__transaction_date', tzinfo=timezone.get_current_timezone())
+    ).values('transaction__shop_id', 'day', 'product_id').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(
+            F('quantity') * F('price_at_sale'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+    ).order_by('transaction__shop_id', 'day', 'product_id')
+
+    return [
+        DailyProductSales(
+            shop_id=row['transaction__shop_id'],
+            date=row['day'],
+            product_id=row['product_id'],
+            quantity=row['total_quantity'],
+            revenue=row['total_revenue'],
+        )
+        for row in rows
+    ]
+
+
+def top_products(shop, start=None, end=None, limit=None):
+    """Best sellers between two inclusive local dates, from the rollup."""
+    rows = DailyProductSales.objects.filter(shop=shop)
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+
+    rows = rows.values('product__name', 'product__id').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum('revenue'),
+    ).filter(total_quantity__gt=0).order_by('-total_quantity', 'product__name')
+
+    return rows[:limit] if limit else rows
@@ -0,0 +1,90 @@
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from sales.models import Transaction, TransactionItem
+from customers.models import Customer
+from products.models import Product
+from .rollups import (
+    ROLLUP_FIELDS, rollup_effect, add_effect, apply_rollup_deltas, new_deltas,
+    rebuild_day, local_date,
+    product_sales_key, new_product_deltas, add_items, apply_product_deltas, record_sale_items,
+)
+from .dashboard_cache import invalidate_dashboard
+
+
+@receiver(post_save, sender=Transaction)
+def update_daily_summary(sender, instance, created, **kwargs):
+    deltas = new_deltas()
+    previous = None if created else instance.loaded_state(ROLLUP_FIELDS)
+
+    if not created and previous is None:
+        # Previous state unknown (deferred fields): recompute the day from the raw rows
+        rebuild_day(instance.shop_id, local_date(instance.transaction_date))
+        return
+
+    if previous is not None:
+        add_effect(deltas, rollup_effect(previous), sign=-1)
+
+        # Soft-delete / restore / re-date moves the sale's items too
+        old_key, new_key = product_sales_key(previous), product_sales_key(instance)
+        if old_key != new_key:
+            items = list(instance.items.all())
+            product_deltas = new_product_deltas()
+            add_items(product_deltas, old_key, items, sign=-1)
+            add_items(product_deltas, new_key, items)
+            apply_product_deltas(product_deltas)
+
+    add_effect(deltas, rollup_effect(instance))
+    apply_rollup_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Transaction)
+def remember_deleted_items(sender, instance, **kwargs):
+    # Deferred fields can only be read, and the items only listed, while the
+    # row still exists; the cascade removes the items before post_delete runs
+    previous = instance.loaded_state(ROLLUP_FIELDS, fetch=True)
+    key = product_sales_key(previous) if previous else None
+    instance._deleted_items = list(instance.items.all()) if key else []
+
+
+@receiver(post_delete, sender=Transaction)
+def reverse_daily_summary(sender, instance, **kwargs):
+    previous = instance.loaded_state(ROLLUP_FIELDS)
+    if previous is None:
+        return
+
+    deltas = new_deltas()
+    add_effect(deltas, rollup_effect(previous), sign=-1)
+    apply_rollup_deltas(deltas)
+
+    items = getattr(instance, '_deleted_items', None)
+    if items:
+        product_deltas = new_product_deltas()
+        add_items(product_deltas, product_sales_key(previous), items, sign=-1)
+        apply_product_deltas(product_deltas)
+
+
+@receiver(post_save, sender=TransactionItem)
+def update_daily_product_sales(sender, instance, created, **kwargs):
+    # Items are immutable once written; bulk_create callers use record_sale_items
+    if created:
+        record_sale_items(instance.transaction, [instance])
+
+
+@receiver(pre_delete, sender=Transaction)
+@receiver(pre_delete, sender=Customer)
+@receiver(pre_delete, sender=Product)
+def remember_deleted_shop(sender, instance, **kwargs):
+    # A deferred shop_id can't be loaded once the row is gone
+    instance._deleted_shop_id = instance.shop_id
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_dashboard_cache(sender, instance, **kwargs):
+    shop_id = getattr(instance, '_deleted_shop_id', None)
+    invalidate_dashboard(shop_id if shop_id is not None else instance.shop_id)
@@ -0,0 +1,103 @@
+"""
+PDF layout for monthly customer statements.
+
+Runs inside the statement process pool, so it only depends on reportlab
+and plain data (see reports.statements.build_statements); no Django
+setup is needed in the worker processes.
+"""
+
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+
+STYLES = getSampleStyleSheet()
+
+LEDGER_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eef2f7')),
+    ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+    ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#fafafa')]),
+])
+
+
+def money(amount):
+    return f'{amount:,.2f}' if amount else ''
+
+
+def balance_label(amount):
+    """Positive = customer owes the shop (Dr), negative = advance (Cr)."""
+    if not amount:
+        return '0.00'
+    return f'{abs(amount):,.2f} {"Dr" if amount > 0 else "Cr"}'
+
+
+def render_statement(statement):
+    """PDF bytes for one statement dict."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        leftMargin=15 * mm,
+        rightMargin=15 * mm,
+        topMargin=15 * mm,
+        bottomMargin=15 * mm,
+        title=f"Statement - {statement['customer_name']}",
+    )
+
+    story = [
+        Paragraph(statement['shop_name'], STYLES['Title']),
+        Paragraph(
+            f"Statement of account &middot; {statement['period_label']}",
+            STYLES['Heading3']
+        ),
+        Paragraph(
+            f"{statement['customer_name']} ({statement['customer_mobile']})",
+            STYLES['Normal']
+        ),
+        Spacer(1, 6 * mm),
+    ]
+
+    rows = [['Date', 'Particulars', 'Debit', 'Credit', 'Balance']]
+    rows.append(['', 'Opening balance', '', '', balance_label(statement['opening'])])
+    for line in statement['lines']:
+        rows.append([
+            line['date'],
+            Paragraph(line['particulars'], STYLES['BodyText']),
+            money(line['debit']),
+            money(line['credit']),
+            balance_label(line['balance']),
+        ])
+    rows.append(['', 'Closing balance', '', '', balance_label(statement['closing'])])
+
+    table = Table(rows, colWidths=[22 * mm, 83 * mm, 25 * mm, 25 * mm, 25 * mm], repeatRows=1)
+    table.setStyle(LEDGER_STYLE)
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('LINEABOVE', (0, -1), (-1, -1), 0.5, colors.grey),
+    ]))
+    story.append(table)
+
+    story += [
+        Spacer(1, 6 * mm),
+        Paragraph(
+            f"Total billed: {statement['debits']:,.2f} &middot; "
+            f"Total paid: {statement['credits']:,.2f}",
+            STYLES['Normal']
+        ),
+    ]
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_batch(statements):
+    """[(path, pdf bytes)] for a batch; the unit of work sent to the pool."""
+    return [(s['path'], render_statement(s)) for s in statements]
@@ -0,0 +1,216 @@
+"""
+Monthly statement engine (run by `generate_statements`).
+
+Each shop's active customers are read CHUNK_SIZE at a time. Per chunk
+there are four queries, however many customers or transactions it has:
+
+    customers -> opening balances (one grouped SUM) -> the month's
+    CREDIT / PAYMENT rows -> their sale items (with product names)
+
+The parent turns that into plain statement dicts and hands batches to a
+process pool, which renders the PDFs with reportlab (reports.statement_pdf);
+the parent writes the finished files to the 'statements' storage. At most
+a few batches are in flight, so memory stays flat for any shop size.
+"""
+
+import html
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.utils import timezone
+
+from LedgerX.dates import day_window
+from customers.models import Customer
+from sales.balances import ledger_balance
+from sales.models import Transaction, TransactionItem
+from .statement_pdf import render_batch
+
+
+CHUNK_SIZE = 500        # customers per query round
+BATCH_SIZE = 25         # statements per unit of work in the pool
+
+
+def month_bounds(value):
+    """(first day, last day) of a 'YYYY-MM' month."""
+    year, month = (int(part) for part in value.split('-'))
+    first = date(year, month, 1)
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return first, last
+
+
+def previous_month():
+    first_of_this_month = timezone.localdate().replace(day=1)
+    return (first_of_this_month - timedelta(days=1)).strftime('%Y-%m')
+
+
+def statement_path(shop_id, month, customer_id):
+    return f'statements/{shop_id}/{month}/{customer_id}.pdf'
+
+
+def customer_chunks(shop, chunk_size=CHUNK_SIZE):
+    """Active customers of a shop by id, chunk_size per query (keyset on id)."""
+    last_id = 0
+    while True:
+        chunk = list(
+            Customer.objects.filter(shop=shop, is_active=True, id__gt=last_id)
+            .order_by('id')
+            .only('id', 'name', 'mobile')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def build_statements(shop, month, customers):
+    """
+    Statement dicts for one chunk of customers. Customers with nothing
+    to report (no activity in the month, zero balance) are left out.
+    """
+    first, last = month_bounds(month)
+    start, end = day_window(first, last)
+    ids = [c.id for c in customers]
+
+    openings = dict(
+        Transaction.objects.filter(customer_id__in=ids, transaction_date__lt=start)
+        .values('customer_id')
+        .annotate(balance=ledger_balance())
+        .values_list('customer_id', 'balance')
+    )
+
+    transactions = list(
+        Transaction.objects.filter(
+            customer_id__in=ids,
+            is_active=True,
+            transaction_type__in=[Transaction.CREDIT, Transaction.PAYMENT],
+            transaction_date__gte=start,
+            transaction_date__lt=end,
+        )
+        .order_by('customer_id', 'transaction_date', 'id')
+        .values('id', 'customer_id', 'transaction_type', 'total_amount', 'transaction_date')
+    )
+
+    items = defaultdict(list)
+    sale_ids = [t['id'] for t in transactions if t['transaction_type'] == Transaction.CREDIT]
+    for item in (
+        TransactionItem.objects.filter(transaction_id__in=sale_ids)
+        .order_by('id')
+        .values_list('transaction_id', 'product__name', 'quantity')
+    ):
+        items[item[0]].append(f'{item[1]} x {item[2]}')
+
+    by_customer = defaultdict(list)
+    for t in transactions:
+        by_customer[t['customer_id']].append(t)
+
+    period_label = f"{first:%d %b %Y} – {last:%d %b %Y}"
+    statements = []
+    for customer in customers:
+        opening = openings.get(customer.id) or 0
+        rows = by_customer.get(customer.id, [])
+        if not rows and not opening:
+            continue
+
+        balance = opening
+        debits = credits = 0
+        lines = []
+        for t in rows:
+            amount = t['total_amount']
+            if t['transaction_type'] == Transaction.CREDIT:
+                debit, credit = amount, 0
+                particulars = 'Credit sale'
+                if items[t['id']]:
+                    particulars += ': ' + ', '.join(items[t['id']])
+            else:
+                debit, credit = 0, amount
+                particulars = 'Payment received'
+
+            balance += debit - credit
+            debits += debit
+            credits += credit
+            lines.append({
+                'date': f"{timezone.localtime(t['transaction_date']):%d %b}",
+                'particulars': html.escape(particulars),
+                'debit': debit,
+                'credit': credit,
+                'balance': balance,
+            })
+
+        statements.append({
+            'path': statement_path(shop.id, month, customer.id),
+            'shop_name': html.escape(shop.shop_name),
+            'customer_name': html.escape(customer.name),
+            'customer_mobile': customer.mobile,
+            'period_label': period_label,
+            'opening': opening,
+            'lines': lines,
+            'debits': debits,
+            'credits': credits,
+            'closing': balance,
+        })
+
+    return statements
+
+
+def save_statement(storage, path, pdf):
+    # storage.save() would pick a new name next to an old run's file
+    if storage.exists(path):
+        storage.delete(path)
+    storage.save(path, ContentFile(pdf))
+
+
+def generate_statements(shops, month, workers=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Renders `month` ('YYYY-MM') statements for every shop in `shops`.
+    workers=0 renders in this process; None uses one per CPU.
+    progress(shop, done, total) is called as customers are processed.
+    Returns the number of PDFs written.
+    """
+    storage = storages['statements']
+    written = 0
+
+    def drain(results):
+        nonlocal written
+        for path, pdf in results:
+            save_statement(storage, path, pdf)
+            written += 1
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    max_pending = workers * 2
+    pending = []
+
+    try:
+        for shop in shops:
+            total = Customer.objects.filter(shop=shop, is_active=True).count()
+            done = 0
+
+            for customers in customer_chunks(shop, chunk_size):
+                statements = build_statements(shop, month, customers)
+
+                for i in range(0, len(statements), BATCH_SIZE):
+                    batch = statements[i:i + BATCH_SIZE]
+                    if executor is None:
+                        drain(render_batch(batch))
+                        continue
+
+                    pending.append(executor.submit(render_batch, batch))
+                    while len(pending) > max_pending:
+                        drain(pending.pop(0).result())
+
+                done += len(customers)
+                if progress:
+                    progress(shop, done, total)
+
+        for future in pending:
+            drain(future.result())
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    return written
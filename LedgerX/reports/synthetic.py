@@ -0,0 +1,233 @@
+"""
+Synthetic shop data for benchmarks (`generate_synthetic_data`).
+
+Shops look like real kirana shops: a catalogue with a few fast movers,
+customers where a small share does most of the credit buying, and a
+CASH / CREDIT / PAYMENT mix spread over business hours of past days.
+Rows are written with bulk_create one day at a time; the state the
+signals would normally keep (customer balances, daily rollups) is
+rebuilt once at the end. The same --seed gives the same data.
+"""
+
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.db import transaction as db_transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import Shop
+from customers.models import Customer
+from products.models import Product
+from qr.models import QRToken
+from sales.balances import ledger_balance
+from sales.models import Transaction, TransactionItem
+from LedgerX.dates import local_today, start_of_day
+from .models import DailyProductSales, DailyShopSummary
+
+
+USERNAME_PREFIX = 'synthetic-'
+BATCH_SIZE = 5000
+
+FIRST_NAMES = [
+    'Aarav', 'Aditi', 'Amit', 'Anjali', 'Arjun', 'Deepak', 'Divya', 'Farhan', 'Gita', 'Harish',
+    'Imran', 'Jaya', 'Kavita', 'Kiran', 'Lakshmi', 'Manoj', 'Meena', 'Naveen', 'Neha', 'Pooja',
+    'Priya', 'Rahul', 'Rajesh', 'Ravi', 'Rekha', 'Sanjay', 'Seema', 'Suresh', 'Sunita', 'Vikram',
+]
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Patel', 'Reddy', 'Nair', 'Iyer', 'Khan', 'Singh', 'Gupta', 'Das',
+    'Yadav', 'Joshi', 'Mehta', 'Rao', 'Pillai', 'Chauhan', 'Mishra', 'Kulkarni', 'Bose', 'Shetty',
+]
+CATALOGUE = {
+    'Grocery': ['Rice', 'Atta', 'Toor Dal', 'Sugar', 'Salt', 'Sunflower Oil', 'Poha', 'Besan'],
+    'Dairy': ['Milk', 'Curd', 'Paneer', 'Butter', 'Ghee'],
+    'Snacks': ['Biscuits', 'Namkeen', 'Chips', 'Rusk', 'Chocolate'],
+    'Beverages': ['Tea', 'Coffee', 'Cold Drink', 'Juice'],
+    'Household': ['Soap', 'Detergent', 'Toothpaste', 'Shampoo', 'Matchbox', 'Agarbatti'],
+}
+TYPE_WEIGHTS = {Transaction.CASH: 55, Transaction.CREDIT: 30, Transaction.PAYMENT: 15}
+
+
+@contextmanager
+def explicit_timestamps(model, *fields):
+    """Lets bulk_create keep our own values for auto_now_add fields."""
+    fields = [model._meta.get_field(name) for name in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def synthetic_shops():
+    return Shop.objects.filter(user__username__startswith=USERNAME_PREFIX)
+
+
+def clear_synthetic_data():
+    """
+    Deletes every synthetic shop. The bulk rows are removed with plain
+    DELETEs (no per-row signals: their shops are going away anyway),
+    children first, since sale items PROTECT their products.
+    """
+    shops = synthetic_shops()
+    for queryset in (
+        TransactionItem.objects.filter(transaction__shop__in=shops),
+        Transaction.objects.filter(shop__in=shops),
+        DailyProductSales.objects.filter(shop__in=shops),
+        DailyShopSummary.objects.filter(shop__in=shops),
+        QRToken.objects.filter(customer__shop__in=shops),
+        Customer.objects.filter(shop__in=shops),
+        Product.objects.filter(shop__in=shops),
+    ):
+        queryset._raw_delete(queryset.db)
+    return User.objects.filter(username__startswith=USERNAME_PREFIX).delete()[0]
+
+
+class ShopGenerator:
+
+    def __init__(self, rng, customers, products, transactions, days, max_items=4, log=None):
+        self.rng = rng
+        self.customer_count = customers
+        self.product_count = products
+        self.transaction_count = transactions
+        self.days = days
+        self.max_items = max_items
+        self.log = log or (lambda message: None)
+
+    def create_shop(self, index):
+        user = User.objects.create_user(
+            f'{USERNAME_PREFIX}{index}-{self.rng.randrange(16 ** 8):08x}',
+            email=f'shop{index}@synthetic.example',
+            password=None
+        )
+        return Shop.objects.create(
+            user=user,
+            shop_name=f'{self.rng.choice(LAST_NAMES)} General Store #{index}',
+            owner_name=f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+            upi_id=f'shop{index}@upi'
+        )
+
+    def create_products(self, shop):
+        rng = self.rng
+        names = [(category, name) for category, names in CATALOGUE.items() for name in names]
+        products = []
+        for i in range(self.product_count):
+            category, name = names[i % len(names)]
+            variant = i // len(names)
+            products.append(Product(
+                shop=shop,
+                name=f'{name} {variant + 1}' if variant else name,
+                category=category,
+                default_price=Decimal(rng.randrange(500, 50000)) / 100,
+                stock_quantity=rng.choice([0, 2, 4]) if rng.random() < 0.05 else rng.randrange(10, 1000),
+            ))
+        products = Product.objects.bulk_create(products, batch_size=BATCH_SIZE)
+
+        # A few fast movers sell far more often than the long tail
+        # (cumulative weights, so each pick is a bisect, not a full scan)
+        weights = list(accumulate(1 / (rank + 1) for rank in range(len(products))))
+        return [(p.id, p.default_price) for p in products], weights
+
+    def create_customers(self, shop):
+        rng = self.rng
+        customers = Customer.objects.bulk_create(
+            [
+                Customer(
+                    shop=shop,
+                    name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    mobile=f'{6 + i // 10 ** 9 % 4}{i % 10 ** 9:09d}',
+                    is_active=rng.random() > 0.02,
+                )
+                for i in range(self.customer_count)
+            ],
+            batch_size=BATCH_SIZE
+        )
+        QRToken.objects.bulk_create([QRToken(customer=c) for c in customers], batch_size=BATCH_SIZE)
+
+        # ~20% of customers do most of the credit buying
+        weights = list(accumulate(rng.paretovariate(1.2) for _ in customers))
+        return [c.id for c in customers], weights
+
+    def sale_items(self, products, product_weights):
+        picks = self.rng.choices(products, cum_weights=product_weights, k=self.rng.randint(1, self.max_items))
+        lines = {}
+        for product_id, price in picks:
+            qty, _ = lines.get(product_id, (0, price))
+            lines[product_id] = (qty + self.rng.randint(1, 3), price)
+        return lines
+
+    def create_day(self, shop, day, count, products, product_weights, customers, customer_weights):
+        rng = self.rng
+        opening = start_of_day(day) + timedelta(hours=8)
+        moments = sorted(opening + timedelta(seconds=rng.randrange(14 * 3600)) for _ in range(count))
+        types = rng.choices(list(TYPE_WEIGHTS), weights=list(TYPE_WEIGHTS.values()), k=count)
+        buyers = rng.choices(customers, cum_weights=customer_weights, k=count) if customers else [None] * count
+
+        transactions, lines = [], []
+        for moment, tx_type, customer_id in zip(moments, types, buyers):
+            items = {}
+            if tx_type == Transaction.PAYMENT:
+                amount = Decimal(rng.randrange(50, 2000))
+            else:
+                items = self.sale_items(products, product_weights)
+                amount = sum(price * qty for qty, price in items.values())
+
+            if tx_type == Transaction.CASH and rng.random() < 0.9:
+                customer_id = None
+            if customer_id is None and tx_type != Transaction.CASH:
+                tx_type, items = Transaction.CASH, items or self.sale_items(products, product_weights)
+                amount = sum(price * qty for qty, price in items.values())
+
+            transactions.append(Transaction(
+                shop=shop,
+                customer_id=customer_id,
+                transaction_type=tx_type,
+                total_amount=amount,
+                transaction_date=moment,
+                created_at=moment,
+                is_active=rng.random() > 0.005,
+            ))
+            lines.append(items)
+
+        transactions = Transaction.objects.bulk_create(transactions, batch_size=BATCH_SIZE)
+        TransactionItem.objects.bulk_create(
+            [
+                TransactionItem(transaction_id=tx.id, product_id=product_id, quantity=qty, price_at_sale=price)
+                for tx, items in zip(transactions, lines)
+                for product_id, (qty, price) in items.items()
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+    def generate(self, index):
+        with db_transaction.atomic():
+            shop = self.create_shop(index)
+            products, product_weights = self.create_products(shop)
+            customers, customer_weights = self.create_customers(shop)
+            self.log(f"Shop #{shop.id}: {len(products):,} products, {len(customers):,} customers")
+
+            today = local_today()
+            per_day, extra = divmod(self.transaction_count, self.days)
+            with explicit_timestamps(Transaction, 'transaction_date', 'created_at'):
+                for offset in range(self.days):
+                    count = per_day + (1 if offset < extra else 0)
+                    if count:
+                        day = today - timedelta(days=self.days - 1 - offset)
+                        self.create_day(shop, day, count, products, product_weights, customers, customer_weights)
+                    if (offset + 1) % 30 == 0:
+                        self.log(f"Shop #{shop.id}: {offset + 1}/{self.days} days")
+
+            # What sales.signals would have kept up to date row by row
+            balance = Transaction.objects.filter(
+                customer=OuterRef('pk')
+            ).values('customer').annotate(total=ledger_balance()).values('total')
+            Customer.objects.filter(shop=shop).update(
+                balance=Coalesce(Subquery(balance), Value(Decimal('0')))
+            )
+        return shop
@@ -1,3 +1,483 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+import json
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.storage import storages
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models.signals import post_init
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Shop
+from customers.models import Customer
+from products.models import Product
+from sales.balances import ledger_totals
+from sales.models import Transaction, TransactionItem
+from .models import DailyShopSummary, DailyProductSales
+from .dashboard_cache import cache_stats, reset_cache_stats
+from .statements import build_statements, generate_statements
+from .benchmarks import compare, run_suite
+from .synthetic import clear_synthetic_data, synthetic_shops
+from LedgerX.dates import day_window, local_today
+from LedgerX.instrumentation import QueryBudgetExceeded
+
+
+class IndexUsageTests(TestCase):
+    """
+    EXPLAIN the SQL the dashboard, transaction list and report views
+    actually run, and make sure the planner picks the composite indexes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        cls.shop = Shop.objects.create(user=cls.user, shop_name='Test Shop', owner_name='Owner')
+        cls.customer = Customer.objects.create(shop=cls.shop, name='Ravi', mobile='9000000000')
+        product = Product.objects.create(shop=cls.shop, name='Tea', default_price=10, stock_quantity=50)
+
+        for i in range(20):
+            sale = Transaction.objects.create(
+                shop=cls.shop,
+                customer=cls.customer,
+                transaction_type=Transaction.CREDIT,
+                total_amount=10
+            )
+            TransactionItem.objects.create(transaction=sale, product=product, quantity=1, price_at_sale=10)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def view_sql(self, name, args=(), params=None):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse(name, args=args), params).status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would otherwise always be seq-scanned
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+    def assertViewUsesIndex(self, name, fragment, index_name, args=(), params=None):
+        """The query of view `name` whose SQL contains `fragment` is planned on `index_name`."""
+        matching = [sql for sql in self.view_sql(name, args, params) if fragment in sql]
+        self.assertTrue(matching, f'{name} ran no query containing {fragment!r}')
+        for sql in matching:
+            self.assertIn(index_name, self.plan(sql), sql)
+
+    def unique_index(self, name, table):
+        # SQLite builds a UniqueConstraint into the table, as an unnamed autoindex
+        return f'sqlite_autoindex_{table}' if connection.vendor == 'sqlite' else name
+
+    def test_dashboard(self):
+        self.assertViewUsesIndex(
+            'dashboard', 'FROM "reports_dailyshopsummary"',
+            self.unique_index('daily_summary_shop_date_uniq', 'reports_dailyshopsummary')
+        )
+        self.assertViewUsesIndex('dashboard', 'FROM "products_product"', 'product_shop_active_stock_idx')
+        if connection.vendor == 'postgresql':
+            # All three index columns, not just the shop prefix. (SQLite can't
+            # match the bare boolean Django emits for is_active=True to an index column.)
+            low_stock = [sql for sql in self.view_sql('dashboard') if 'FROM "products_product"' in sql]
+            self.assertIn('is_active = true', self.plan(low_stock[0]))
+        self.assertViewUsesIndex('dashboard', 'FROM "sales_transaction"', 'txn_shop_created_idx')
+
+    def test_date_window_bounds_the_index_scan(self):
+        today = local_today().isoformat()
+        params = {'start_date': today, 'end_date': today}
+        sql = [s for s in self.view_sql('sales_report', params=params) if 'FROM "sales_transaction"' in s]
+
+        self.assertTrue(sql)
+        for statement in sql:
+            self.assertIn('txn_shop_type_date_idx', self.plan(statement))
+            if connection.vendor == 'sqlite':
+                # The window is part of the index search, not a filter on every row
+                self.assertIn('transaction_date>?', self.plan(statement))
+            self.assertNotIn('django_datetime_cast_date', statement)
+
+    def test_day_window_is_local_midnight(self):
+        start, end = day_window(date(2026, 3, 1), date(2026, 3, 31))
+        self.assertEqual(timezone.localtime(start).isoformat(), '2026-03-01T00:00:00+05:30')
+        self.assertEqual(end - start, timedelta(days=31))
+
+    def test_transaction_list(self):
+        self.assertViewUsesIndex('transaction_list', 'FROM "sales_transaction"', 'txn_shop_created_idx')
+
+    def test_product_report(self):
+        # Reads the per-product daily rollup, not TransactionItem
+        sql = self.view_sql('product_report')
+        self.assertFalse([s for s in sql if 'FROM "sales_transactionitem"' in s])
+        self.assertViewUsesIndex(
+            'product_report', 'FROM "reports_dailyproductsales"',
+            self.unique_index('daily_product_shop_date_uniq', 'reports_dailyproductsales')
+        )
+
+    def test_customer_history(self):
+        self.assertViewUsesIndex(
+            'customer_detail', 'FROM "sales_transaction"', 'txn_customer_date_idx', args=[self.customer.id]
+        )
+
+    def test_product_list(self):
+        self.assertViewUsesIndex('product_list', 'FROM "products_product"', 'product_shop_active_stock_idx')
+
+
+class DailyShopSummaryTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.client.force_login(user)
+
+    def add(self, tx_type, amount):
+        return Transaction.objects.create(
+            shop=self.shop,
+            customer=self.customer if tx_type != 'CASH' else None,
+            transaction_type=tx_type,
+            total_amount=amount
+        )
+
+    def test_rollup_tracks_writes_and_soft_deletes(self):
+        self.add('CASH', 100)
+        credit = self.add('CREDIT', 50)
+        self.add('PAYMENT', '20.50')
+
+        summary = DailyShopSummary.objects.get(shop=self.shop, date=timezone.localdate())
+        self.assertEqual((summary.sales_total, summary.collections_total), (150, Decimal('120.50')))
+        self.assertEqual(summary.transaction_count, 3)
+
+        credit.is_active = False
+        credit.save()
+        summary.refresh_from_db()
+        self.assertEqual((summary.credit_total, summary.credit_count), (0, 0))
+
+    def test_deferred_instances_can_be_deleted(self):
+        credit = self.add('CREDIT', 50)
+        self.add('CASH', 100)
+
+        Transaction.objects.only('id').get(id=credit.id).delete()
+
+        summary = DailyShopSummary.objects.get(shop=self.shop, date=timezone.localdate())
+        self.assertEqual((summary.credit_total, summary.cash_total), (0, 100))
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.balance, 0)
+
+        Customer.objects.only('id').get(id=self.customer.id).delete()
+
+    def test_plain_reads_do_no_snapshot_work(self):
+        # Lists and exports load many rows that are never saved
+        self.assertFalse(post_init.has_listeners(Transaction))
+
+    def test_dashboard_reads_rollup(self):
+        self.add('CASH', 100)
+        self.add('PAYMENT', 30)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['todays_sales'], 100)
+        self.assertEqual(response.context['todays_payments'], 130)
+
+    def test_rebuild_command_repairs_drift(self):
+        self.add('CASH', 100)
+        DailyShopSummary.objects.update(cash_total=1)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_daily_summaries', '--verify', stdout=StringIO())
+
+        call_command('rebuild_daily_summaries', stdout=StringIO())
+        self.assertEqual(DailyShopSummary.objects.get().cash_total, 100)
+
+
+class DailyProductSalesTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.tea = Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=100)
+        self.milk = Product.objects.create(shop=self.shop, name='Milk', default_price=25, stock_quantity=100)
+        self.client.force_login(user)
+
+    def sell(self, **quantities):
+        self.client.post(reverse('add_sale'), {
+            'transaction_type': 'CASH',
+            **{f'qty_{getattr(self, name).id}': qty for name, qty in quantities.items()}
+        })
+
+    def test_sales_feed_the_rollup_and_report(self):
+        self.sell(tea=3, milk=1)
+        self.sell(tea=2)
+
+        tea = DailyProductSales.objects.get(product=self.tea)
+        self.assertEqual((tea.quantity, tea.revenue), (5, Decimal('50')))
+
+        report = list(self.client.get(reverse('product_report')).context['report'])
+        self.assertEqual([(r['product__name'], r['total_quantity']) for r in report], [('Tea', 5), ('Milk', 1)])
+
+    def test_soft_deleted_sale_leaves_rollup(self):
+        self.sell(tea=3)
+        sale = Transaction.objects.get()
+        sale.is_active = False
+        sale.save()
+
+        self.assertEqual(DailyProductSales.objects.get(product=self.tea).quantity, 0)
+        call_command('rebuild_product_sales', '--verify', stdout=StringIO())
+
+    def test_hard_deleted_sale_is_reversed(self):
+        self.sell(tea=3, milk=1)
+        self.sell(tea=2)
+        Transaction.objects.order_by('id').first().delete()
+
+        tea = DailyProductSales.objects.get(product=self.tea)
+        milk = DailyProductSales.objects.get(product=self.milk)
+        self.assertEqual((tea.quantity, tea.revenue), (2, Decimal('20')))
+        self.assertEqual((milk.quantity, milk.revenue), (0, Decimal('0')))
+        call_command('rebuild_product_sales', '--verify', stdout=StringIO())
+
+
+class DashboardCacheTests(TestCase):
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        reset_cache_stats()
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.client.force_login(user)
+
+    def test_second_visit_is_served_from_cache(self):
+        Transaction.objects.create(shop=self.shop, transaction_type='CASH', total_amount=100)
+        self.client.get(reverse('dashboard'))
+
+        with self.assertNumQueries(3):  # session, user and shop only
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.context['todays_sales'], 100)
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(cache_stats()['misses'], 1)
+
+    def test_writes_invalidate(self):
+        self.client.get(reverse('dashboard'))
+
+        Transaction.objects.create(shop=self.shop, transaction_type='CASH', total_amount=40)
+        Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=2)
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['todays_sales'], 40)
+        self.assertEqual(response.context['total_customers'], 1)
+        self.assertEqual(response.context['low_stock_count'], 1)
+        self.assertEqual(len(response.context['recent_activities']), 2)
+
+    def test_sync_batch_invalidates(self):
+        self.client.get(reverse('dashboard'))
+
+        self.client.post(
+            reverse('sync_transactions'),
+            data=json.dumps({'transactions': [
+                {'idempotency_key': 'k1', 'transaction_type': 'PAYMENT', 'customer_id': Customer.objects.create(
+                    shop=self.shop, name='Ravi', mobile='9000000000').id, 'total_amount': '25'},
+            ]}),
+            content_type='application/json'
+        )
+
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['todays_payments'], 25)
+
+
+class StatementTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.tea = Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=100)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(STORAGES={
+            **settings.STORAGES,
+            'statements': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                'OPTIONS': {'location': directory.name},
+            },
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def add(self, customer, tx_type, amount, day, qty=0):
+        tx = Transaction.objects.create(shop=self.shop, customer=customer, transaction_type=tx_type, total_amount=amount)
+        if qty:
+            TransactionItem.objects.create(transaction=tx, product=self.tea, quantity=qty, price_at_sale=10)
+        Transaction.objects.filter(id=tx.id).update(transaction_date=day_window(day)[0] + timedelta(hours=10))
+        return tx
+
+    def test_statement_lines_and_balances(self):
+        ravi = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.add(ravi, 'CREDIT', 100, date(2026, 8, 20))
+        self.add(ravi, 'CREDIT', 30, date(2026, 9, 2), qty=3)
+        self.add(ravi, 'PAYMENT', 50, date(2026, 9, 15))
+        self.add(ravi, 'CREDIT', 70, date(2026, 10, 1))
+        Customer.objects.create(shop=self.shop, name='Idle', mobile='9000000001')
+
+        statements = build_statements(self.shop, '2026-09', list(Customer.objects.order_by('id')))
+
+        self.assertEqual(len(statements), 1)    # nothing to say to 'Idle'
+        statement = statements[0]
+        self.assertEqual(statement['opening'], 100)
+        self.assertEqual([line['balance'] for line in statement['lines']], [130, 80])
+        self.assertEqual(statement['lines'][0]['particulars'], 'Credit sale: Tea x 3')
+        self.assertEqual(statement['closing'], 80)
+
+    def test_queries_per_chunk_are_constant(self):
+        for i in range(30):
+            customer = Customer.objects.create(shop=self.shop, name=f'C{i}', mobile=f'90000000{i:02d}')
+            self.add(customer, 'CREDIT', 10, date(2026, 9, 5), qty=1)
+            self.add(customer, 'PAYMENT', 5, date(2026, 9, 6))
+
+        customers = list(Customer.objects.order_by('id'))
+        with self.assertNumQueries(3):
+            self.assertEqual(len(build_statements(self.shop, '2026-09', customers)), 30)
+
+    def test_command_writes_pdfs(self):
+        for i in range(3):
+            customer = Customer.objects.create(shop=self.shop, name=f'C{i}', mobile=f'90000000{i:02d}')
+            self.add(customer, 'CREDIT', 10, date(2026, 9, 5), qty=1)
+
+        out = StringIO()
+        call_command('generate_statements', '--month', '2026-09', '--workers', '0', '--chunk-size', '2', stdout=out)
+        self.assertIn('2/3 customers', out.getvalue())
+        self.assertIn('Wrote 3 statement(s)', out.getvalue())
+
+        # Re-running replaces the files rather than adding copies
+        self.assertEqual(generate_statements([self.shop], '2026-09', workers=0), 3)
+
+        storage = storages['statements']
+        _, files = storage.listdir(f'statements/{self.shop.id}/2026-09')
+        self.assertEqual(len(files), 3)
+        with storage.open(f'statements/{self.shop.id}/2026-09/{files[0]}') as f:
+            self.assertEqual(f.read(4), b'%PDF')
+
+    def test_process_pool(self):
+        customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.add(customer, 'PAYMENT', 10, date(2026, 9, 5))
+
+        self.assertEqual(generate_statements([self.shop], '2026-09', workers=2), 1)
+
+    def test_bad_month(self):
+        with self.assertRaises(CommandError):
+            call_command('generate_statements', '--month', 'September', stdout=StringIO())
+
+
+class BenchmarkSuiteTests(TestCase):
+
+    def setUp(self):
+        call_command(
+            'generate_synthetic_data',
+            '--customers', '20', '--products', '10', '--transactions', '300', '--days', '10',
+            stdout=StringIO()
+        )
+        self.shop = synthetic_shops().get()
+
+    def test_generated_shop_is_consistent(self):
+        self.assertEqual(Customer.objects.filter(shop=self.shop).count(), 20)
+        self.assertEqual(Transaction.objects.filter(shop=self.shop).count(), 300)
+        self.assertTrue(TransactionItem.objects.filter(transaction__shop=self.shop).exists())
+
+        # Balances and rollups match what the signals would have produced
+        customer = Customer.objects.filter(shop=self.shop).order_by('-balance').first()
+        self.assertEqual(customer.balance, ledger_totals(customer.id))
+        call_command('rebuild_daily_summaries', '--verify', stdout=StringIO())
+        call_command('rebuild_product_sales', '--verify', stdout=StringIO())
+
+        clear_synthetic_data()
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(Shop.objects.exists())
+
+    def test_suite_covers_the_views_and_rolls_back_writes(self):
+        transactions = Transaction.objects.count()
+
+        report = run_suite(self.shop, repeat=1)
+
+        self.assertEqual(set(report['results']), {
+            'dashboard', 'dashboard_cached', 'transaction_list', 'customer_report',
+            'visual_reports', 'customer_detail', 'customer_ledger_qr', 'add_sale',
+            'transaction_detail', 'qr_transaction_detail',
+        })
+        for name, result in report['results'].items():
+            # add_sale redirects after the POST; everything else is a plain GET
+            self.assertEqual(result['status'], 302 if name == 'add_sale' else 200, name)
+        self.assertEqual(Transaction.objects.count(), transactions)
+        self.assertEqual(report['meta']['shop']['transactions'], transactions)
+
+    def test_compare_flags_more_queries(self):
+        baseline = {'results': {'dashboard': {'status': 200, 'queries': 3, 'median_ms': 10}}}
+        current = {'results': {'dashboard': {'status': 200, 'queries': 4, 'median_ms': 9}}}
+
+        self.assertEqual(compare(baseline, current), ['dashboard: 3 -> 4 queries'])
+        self.assertEqual(compare(current, baseline), [])
+
+
+class RequestMetricsTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user('owner', 'owner@example.com', 'pass')
+        self.shop = Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+        self.client.force_login(user)
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('ledgerx.requests', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", render;dur=[\d.]+, total;dur=[\d.]+$')
+
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(line['view'], 'dashboard')
+        self.assertEqual(line['query_budget'], 10)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['render_ms'], 0)
+        self.assertTrue(line['slowest_sql'].startswith('SELECT'))
+
+        self.assertFalse(line['streaming'])
+
+    def test_server_timing_is_off_outside_debug(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('dashboard')))
+
+    @override_settings(SERVER_TIMING_HEADER=True, QUERY_BUDGETS={'export_transactions': 0})
+    def test_streaming_responses_are_not_budgeted(self):
+        # The rows are fetched while the body streams, after the middleware returns
+        with self.assertLogs('ledgerx.requests', 'INFO') as logs:
+            response = self.client.get(reverse('export_transactions'))
+            b''.join(response.streaming_content)
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertTrue(json.loads(logs.records[-1].getMessage())['streaming'])
+
+    @override_settings(QUERY_BUDGETS={'dashboard': 1})
+    def test_over_budget_fails_in_tests(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'dashboard ran'):
+            self.client.get(reverse('dashboard'))
+
+    @override_settings(QUERY_BUDGETS={'dashboard': 1}, QUERY_BUDGET_MODE='log')
+    def test_over_budget_logs_in_production(self):
+        with self.assertLogs('ledgerx.requests', 'WARNING'):
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+    def test_sales_report_loads_customers_with_the_sales(self):
+        # Used to run one query per row for txn.customer
+        for i in range(10):
+            customer = Customer.objects.create(shop=self.shop, name=f'C{i}', mobile=f'90000000{i:02d}')
+            Transaction.objects.create(shop=self.shop, customer=customer, transaction_type='CREDIT', total_amount=10)
+
+        response = self.client.get(reverse('sales_report'))
+        self.assertEqual(len(response.context['transactions']), 10)
 
-# Create your tests here.
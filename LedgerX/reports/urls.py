@@ -4,8 +4,10 @@ from . import views
 urlpatterns = [
     path('', views.reports_home, name='reports_home'),
     path('sales/', views.sales_report, name='sales_report'),
+    path('sales/export/', views.export_sales_report, name='export_sales_report'),
     path('products/', views.product_report, name='product_report'),
     path('customers/', views.customer_report, name='customer_report'),
     path('visual-analytics/', views.visual_reports, name='visual_reports'),
+    path('cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
 ]
 
@@ -1,8 +1,8 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 
 from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Sum,Q, Count, Avg, F, ExpressionWrapper, fields
 from django.db import models
 from django.utils import timezone
@@ -12,94 +12,56 @@ import json
 from products.models import Product  # 🟢 Added Import
 
 from sales.models import Transaction, TransactionItem
+from sales.balances import outstanding_customers, advance_customers, top_debtors
 from customers.models import Customer
-
-from itertools import chain
-from operator import attrgetter
+from .rollups import summaries_between, top_products
+from .dashboard_cache import get_dashboard, cache_stats
+from sales.exports import SALES_REPORT_HEADER, sales_report_rows
+from LedgerX.dates import local_today, parse_day, window_filter
+from LedgerX.exports import streaming_export
+from LedgerX.instrumentation import query_budget
 
 
 # Create your views here.
+@query_budget(10)
 @login_required
 def dashboard(request):
     """
     Main dashboard: Summary Cards + Recent Activity.
     Optimized to show actionable metrics (Low Stock, Active Customers) 
     instead of heavy financial calculations.
+    Served from the per-shop cache; writes invalidate it (reports.signals).
     """
-    shop = request.user.shop
-    today = timezone.localtime(timezone.now()).date()
-
-    # 1. Today's Sales (Invoice Value: CASH + CREDIT)
-    todays_sales = Transaction.objects.filter(
-        shop=shop,
-        transaction_type__in=['CASH', 'CREDIT'],
-        transaction_date__date=today
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-    # 2. Today's Inflow (Money In: PAYMENT + CASH)
-    todays_payments = Transaction.objects.filter(
-        shop=shop,
-        transaction_type__in=['PAYMENT', 'CASH'],
-        transaction_date__date=today
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-    # 3. 🟢 NEW METRICS (Actionable & Fast)
-    
-    # Low Stock: Count products with less than 10 quantity
-    low_stock_count = Product.objects.filter(
-        shop=shop, 
-        stock_quantity__lt=10
-    ).count()
-    
-    # Total Active Customers
-    total_customers = Customer.objects.filter(
-        shop=shop, 
-        is_active=True
-    ).count()
-
-    # 4. Recent Activity (Transactions + New Customers mixed)
-    recent_txns = Transaction.objects.filter(shop=shop).select_related('customer').order_by('-created_at')[:5]
-    recent_custs = Customer.objects.filter(shop=shop).order_by('-created_at')[:5]
-
-    # Combine and sort by newest first
-    recent_activities = sorted(
-        chain(recent_txns, recent_custs),
-        key=attrgetter('created_at'),
-        reverse=True
-    )[:5]
-
-
-
     return render(
         request,
         'reports/dashboard.html',
-        {
-            'todays_sales': todays_sales,
-            'todays_payments': todays_payments,
-            'low_stock_count': low_stock_count,      # 🟢 New Variable
-            'total_customers': total_customers,      # 🟢 New Variable
-            'recent_activities': recent_activities,
-        }
+        get_dashboard(request.user.shop)
     )
 
+
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def dashboard_cache_stats(request):
+    """Hit / miss counters of the dashboard cache (this worker process)."""
+    return JsonResponse(cache_stats())
+
+@query_budget(6)
 @login_required
 def customer_report(request):
     shop = request.user.shop
     # Check filter type: 'outstanding' (default) or 'advance'
     report_type = request.GET.get('type', 'outstanding') 
 
-    customers = Customer.objects.filter(shop=shop, is_active=True)
-    report = []
-
-    for customer in customers:
-        credit = Transaction.objects.filter(customer=customer, transaction_type='CREDIT').aggregate(total=Sum('total_amount'))['total'] or 0
-        payment = Transaction.objects.filter(customer=customer, transaction_type='PAYMENT').aggregate(total=Sum('total_amount'))['total'] or 0
-        balance = credit - payment
+    # Stored balances: filtering and sorting happen in the database, on an index
+    if report_type == 'advance':
+        customers = advance_customers(shop)
+    else:
+        customers = outstanding_customers(shop)
 
-        if report_type == 'outstanding' and balance > 0:
-            report.append({'customer': customer, 'balance': balance})
-        elif report_type == 'advance' and balance < 0:
-            report.append({'customer': customer, 'balance': abs(balance)})
+    report = [
+        {'customer': customer, 'balance': abs(customer.balance)}
+        for customer in customers
+    ]
 
     return render(
         request,
@@ -110,27 +72,34 @@ def customer_report(request):
         }
     )
 
-@login_required
-def sales_report(request):
-    """
-    Sales report between selected dates.
-    Includes CASH + CREDIT transactions only.
-    """
-
-    shop = request.user.shop
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
+def sales_report_transactions(shop, start_date=None, end_date=None):
+    """CASH + CREDIT sales, newest first, optionally within local days."""
     transactions = Transaction.objects.filter(
         shop=shop,
         transaction_type__in=['CASH', 'CREDIT']
-    ).order_by('-transaction_date')
+    ).select_related('customer').order_by('-transaction_date')
 
     if start_date and end_date:
+        # Index range scan on (shop, type, transaction_date), no per-row tz cast
         transactions = transactions.filter(
-            transaction_date__date__range=[start_date, end_date]
+            **window_filter('transaction_date', start_date, end_date)
         )
 
+    return transactions
+
+
+@query_budget(6)
+@login_required
+def sales_report(request):
+    """
+    Sales report between selected dates.
+    Includes CASH + CREDIT transactions only.
+    """
+
+    start_date = parse_day(request.GET.get('start_date'))
+    end_date = parse_day(request.GET.get('end_date'))
+    transactions = sales_report_transactions(request.user.shop, start_date, end_date)
+
     total_sales = transactions.aggregate(
         total=Sum('total_amount')
     )['total'] or 0
@@ -148,28 +117,38 @@ def sales_report(request):
 
 
 @login_required
-def product_report(request):
-    shop = request.user.shop
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+def export_sales_report(request):
+    """The sales report for the selected dates, streamed as CSV / XLSX."""
+    start_date = parse_day(request.GET.get('start_date'))
+    end_date = parse_day(request.GET.get('end_date'))
+    transactions = sales_report_transactions(request.user.shop, start_date, end_date)
+
+    filename = 'sales_report'
+    if start_date and end_date:
+        filename += f'_{start_date}_{end_date}'
 
-    items = TransactionItem.objects.filter(
-        transaction__shop=shop,
-        transaction__transaction_type__in=['CASH', 'CREDIT']
+    return streaming_export(
+        request,
+        filename,
+        SALES_REPORT_HEADER,
+        sales_report_rows(transactions),
+        sheet_name='Sales'
     )
 
-    if start_date and end_date:
-        items = items.filter(
-            transaction__transaction_date__date__range=[start_date, end_date]
-        )
 
-    # 🟢 CHANGED: Added 'product__id' to values() so we can link to details
-    report = items.values(
-        'product__name', 
-        'product__id' 
-    ).annotate(
-        total_quantity=Sum('quantity')
-    ).order_by('-total_quantity')
+@query_budget(6)
+@login_required
+def product_report(request):
+    shop = request.user.shop
+    start_date = parse_day(request.GET.get('start_date'))
+    end_date = parse_day(request.GET.get('end_date'))
+
+    # 🟢 Range scan over the per-product daily rollup (keeps 'product__id' for links)
+    report = top_products(
+        shop,
+        start=start_date if start_date and end_date else None,
+        end=end_date if start_date and end_date else None,
+    )
 
     return render(
         request,
@@ -192,55 +171,45 @@ def reports_home(request):
 
 
 
+@query_budget(10)
 @login_required
 def visual_reports(request):
     shop = request.user.shop
-    today = timezone.localtime(timezone.now()).date()
+    today = local_today()
+
+    # Daily liquidity comes from the rollup: one small query for all three windows
+    summaries = list(summaries_between(shop))
 
     def get_stats(days=None):
         """Helper to fetch stats. None = All Time."""
-        filters = Q(shop=shop)
-        if days:
-            start_date = today - timedelta(days=days)
-            filters &= Q(transaction_date__date__gte=start_date)
+        start_date = today - timedelta(days=days) if days else None
 
         # 1. Liquidity Data
-        liq = Transaction.objects.filter(filters).values('transaction_date__date').annotate(
-            sales=Sum('total_amount', filter=Q(transaction_type__in=['CASH', 'CREDIT'])),
-            collections=Sum('total_amount', filter=Q(transaction_type__in=['CASH', 'PAYMENT']))
-        ).order_by('transaction_date__date')
-        
-        # 2. Products Data
-        prod = TransactionItem.objects.filter(
-            transaction__shop=shop, 
-            transaction__transaction_date__date__gte=today - timedelta(days=days) if days else timezone.make_aware(timezone.datetime.min).date()
-        ).values('product__name').annotate(qty=Sum('quantity')).order_by('-qty')[:5]
-            
+        liq = [s for s in summaries if start_date is None or s.date >= start_date]
+
+        # 2. Products Data (top 5 from the per-product rollup)
+        prod = top_products(shop, start=start_date, limit=5)
+
         return {
-            'labels': [l['transaction_date__date'].strftime('%d %b') for l in liq],
-            'sales': [float(l['sales'] or 0) for l in liq],
-            'collections': [float(l['collections'] or 0) for l in liq],
+            'labels': [s.date.strftime('%d %b') for s in liq],
+            'sales': [float(s.sales_total) for s in liq],
+            'collections': [float(s.collections_total) for s in liq],
             'p_names': [p['product__name'] for p in prod],
-            'p_qtys': [int(p['qty'] or 0) for p in prod]
+            'p_qtys': [int(p['total_quantity'] or 0) for p in prod]
         }
 
-    # Fetch debt data
-    customers = Customer.objects.filter(shop=shop, is_active=True)
-    debt_names, debt_values = [], []
-    for c in customers:
-        credit = Transaction.objects.filter(customer=c, transaction_type='CREDIT').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        pay = Transaction.objects.filter(customer=c, transaction_type='PAYMENT').aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        bal = float(credit - pay)
-        if bal > 0:
-            debt_names.append(c.name)
-            debt_values.append(bal)
+    # Fetch debt data (top 5 debtors, ORDER BY / LIMIT in SQL)
+    debtors = list(top_debtors(shop, limit=5))
+
+    debt_names = [c.name for c in debtors]
+    debt_values = [float(c.balance) for c in debtors]
 
     context = {
         'weekly_json': json.dumps(get_stats(7)),
         'monthly_json': json.dumps(get_stats(30)),
         'all_time_json': json.dumps(get_stats(None)),
-        'debt_names': json.dumps(debt_names[:5]),
-        'debt_values': json.dumps(debt_values[:5]),
+        'debt_names': json.dumps(debt_names),
+        'debt_values': json.dumps(debt_values),
     }
     return render(request, 'reports/visual_reports.html', context)
 
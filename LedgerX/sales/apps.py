@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SalesConfig(AppConfig):
     name = 'sales'
+
+    def ready(self):
+        # Keeps Customer.balance in sync with CREDIT / PAYMENT writes
+        from . import signals  # noqa: F401
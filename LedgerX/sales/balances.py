@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.db.models import Sum, Q, F, Case, When, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from .models import Transaction
+from customers.models import Customer
+
+
+def ledger_balance(prefix=''):
+    """
+    Conditional SUM of CREDIT minus PAYMENT over active transactions.
+    `prefix` is the path to Transaction ('transactions__' from Customer).
+    """
+    amount = F(f'{prefix}total_amount')
+    money = DecimalField(max_digits=12, decimal_places=2)
+
+    return Coalesce(
+        Sum(
+            Case(
+                When(**{f'{prefix}transaction_type': Transaction.CREDIT}, then=amount),
+                When(**{f'{prefix}transaction_type': Transaction.PAYMENT}, then=-amount),
+                default=Value(0),
+                output_field=money,
+            ),
+            filter=Q(**{f'{prefix}is_active': True}),
+        ),
+        Value(Decimal('0')),
+        output_field=money,
+    )
+
+
+def customers_with_balance(shop):
+    """
+    Active customers of a shop. Reports filter and sort on the stored
+    Customer.balance (indexed, kept in sync by sales.signals), never on
+    a SUM over the ledger.
+    """
+    return Customer.objects.filter(shop=shop, is_active=True)
+
+
+def outstanding_customers(shop):
+    """Customers who owe money, biggest debt first."""
+    return customers_with_balance(shop).filter(
+        balance__gt=0
+    ).order_by('-balance', 'name')
+
+
+def advance_customers(shop):
+    """Customers who have paid in advance, biggest advance first."""
+    return customers_with_balance(shop).filter(
+        balance__lt=0
+    ).order_by('balance', 'name')
+
+
+def top_debtors(shop, limit=5):
+    """ORDER BY / LIMIT done in the database."""
+    return outstanding_customers(shop)[:limit]
+
+
+def ledger_totals(customer_id):
+    """
+    Outstanding balance of one customer straight from the raw transactions.
+    """
+    return Transaction.objects.filter(
+        customer_id=customer_id
+    ).aggregate(balance=ledger_balance())['balance']
+
+
+def recompute_customer_balance(customer_id):
+    """
+    Re-derives and stores one customer's balance.
+    Used when the incremental path can't know the previous state.
+    """
+    if not customer_id:
+        return None
+
+    balance = ledger_totals(customer_id)
+    Customer.objects.filter(id=customer_id).update(balance=balance)
+    return balance
+
+
+def apply_balance_deltas(deltas):
+    """
+    Adds {customer_id: delta} to the stored balances in ONE update.
+    For bulk writes, which skip the per-row signals.
+    """
+    deltas = {cid: d for cid, d in deltas.items() if cid and d}
+    if not deltas:
+        return
+
+    money = DecimalField(max_digits=12, decimal_places=2)
+    Customer.objects.filter(id__in=deltas).update(
+        balance=F('balance') + Case(
+            *[When(id=cid, then=Value(d, output_field=money)) for cid, d in deltas.items()],
+            default=Value(Decimal('0'), output_field=money),
+            output_field=money,
+        )
+    )
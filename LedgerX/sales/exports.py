@@ -0,0 +1,91 @@
+"""
+Row generators for the transaction, ledger and sales-report exports.
+
+Each one walks its queryset with .iterator(chunk_size=CHUNK_SIZE) and
+yields plain lists, so LedgerX.exports can stream them at constant memory.
+"""
+
+from decimal import Decimal
+
+from LedgerX.exports import CHUNK_SIZE
+from .models import Transaction
+from .signals import ledger_effect
+
+
+TRANSACTION_HEADER = [
+    'Transaction #', 'Date', 'Type', 'Customer', 'Mobile', 'Status',
+    'Product', 'Quantity', 'Price (₹)', 'Line Total (₹)', 'Transaction Total (₹)',
+]
+
+LEDGER_HEADER = ['Date', 'Transaction #', 'Type', 'Amount (₹)', 'Balance Change (₹)', 'Running Balance (₹)']
+
+SALES_REPORT_HEADER = ['Date', 'Transaction #', 'Type', 'Customer', 'Amount (₹)']
+
+
+def transaction_rows(transactions):
+    """
+    One row per sold item (payments get a single row without items).
+    Items and products are prefetched per chunk: 3 queries per CHUNK_SIZE sales.
+    """
+    transactions = transactions.select_related('customer').prefetch_related('items__product')
+
+    for tx in transactions.iterator(chunk_size=CHUNK_SIZE):
+        base = [
+            tx.id,
+            tx.transaction_date,
+            tx.get_transaction_type_display(),
+            tx.customer.name if tx.customer else '',
+            tx.customer.mobile if tx.customer else '',
+            'Active' if tx.is_active else 'Deleted',
+        ]
+
+        items = tx.items.all()
+        if not items:
+            yield base + ['', '', '', '', tx.total_amount]
+            continue
+
+        for item in items:
+            yield base + [
+                item.product.name,
+                item.quantity,
+                item.price_at_sale,
+                item.get_total_price(),
+                tx.total_amount,
+            ]
+
+
+def ledger_rows(customer):
+    """The customer's active transactions, oldest first, with a running balance."""
+    transactions = Transaction.objects.filter(
+        customer=customer,
+        is_active=True
+    ).order_by('transaction_date', 'id')
+
+    balance = Decimal('0')
+    for tx in transactions.iterator(chunk_size=CHUNK_SIZE):
+        effect = ledger_effect(tx)
+        balance += effect
+        yield [
+            tx.transaction_date,
+            tx.id,
+            tx.get_transaction_type_display(),
+            tx.total_amount,
+            effect,
+            balance,
+        ]
+
+
+def sales_report_rows(transactions):
+    """The sales report's rows plus a closing total row."""
+    total = Decimal('0')
+    for tx in transactions.select_related('customer').iterator(chunk_size=CHUNK_SIZE):
+        total += tx.total_amount
+        yield [
+            tx.transaction_date,
+            tx.id,
+            tx.get_transaction_type_display(),
+            tx.customer.name if tx.customer else 'Cash Sale',
+            tx.total_amount,
+        ]
+
+    yield ['', '', '', 'Total', total]
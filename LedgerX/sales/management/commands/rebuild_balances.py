@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction as db_transaction
+
+from customers.models import Customer
+from sales.balances import apply_balance_deltas, ledger_balance
+
+
+class Command(BaseCommand):
+    help = "Rebuilds (or just verifies) Customer.balance from the raw CREDIT / PAYMENT transactions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', type=int, help='Only this shop id')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report drift without writing anything (exits non-zero on drift)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        customers = Customer.objects.all()
+        if options['shop']:
+            customers = customers.filter(shop_id=options['shop'])
+
+        # True balance from the ledger, stored balance alongside, in one grouped query
+        customers = customers.annotate(
+            ledger_balance=ledger_balance('transactions__')
+        ).only('id', 'name', 'balance').order_by('id')
+
+        drifted = []
+        checked = 0
+        for customer in customers.iterator(chunk_size=options['batch_size']):
+            checked += 1
+            if customer.balance != customer.ledger_balance:
+                self.stdout.write(
+                    f"#{customer.id} {customer.name}: stored {customer.balance}, ledger {customer.ledger_balance}"
+                )
+                drifted.append((customer.id, customer.ledger_balance - customer.balance))
+
+        self.stdout.write(f"Checked {checked} customers, {len(drifted)} out of sync.")
+
+        if options['verify']:
+            if drifted:
+                raise CommandError(f"{len(drifted)} customer balances have drifted.")
+            self.stdout.write(self.style.SUCCESS('All balances match the ledger.'))
+            return
+
+        # Write the corrections as deltas (balance = balance + fix), so sales
+        # recorded since the read above are kept rather than overwritten
+        batch_size = options['batch_size']
+        with db_transaction.atomic():
+            for start in range(0, len(drifted), batch_size):
+                apply_balance_deltas(dict(drifted[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drifted)} balances."))
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 17:46
+
+from django.db import migrations
+from django.db.models import Sum, Q
+
+
+def backfill_balances(apps, schema_editor):
+    Customer = apps.get_model('customers', 'Customer')
+    Transaction = apps.get_model('sales', 'Transaction')
+
+    rows = Transaction.objects.filter(
+        is_active=True,
+        customer__isnull=False
+    ).values('customer_id').annotate(
+        credit=Sum('total_amount', filter=Q(transaction_type='CREDIT')),
+        payment=Sum('total_amount', filter=Q(transaction_type='PAYMENT')),
+    )
+
+    for row in rows:
+        Customer.objects.filter(id=row['customer_id']).update(
+            balance=(row['credit'] or 0) - (row['payment'] or 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0002_alter_transaction_transaction_date'),
+        ('customers', '0003_customer_balance'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-18 17:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_shop_upi_id'),
+        ('customers', '0004_composite_indexes'),
+        ('products', '0003_composite_indexes'),
+        ('sales', '0003_backfill_customer_balance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='customers.customer'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='shop',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='accounts.shop'),
+        ),
+        migrations.AlterField(
+            model_name='transactionitem',
+            name='transaction',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='sales.transaction'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['shop', 'transaction_type', 'transaction_date'], name='txn_shop_type_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['shop', '-created_at'], name='txn_shop_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['customer', 'transaction_date'], name='txn_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['customer', 'transaction_type'], name='txn_active_cust_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transactionitem',
+            index=models.Index(fields=['transaction', 'product'], name='txnitem_txn_product_idx'),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from types import SimpleNamespace
+
 from django.db import models
 from accounts.models import Shop
 from customers.models import Customer
@@ -26,6 +28,7 @@ class Transaction(models.Model):
     shop = models.ForeignKey(
         Shop,
         on_delete=models.CASCADE,
+        db_index=False,  # covered by the composite indexes in Meta
         related_name='transactions'
     )
 
@@ -35,6 +38,7 @@ class Transaction(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_index=False,  # covered by the composite indexes in Meta
         related_name='transactions'
     )
 
@@ -54,9 +58,85 @@ class Transaction(models.Model):
     # Soft delete (rarely used, but safe)
     is_active = models.BooleanField(default=True)
 
+    # Client-generated key for offline POS sync, so retries never double-post
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['shop', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='txn_unique_idempotency_key'
+            ),
+        ]
+        indexes = [
+            # Dashboard / sales & product reports: shop + type + date window
+            models.Index(
+                fields=['shop', 'transaction_type', 'transaction_date'],
+                name='txn_shop_type_date_idx'
+            ),
+            # Transaction list: newest first per shop
+            models.Index(
+                fields=['shop', '-created_at'],
+                name='txn_shop_created_idx'
+            ),
+            # Customer detail / QR ledger: one customer's history by date
+            models.Index(
+                fields=['customer', 'transaction_date'],
+                name='txn_customer_date_idx'
+            ),
+            # Balances only ever sum active CREDIT / PAYMENT rows
+            models.Index(
+                fields=['customer', 'transaction_type'],
+                condition=models.Q(is_active=True),
+                name='txn_active_cust_type_idx'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} - {self.total_amount}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        loaded = dict(zip(field_names, values))
+        instance = super().from_db(db, field_names, values)
+        # The row as read. sales.signals / reports.signals diff a save or delete
+        # against it; nothing is computed until one of those happens.
+        instance._loaded = loaded
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # The post_save receivers have seen the old row; from now on this is it
+        update_fields = kwargs.get('update_fields')
+        self._loaded = {
+            **getattr(self, '_loaded', {}),
+            **{
+                f.attname: self.__dict__[f.attname]
+                for f in self._meta.concrete_fields
+                if f.attname in self.__dict__ and (update_fields is None or f.name in update_fields)
+            },
+        }
+
+    def loaded_state(self, fields, fetch=False):
+        """
+        `fields` (attnames) as they are in the database row, as a namespace,
+        or None if unknown: a new instance, or deferred fields without
+        `fetch`. fetch=True reads the missing ones (one query).
+        """
+        loaded = getattr(self, '_loaded', None)
+        if loaded is None:
+            return None
+        missing = [f for f in fields if f not in loaded]
+        if missing and fetch:
+            row = Transaction.objects.filter(pk=self.pk).values(*missing).first()
+            if row is not None:
+                loaded.update(row)
+                missing = []
+        if missing:
+            return None
+        return SimpleNamespace(**{f: loaded[f] for f in fields})
+
 
 class TransactionItem(models.Model):
     """
@@ -67,6 +147,7 @@ class TransactionItem(models.Model):
     transaction = models.ForeignKey(
         Transaction,
         on_delete=models.CASCADE,
+        db_index=False,  # covered by the composite indexes in Meta
         related_name='items'
     )
 
@@ -81,6 +162,15 @@ class TransactionItem(models.Model):
     # Snapshot price at time of sale
     price_at_sale = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        indexes = [
+            # Product report joins items to their sale and product
+            models.Index(
+                fields=['transaction', 'product'],
+                name='txnitem_txn_product_idx'
+            ),
+        ]
+
     def get_total_price(self):
         return self.price_at_sale * self.quantity
 
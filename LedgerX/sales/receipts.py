@@ -0,0 +1,141 @@
+"""
+One loader for everything a receipt / transaction detail page shows.
+
+load_receipt() fetches a transaction in three queries, whatever its size:
+
+    1. the transaction JOIN shop
+    2. its items JOIN product, with line_total (quantity * price_at_sale)
+       computed by the database
+    3. its customer JOIN shop
+
+`transaction.items.all()` then reads the prefetched rows. Receipts don't
+change once written, so 1 and 2 are cached per transaction in
+settings.RECEIPT_CACHE_ALIAS; sales.signals drops the entry when the
+transaction is saved or deleted (e.g. soft-deleted). The customer and shop
+are read fresh every time (one primary-key lookup), so editing either never
+has to touch the receipts of a whole history. Product edits (name, photo)
+show up once the entry expires after RECEIPT_CACHE_TIMEOUT.
+
+The public QR receipt page goes one step further and caches its rendered
+HTML for good, under a version made of three random tokens kept in the same
+cache: one for the transaction, one for its customer and one for its shop.
+sales.signals replaces the transaction's token on every save or delete
+(soft deletes included) and the customer's / shop's when they are edited,
+so the old page and ETag are simply never read again. The QR token already
+names the customer and shop, so a repeat scan is cache reads only, or a
+304, with no query. Versions must be seen by every worker, so
+RECEIPT_CACHE_ALIAS has to be a shared cache (Redis, file) when running
+more than one process.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch
+
+from customers.models import Customer
+from .models import Transaction, TransactionItem
+
+
+PAGE_RENDER_VERSION = 1     # bump if qr/transaction_detail.html changes
+
+
+def _cache():
+    return caches[settings.RECEIPT_CACHE_ALIAS]
+
+
+def receipt_key(transaction_id):
+    return f'receipt:v1:{transaction_id}'
+
+
+def page_key(transaction_id, version):
+    return f'receipt-page:v{PAGE_RENDER_VERSION}:{transaction_id}:{version}'
+
+
+def receipt_items():
+    return TransactionItem.objects.select_related('product').annotate(
+        line_total=ExpressionWrapper(
+            F('quantity') * F('price_at_sale'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+    ).order_by('id')
+
+
+def fetch_receipt(transaction_id):
+    """Queries 1 and 2, uncached. None if there is no such transaction."""
+    return (
+        Transaction.objects
+        .select_related('shop')
+        .prefetch_related(Prefetch('items', queryset=receipt_items()))
+        .filter(id=transaction_id)
+        .first()
+    )
+
+
+def attach_customer(transaction):
+    customer = None
+    if transaction.customer_id:
+        customer = Customer.objects.select_related('shop').filter(id=transaction.customer_id).first()
+    if customer is not None and customer.shop_id == transaction.shop_id:
+        # Fresher than the cached one
+        transaction.shop = customer.shop
+    transaction.customer = customer
+    return transaction
+
+
+def load_receipt(transaction_id):
+    """
+    Transaction with customer, shop and items (+ products, line_total),
+    the transaction part from the cache when possible. None if it doesn't
+    exist; callers check ownership (shop / customer) themselves.
+    """
+    key = receipt_key(transaction_id)
+    transaction = _cache().get(key)
+    if transaction is None:
+        transaction = fetch_receipt(transaction_id)
+        if transaction is None:
+            return None
+        # Cached before the customer is attached: it isn't part of the entry
+        _cache().set(key, transaction, settings.RECEIPT_CACHE_TIMEOUT)
+    return attach_customer(transaction)
+
+
+def invalidate_receipts(transaction_ids):
+    _cache().delete_many([receipt_key(tid) for tid in transaction_ids])
+
+
+def version_key(kind, object_id):
+    return f'receipt-version:{kind}:{object_id}'
+
+
+def receipt_version(transaction_id, customer_id, shop_id):
+    """Current version of a public receipt page, from the cache only."""
+    keys = [version_key('transaction', transaction_id), version_key('customer', customer_id),
+            version_key('shop', shop_id)]
+    found = _cache().get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Never a fixed default: an evicted token must not bring an old page back
+            _cache().add(key, uuid.uuid4().hex, timeout=None)
+            found[key] = _cache().get(key)
+    return '.'.join(found[key] for key in keys)
+
+
+def bump_receipt_versions(kind, object_ids):
+    _cache().set_many({version_key(kind, oid): uuid.uuid4().hex for oid in object_ids}, timeout=None)
+
+
+def receipt_etag(transaction_id, version):
+    raw = f'{PAGE_RENDER_VERSION}|{transaction_id}|{version}'.encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def cached_receipt_page(transaction_id, version):
+    """(customer_id, html) rendered earlier for this version, or None."""
+    return _cache().get(page_key(transaction_id, version))
+
+
+def cache_receipt_page(transaction_id, version, customer_id, html):
+    _cache().set(page_key(transaction_id, version), (customer_id, html), timeout=None)
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.db.models import F
+from django.db.models.signals import post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Transaction
+from .balances import recompute_customer_balance
+from .receipts import invalidate_receipts, bump_receipt_versions
+from customers.models import Customer
+from accounts.models import Shop
+
+
+def ledger_effect(tx):
+    """
+    How much a transaction moves its customer's balance.
+    - Active CREDIT adds to what the customer owes
+    - Active PAYMENT reduces it
+    - CASH sales and soft-deleted rows change nothing
+    """
+    if not tx.customer_id or not tx.is_active:
+        return Decimal('0')
+
+    amount = Decimal(str(tx.total_amount or 0))
+
+    if tx.transaction_type == Transaction.CREDIT:
+        return amount
+    if tx.transaction_type == Transaction.PAYMENT:
+        return -amount
+    return Decimal('0')
+
+
+def apply_balance_delta(customer_id, delta):
+    """
+    Atomic in-database increment, safe with concurrent writers.
+    """
+    if customer_id and delta:
+        Customer.objects.filter(id=customer_id).update(balance=F('balance') + delta)
+
+
+LEDGER_FIELDS = ('customer_id', 'transaction_type', 'total_amount', 'is_active')
+
+
+@receiver(post_save, sender=Transaction)
+def update_customer_balance(sender, instance, created, **kwargs):
+    """Applies only the difference from what the row contributed before."""
+    previous = None if created else instance.loaded_state(LEDGER_FIELDS)
+
+    if previous is None and not created:
+        # Unknown previous state (deferred fields): recompute this customer from scratch
+        recompute_customer_balance(instance.customer_id)
+        return
+
+    old_customer_id = previous.customer_id if previous else None
+    old_effect = ledger_effect(previous) if previous else Decimal('0')
+    new_effect = ledger_effect(instance)
+
+    if old_customer_id == instance.customer_id:
+        apply_balance_delta(instance.customer_id, new_effect - old_effect)
+    else:
+        apply_balance_delta(old_customer_id, -old_effect)
+        apply_balance_delta(instance.customer_id, new_effect)
+
+
+@receiver(pre_delete, sender=Transaction)
+def remember_ledger_state(sender, instance, **kwargs):
+    # Deferred fields can only be read while the row still exists
+    instance.loaded_state(LEDGER_FIELDS, fetch=True)
+
+
+@receiver(post_delete, sender=Transaction)
+def reverse_customer_balance(sender, instance, **kwargs):
+    previous = instance.loaded_state(LEDGER_FIELDS)
+    if previous is not None:
+        apply_balance_delta(previous.customer_id, -ledger_effect(previous))
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def drop_cached_receipt(sender, instance, **kwargs):
+    invalidate_receipts([instance.id])
+    bump_receipt_versions('transaction', [instance.id])
+
+
+@receiver(post_save, sender=Customer)
+def bump_customer_receipts(sender, instance, created, **kwargs):
+    # Public receipts show the customer's name and mobile: one key, not one per transaction
+    if not created:
+        bump_receipt_versions('customer', [instance.id])
+
+
+@receiver(post_save, sender=Shop)
+def bump_shop_receipts(sender, instance, created, **kwargs):
+    # ... and the shop's name, mobile and address
+    if not created:
+        bump_receipt_versions('shop', [instance.id])
+
@@ -0,0 +1,78 @@
+from django.db.models import F, Case, When, Value, IntegerField
+
+from products.models import Product
+
+
+class InsufficientStock(Exception):
+    """Raised inside the sale's atomic block so everything rolls back."""
+
+    def __init__(self, product_names):
+        self.product_names = product_names
+        super().__init__(f"Not enough stock for {', '.join(product_names)}")
+
+
+class UnknownProduct(Exception):
+    pass
+
+
+def parse_sale_lines(data):
+    """
+    Reads only the submitted `qty_<product_id>` fields.
+    Returns {product_id: qty} for positive quantities.
+    """
+    lines = {}
+    for key, value in data.items():
+        if not key.startswith('qty_'):
+            continue
+        try:
+            product_id, qty = int(key[4:]), int(value or 0)
+        except ValueError:
+            continue
+        if qty > 0:
+            lines[product_id] = lines.get(product_id, 0) + qty
+    return lines
+
+
+def reserve_stock(shop, lines):
+    """
+    Locks just the sold product rows (one SELECT ... FOR UPDATE, in id
+    order so concurrent sales can't deadlock) and decrements them with a
+    single conditional UPDATE:
+
+        UPDATE product SET stock_quantity = stock_quantity - <qty>
+        WHERE id IN (...) AND stock_quantity >= <qty>
+
+    Must run inside transaction.atomic(). Returns {product_id: Product}
+    with the pre-sale rows (for prices); raises InsufficientStock or
+    UnknownProduct without touching stock.
+    """
+    products = {
+        p.id: p
+        for p in Product.objects.select_for_update().filter(
+            shop=shop,
+            is_active=True,
+            id__in=lines
+        ).order_by('id')
+    }
+
+    if len(products) != len(lines):
+        raise UnknownProduct(sorted(set(lines) - set(products)))
+
+    short = [p.name for pid, p in products.items() if p.stock_quantity < lines[pid]]
+    if short:
+        raise InsufficientStock(short)
+
+    qty = Case(
+        *[When(id=pid, then=Value(q)) for pid, q in lines.items()],
+        output_field=IntegerField()
+    )
+    updated = Product.objects.filter(
+        id__in=lines,
+        stock_quantity__gte=qty
+    ).update(stock_quantity=F('stock_quantity') - qty)
+
+    # Guard for backends without row locks (e.g. SQLite)
+    if updated != len(lines):
+        raise InsufficientStock([p.name for p in products.values()])
+
+    return products
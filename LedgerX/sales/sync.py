@@ -0,0 +1,263 @@
+"""
+Batch ingestion for POS devices that were offline.
+
+A batch is a list of CASH / CREDIT sales and PAYMENTs. The whole batch is
+validated in memory first, then written with a fixed number of queries:
+dedupe lookup, customer lookup, one stock lock + one stock UPDATE for all
+products, bulk inserts, one balance UPDATE and the rollup UPDATEs per day.
+bulk_create skips signals, so the balance, rollup and dashboard cache
+updates are made here explicitly.
+"""
+
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+
+from .models import Transaction, TransactionItem
+from .stock import reserve_stock
+from .balances import apply_balance_deltas
+from .signals import ledger_effect
+from customers.models import Customer
+from reports.dashboard_cache import invalidate_dashboard
+from reports.rollups import (
+    rollup_effect, add_effect, apply_rollup_deltas, new_deltas,
+    product_sales_key, new_product_deltas, add_items, apply_product_deltas,
+)
+
+
+MAX_BATCH_SIZE = 1000
+
+# Column limits, so a bad entry is a 400 for that entry rather than a
+# DataError for the batch: DecimalField(max_digits=10, decimal_places=2),
+# and ids / PositiveIntegerField, which are 32-bit on every backend
+MAX_AMOUNT = Decimal('99999999.99')
+MAX_INT = 2147483647
+CENT = Decimal('0.01')
+
+
+class BatchError(Exception):
+    """Validation failed; `errors` is a list of {index, idempotency_key, message}."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid transactions")
+
+
+def _money(value, name):
+    """`value` as a positive amount in paise, or ValueError about `name`."""
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        amount = None
+    if amount is not None and amount.is_finite() and amount > MAX_AMOUNT:
+        raise ValueError(f'{name} must be at most {MAX_AMOUNT}')
+    if amount is None or not amount.is_finite() or amount.quantize(CENT) <= 0:
+        raise ValueError(f'{name} must be positive')
+    return amount.quantize(CENT)
+
+
+def _integer(value, name):
+    """`value` as an int in 1..MAX_INT, or ValueError about `name`."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    if not 0 < number <= MAX_INT:
+        raise ValueError(f'{name} must be between 1 and {MAX_INT}')
+    return number
+
+
+def _parse_entry(entry):
+    """Returns a cleaned dict or raises ValueError with a readable message."""
+    if not isinstance(entry, dict):
+        raise ValueError('Each transaction must be an object')
+
+    key = entry.get('idempotency_key')
+    if not key or not isinstance(key, str) or len(key) > 64:
+        raise ValueError('idempotency_key is required (max 64 chars)')
+
+    tx_type = entry.get('transaction_type')
+    if tx_type not in (Transaction.CASH, Transaction.CREDIT, Transaction.PAYMENT):
+        raise ValueError('transaction_type must be CASH, CREDIT or PAYMENT')
+
+    customer_id = entry.get('customer_id')
+    if tx_type in (Transaction.CREDIT, Transaction.PAYMENT) and not customer_id:
+        raise ValueError('customer_id is required for CREDIT and PAYMENT')
+    if customer_id:
+        customer_id = _integer(customer_id, 'customer_id')
+
+    tx_date = None
+    if entry.get('transaction_date'):
+        tx_date = parse_datetime(str(entry['transaction_date']))
+        if tx_date is None:
+            raise ValueError('transaction_date must be an ISO datetime')
+        if timezone.is_naive(tx_date):
+            tx_date = timezone.make_aware(tx_date)
+
+    items = []
+    amount = None
+    if tx_type == Transaction.PAYMENT:
+        amount = _money(entry.get('total_amount'), 'PAYMENT total_amount')
+    else:
+        lines = entry.get('items') or []
+        if not isinstance(lines, list):
+            raise ValueError('items must be a list')
+        for line in lines:
+            if not isinstance(line, dict) or 'product_id' not in line or 'quantity' not in line:
+                raise ValueError('Each item needs product_id and quantity')
+            product_id = _integer(line['product_id'], 'Item product_id')
+            qty = _integer(line['quantity'], 'Item quantity')
+            price = None
+            if line.get('price') is not None:
+                # Never fall back to default_price for a price the device did send
+                price = _money(line['price'], 'Item price')
+            items.append((product_id, qty, price))
+        if not items:
+            raise ValueError('Sales need at least one item')
+        if all(price is not None for _, _, price in items):
+            if sum(qty * price for _, qty, price in items) > MAX_AMOUNT:
+                raise ValueError(f'Sale total must be at most {MAX_AMOUNT}')
+
+    return {
+        'key': key,
+        'type': tx_type,
+        'customer_id': customer_id or None,
+        'date': tx_date,
+        'amount': amount,
+        'items': items,
+    }
+
+
+def ingest_batch(shop, entries):
+    """
+    Validates and writes a batch for `shop`.
+
+    Returns {'created': [{idempotency_key, id}], 'duplicates': [...]}.
+    Raises BatchError (nothing written) if any entry is invalid, and
+    stock.InsufficientStock / UnknownProduct if the batch can't be filled.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise BatchError([{'index': None, 'idempotency_key': None, 'message': 'transactions must be a non-empty list'}])
+    if len(entries) > MAX_BATCH_SIZE:
+        raise BatchError([{'index': None, 'idempotency_key': None, 'message': f'At most {MAX_BATCH_SIZE} transactions per batch'}])
+
+    # 1. Shape validation, all in memory
+    parsed, errors, seen_keys = [], [], set()
+    for index, entry in enumerate(entries):
+        try:
+            row = _parse_entry(entry)
+            if row['key'] in seen_keys:
+                raise ValueError('Duplicate idempotency_key inside the batch')
+            seen_keys.add(row['key'])
+            parsed.append(row)
+        except ValueError as e:
+            key = entry.get('idempotency_key') if isinstance(entry, dict) else None
+            errors.append({'index': index, 'idempotency_key': key, 'message': str(e)})
+
+    if errors:
+        raise BatchError(errors)
+
+    with db_transaction.atomic():
+
+        # 2. Already-synced keys (device retry) are acknowledged, not re-posted
+        existing = dict(
+            Transaction.objects.filter(
+                shop=shop,
+                idempotency_key__in=seen_keys
+            ).values_list('idempotency_key', 'id')
+        )
+        duplicates = [{'idempotency_key': k, 'id': existing[k]} for k in seen_keys if k in existing]
+        parsed = [row for row in parsed if row['key'] not in existing]
+
+        if not parsed:
+            return {'created': [], 'duplicates': duplicates}
+
+        # 3. Customers must belong to this shop (one query)
+        customer_ids = {row['customer_id'] for row in parsed if row['customer_id']}
+        known = set(
+            Customer.objects.filter(shop=shop, id__in=customer_ids).values_list('id', flat=True)
+        )
+        errors = [
+            {'index': None, 'idempotency_key': row['key'], 'message': 'Unknown customer'}
+            for row in parsed if row['customer_id'] and row['customer_id'] not in known
+        ]
+        if errors:
+            raise BatchError(errors)
+
+        # 4. Stock for the whole batch: one lock + one UPDATE across all products
+        needed = defaultdict(int)
+        for row in parsed:
+            for product_id, qty, _ in row['items']:
+                needed[product_id] += qty
+
+        products = reserve_stock(shop, dict(needed)) if needed else {}
+
+        # 5. Build rows in memory (default prices can still push a total over the column)
+        sales, lines, errors = [], [], []
+        for row in parsed:
+            row_items = [
+                TransactionItem(
+                    product=products[product_id],
+                    quantity=qty,
+                    price_at_sale=price if price is not None else products[product_id].default_price,
+                )
+                for product_id, qty, price in row['items']
+            ]
+            total = row['amount'] if row['amount'] is not None else sum(i.get_total_price() for i in row_items)
+            if total > MAX_AMOUNT:
+                errors.append({'index': None, 'idempotency_key': row['key'], 'message': f'Sale total must be at most {MAX_AMOUNT}'})
+
+            sales.append(Transaction(
+                shop=shop,
+                customer_id=row['customer_id'] if row['type'] != Transaction.CASH else None,
+                transaction_type=row['type'],
+                total_amount=total,
+                idempotency_key=row['key'],
+            ))
+            lines.append(row_items)
+        if errors:
+            raise BatchError(errors)
+
+        # 6. Bulk inserts
+        Transaction.objects.bulk_create(sales)
+
+        items = []
+        for sale, row_items in zip(sales, lines):
+            for item in row_items:
+                item.transaction = sale
+                items.append(item)
+        TransactionItem.objects.bulk_create(items)
+
+        # transaction_date is auto_now_add, so offline timestamps are applied after insert
+        dated = []
+        for sale, row in zip(sales, parsed):
+            if row['date']:
+                sale.transaction_date = row['date']
+                dated.append(sale)
+        if dated:
+            Transaction.objects.bulk_update(dated, ['transaction_date'])
+
+        # 7. bulk_create skips signals: apply balance changes in one UPDATE
+        deltas = defaultdict(Decimal)
+        for sale in sales:
+            deltas[sale.customer_id] += ledger_effect(sale)
+        apply_balance_deltas(deltas)
+
+        # ...and to the daily rollups (one UPDATE per shop-day touched)
+        rollups, product_rollups = new_deltas(), new_product_deltas()
+        for sale, row_items in zip(sales, lines):
+            add_effect(rollups, rollup_effect(sale))
+            add_items(product_rollups, product_sales_key(sale), row_items)
+        apply_rollup_deltas(rollups)
+        apply_product_deltas(product_rollups)
+
+        # ...and to the cached dashboard
+        invalidate_dashboard(shop.id)
+
+    return {
+        'created': [{'idempotency_key': s.idempotency_key, 'id': s.id} for s in sales],
+        'duplicates': duplicates,
+    }
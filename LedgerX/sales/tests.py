@@ -1,3 +1,515 @@
-from django.test import TestCase
+import io
+import json
+import threading
+import zipfile
+from decimal import Decimal
+
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, Client, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Shop
+from customers.models import Customer
+from products.models import Product
+from .models import Transaction, TransactionItem
+from .stock import InsufficientStock
+from .balances import outstanding_customers, advance_customers, top_debtors, ledger_totals, apply_balance_deltas
+from .signals import apply_balance_delta
+from LedgerX.pagination import encode_cursor
+from .receipts import load_receipt
+from qr.models import QRToken
+
+
+def make_shop(username='owner'):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pass')
+    return Shop.objects.create(user=user, shop_name='Test Shop', owner_name='Owner')
+
+
+def add_customers(shop, count, start=0):
+    """Each customer gets a credit and a smaller payment -> positive balance."""
+    for i in range(start, start + count):
+        customer = Customer.objects.create(shop=shop, name=f'C{i}', mobile=f'{9000000000 + i}')
+        Transaction.objects.create(shop=shop, customer=customer, transaction_type=Transaction.CREDIT, total_amount=100 + i)
+        Transaction.objects.create(shop=shop, customer=customer, transaction_type=Transaction.PAYMENT, total_amount=10)
+
+
+class BalanceLayerTests(TestCase):
+
+    def setUp(self):
+        self.shop = make_shop()
+
+    def test_outstanding_and_advance_split(self):
+        add_customers(self.shop, 3)
+        advance = Customer.objects.create(shop=self.shop, name='Adv', mobile='8000000000')
+        Transaction.objects.create(shop=self.shop, customer=advance, transaction_type=Transaction.PAYMENT, total_amount=50)
+
+        outstanding = list(outstanding_customers(self.shop))
+        self.assertEqual([c.name for c in outstanding], ['C2', 'C1', 'C0'])
+        self.assertEqual(outstanding[0].balance, Decimal('92'))
+        self.assertEqual([c.balance for c in advance_customers(self.shop)], [Decimal('-50')])
+        # The stored column agrees with the ledger
+        for customer in Customer.objects.all():
+            self.assertEqual(customer.balance, ledger_totals(customer.id))
+        self.assertEqual(len(top_debtors(self.shop, limit=2)), 2)
+
+    def test_soft_deleted_transactions_are_ignored(self):
+        customer = Customer.objects.create(shop=self.shop, name='A', mobile='8000000001')
+        tx = Transaction.objects.create(shop=self.shop, customer=customer, transaction_type=Transaction.CREDIT, total_amount=40)
+        tx.is_active = False
+        tx.save()
+
+        self.assertFalse(outstanding_customers(self.shop).exists())
+        customer.refresh_from_db()
+        self.assertEqual(customer.balance, 0)
+
+    def test_reports_read_the_stored_balance(self):
+        add_customers(self.shop, 2)
+        with CaptureQueriesContext(connection) as queries:
+            list(outstanding_customers(self.shop))
+        self.assertNotIn('SUM', queries[0]['sql'].upper())
+
+    def test_customer_report_query_count_is_constant(self):
+        self.client.force_login(self.shop.user)
+        url = reverse('customer_report')
+
+        add_customers(self.shop, 2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+
+        add_customers(self.shop, 25, start=2)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.context['report']), 27)
+        self.assertEqual(len(small), len(large))
+
+
+class StoredBalanceTests(TestCase):
+
+    def setUp(self):
+        self.shop = make_shop()
+        self.ravi = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.asha = Customer.objects.create(shop=self.shop, name='Asha', mobile='9000000001')
+
+    def add(self, customer, kind, amount):
+        return Transaction.objects.create(shop=self.shop, customer=customer, transaction_type=kind, total_amount=amount)
+
+    def assertBalances(self, ravi, asha):
+        for customer, expected in ((self.ravi, ravi), (self.asha, asha)):
+            customer.refresh_from_db()
+            self.assertEqual(customer.balance, Decimal(expected))
+            self.assertEqual(customer.balance, ledger_totals(customer.id))
+
+    def test_create_and_delete(self):
+        credit = self.add(self.ravi, Transaction.CREDIT, 100)
+        self.add(self.ravi, Transaction.PAYMENT, 30)
+        self.add(self.ravi, Transaction.CASH, 500)
+        self.assertBalances(70, 0)
+
+        credit.delete()
+        self.assertBalances(-30, 0)
+
+    def test_soft_delete_type_change_and_move(self):
+        tx = self.add(self.ravi, Transaction.CREDIT, 100)
+
+        tx.is_active = False
+        tx.save()
+        self.assertBalances(0, 0)
+
+        tx.is_active = True
+        tx.transaction_type = Transaction.PAYMENT
+        tx.save()
+        self.assertBalances(-100, 0)
+
+        tx.customer = self.asha
+        tx.total_amount = 40
+        tx.save()
+        self.assertBalances(0, -40)
+
+    def test_deferred_instances(self):
+        self.add(self.ravi, Transaction.CREDIT, 100)
+        tx = self.add(self.ravi, Transaction.CREDIT, 50)
+
+        # Previous amount unknown: the customer is recomputed from the ledger
+        deferred = Transaction.objects.only('id', 'customer_id').get(id=tx.id)
+        deferred.total_amount = 80
+        deferred.save()
+        self.assertBalances(180, 0)
+
+        Transaction.objects.only('id').get(id=tx.id).delete()
+        self.assertBalances(100, 0)
+
+    def test_rebuild_balances(self):
+        self.add(self.ravi, Transaction.CREDIT, 100)
+        self.add(self.asha, Transaction.PAYMENT, 20)
+        Customer.objects.update(balance=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_balances', '--verify', stdout=io.StringIO())
+
+        call_command('rebuild_balances', stdout=io.StringIO())
+        self.assertBalances(100, -20)
+        call_command('rebuild_balances', '--verify', stdout=io.StringIO())
+
+    def test_rebuild_keeps_writes_made_while_it_runs(self):
+        self.add(self.ravi, Transaction.CREDIT, 100)
+        Customer.objects.filter(id=self.ravi.id).update(balance=0)
+        path = 'sales.management.commands.rebuild_balances.apply_balance_deltas'
+        original = apply_balance_deltas
+
+        def racing_apply(deltas):
+            # A sale recorded after the command read the balances
+            Transaction.objects.bulk_create([Transaction(
+                shop=self.shop, customer=self.ravi, transaction_type=Transaction.CREDIT, total_amount=5
+            )])
+            apply_balance_delta(self.ravi.id, Decimal('5'))
+            original(deltas)
+
+        with mock.patch(path, racing_apply):
+            call_command('rebuild_balances', stdout=io.StringIO())
+        self.assertBalances(105, 0)
+
+
+class TransactionListPaginationTests(TestCase):
+
+    def setUp(self):
+        self.shop = make_shop()
+        self.client.force_login(self.shop.user)
+        add_customers(self.shop, 30)  # 60 transactions
+
+    def test_cursor_walks_every_row_once(self):
+        url = reverse('transaction_list')
+        seen, cursor = [], ''
+
+        while True:
+            data = self.client.get(url, {'format': 'json', 'limit': 25, 'cursor': cursor}).json()
+            seen.extend(row['id'] for row in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        expected = list(Transaction.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters_apply_to_cursor_query(self):
+        data = self.client.get(reverse('transaction_list'), {'format': 'json', 'type': 'PAYMENT', 'limit': 100}).json()
+        self.assertEqual(len(data['results']), 30)
+        self.assertTrue(all(row['transaction_type'] == 'PAYMENT' for row in data['results']))
+
+    def test_html_page_is_bounded(self):
+        response = self.client.get(reverse('transaction_list'))
+        self.assertEqual(len(response.context['transactions']), 25)
+        self.assertIsNotNone(response.context['next_cursor'])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        first = self.client.get(reverse('transaction_list'), {'format': 'json'}).json()
+        for values in ([5, 1], [{'a': 1}, 'x'], ['not a date', 1]):
+            data = self.client.get(reverse('transaction_list'), {'format': 'json', 'cursor': encode_cursor(values)}).json()
+            self.assertEqual(data['results'], first['results'])
+
+
+class AddSaleStockTests(TestCase):
+
+    def setUp(self):
+        self.shop = make_shop()
+        self.client.force_login(self.shop.user)
+        self.tea = Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=5)
+        self.milk = Product.objects.create(shop=self.shop, name='Milk', default_price=25, stock_quantity=1)
+
+    def test_sale_decrements_only_sold_lines(self):
+        self.client.post(reverse('add_sale'), {'transaction_type': 'CASH', f'qty_{self.tea.id}': 3})
+
+        self.tea.refresh_from_db()
+        self.milk.refresh_from_db()
+        self.assertEqual((self.tea.stock_quantity, self.milk.stock_quantity), (2, 1))
+        sale = Transaction.objects.get()
+        self.assertEqual(sale.total_amount, Decimal('30'))
+        self.assertEqual(sale.items.get().quantity, 3)
+
+    def test_shortage_rolls_back_everything(self):
+        response = self.client.post(reverse('add_sale'), {
+            'transaction_type': 'CASH',
+            f'qty_{self.tea.id}': 2,
+            f'qty_{self.milk.id}': 2,
+        })
+
+        self.assertRedirects(response, reverse('add_sale'), fetch_redirect_response=False)
+        self.tea.refresh_from_db()
+        self.assertEqual(self.tea.stock_quantity, 5)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(TransactionItem.objects.exists())
+
+
+# Needs real row locks; SQLite serialises writers and could hang the suite
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentSaleTests(TransactionTestCase):
+    """Parallel sales of the last units must never oversell."""
+
+    def test_parallel_sales_do_not_oversell(self):
+        shop = make_shop()
+        product = Product.objects.create(shop=shop, name='Tea', default_price=10, stock_quantity=5)
+        barrier = threading.Barrier(8)
+
+        def sell():
+            client = Client()
+            client.force_login(shop.user)
+            barrier.wait()
+            try:
+                client.post(reverse('add_sale'), {'transaction_type': 'CASH', f'qty_{product.id}': 1})
+            except InsufficientStock:
+                pass  # a buyer who came too late; the view normally turns this into a message
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=sell) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        product.refresh_from_db()
+        sold = TransactionItem.objects.filter(product=product).count()
+        # 8 buyers for 5 units: exactly 5 sales go through, 3 are refused
+        self.assertEqual(sold, 5)
+        self.assertEqual(product.stock_quantity, 0)
+
+
+class SyncTransactionsTests(TestCase):
+
+    def setUp(self):
+        self.shop = make_shop()
+        self.client.force_login(self.shop.user)
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.tea = Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=1000)
+
+    def sync(self, transactions):
+        return self.client.post(
+            reverse('sync_transactions'),
+            data=json.dumps({'transactions': transactions}),
+            content_type='application/json'
+        )
+
+    def batch(self, size):
+        rows = []
+        for i in range(size):
+            rows.append({
+                'idempotency_key': f'sale-{i}',
+                'transaction_type': 'CREDIT',
+                'customer_id': self.customer.id,
+                'items': [{'product_id': self.tea.id, 'quantity': 1}],
+            })
+        rows.append({
+            'idempotency_key': 'pay-1',
+            'transaction_type': 'PAYMENT',
+            'customer_id': self.customer.id,
+            'total_amount': '25.00',
+            'transaction_date': '2026-01-05T10:30:00+05:30',
+        })
+        return rows
+
+    def test_large_batch_takes_a_handful_of_queries(self):
+        self.sync(self.batch(5))
+        with CaptureQueriesContext(connection) as large:
+            response = self.sync([dict(r, idempotency_key=f"b-{r['idempotency_key']}") for r in self.batch(200)])
+
+        self.assertEqual(response.json()['status'], 'success')
+        # Session/auth + ~10 batch queries; bulk inserts may split into a few chunks
+        self.assertLess(len(large), 20)
+
+        self.tea.refresh_from_db()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.tea.stock_quantity, 1000 - 205)
+        self.assertEqual(self.customer.balance, Decimal('2050') - Decimal('50'))
+        self.assertEqual(TransactionItem.objects.count(), 205)
+
+    def test_retry_is_idempotent(self):
+        self.sync(self.batch(3))
+        data = self.sync(self.batch(3)).json()
+
+        self.assertEqual(data['created'], [])
+        self.assertEqual(len(data['duplicates']), 4)
+        self.assertEqual(Transaction.objects.count(), 4)
+
+    def test_shortage_rejects_whole_batch(self):
+        self.tea.stock_quantity = 2
+        self.tea.save()
+
+        response = self.sync(self.batch(3))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_malformed_entries_are_reported_per_entry(self):
+        rows = self.batch(4)
+        rows[0]['customer_id'] = [self.customer.id]
+        rows[1]['customer_id'] = {'id': self.customer.id}
+        rows[2]['items'][0]['price'] = '0'
+        rows[3]['items'][0]['price'] = 'free'
+
+        response = self.sync(rows)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(e['index'], e['message']) for e in response.json()['errors']],
+            [
+                (0, 'customer_id must be an integer'),
+                (1, 'customer_id must be an integer'),
+                (2, 'Item price must be positive'),
+                (3, 'Item price must be positive'),
+            ]
+        )
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_values_beyond_the_columns_are_reported_per_entry(self):
+        rows = self.batch(4)
+        rows[0]['items'][0]['product_id'] = 10 ** 20
+        rows[1]['items'][0]['quantity'] = 10 ** 12
+        rows[2]['items'][0]['price'] = '1e12'
+        rows[3]['items'][0]['price'] = '0.001'
+        rows[4]['total_amount'] = '1e12'
+
+        response = self.sync(rows)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(e['index'], e['message']) for e in response.json()['errors']],
+            [
+                (0, 'Item product_id must be between 1 and 2147483647'),
+                (1, 'Item quantity must be between 1 and 2147483647'),
+                (2, 'Item price must be at most 99999999.99'),
+                (3, 'Item price must be positive'),
+                (4, 'PAYMENT total_amount must be at most 99999999.99'),
+            ]
+        )
+
+    def test_totals_are_quantized_and_bounded(self):
+        rows = self.batch(1)
+        rows[0]['items'][0]['price'] = '12.345'
+        self.assertEqual(self.sync(rows).status_code, 200)
+        self.assertEqual(Transaction.objects.get(idempotency_key='sale-0').total_amount, Decimal('12.34'))
+
+        # Default price x quantity over the column is only known after the product lookup
+        Product.objects.filter(id=self.tea.id).update(default_price=Decimal('99999999.00'))
+        rows = self.batch(1)
+        rows[0]['idempotency_key'] = 'big'
+        rows[0]['items'][0]['quantity'] = 2
+        response = self.sync(rows[:1])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['idempotency_key'], 'big')
+        self.tea.refresh_from_db()
+        self.assertEqual(self.tea.stock_quantity, 999)
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.shop = make_shop()
+        self.client.force_login(self.shop.user)
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        tea = Product.objects.create(shop=self.shop, name='Tea', default_price=10, stock_quantity=100)
+
+        for _ in range(3):
+            sale = Transaction.objects.create(shop=self.shop, customer=self.customer, transaction_type=Transaction.CREDIT, total_amount=20)
+            TransactionItem.objects.create(transaction=sale, product=tea, quantity=2, price_at_sale=10)
+        Transaction.objects.create(shop=self.shop, customer=self.customer, transaction_type=Transaction.PAYMENT, total_amount=15)
+
+    def read_csv(self, response):
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'\xef\xbb\xbf'))
+        return [line.split(',') for line in body.decode('utf-8-sig').splitlines()]
+
+    def test_transactions_csv_has_one_row_per_item(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.read_csv(self.client.get(reverse('export_transactions')))
+
+        self.assertEqual(len(rows), 1 + 4)  # header, 3 items, 1 payment
+        self.assertEqual(rows[1][2], 'Payment')
+        self.assertEqual(rows[2][6:8], ['Tea', '2'])
+        self.assertLess(len(queries), 10)  # chunked prefetch, not a query per row
+
+    def test_ledger_running_balance(self):
+        rows = self.read_csv(self.client.get(reverse('export_customer_ledger', args=[self.customer.id])))
+        self.assertEqual([row[-1] for row in rows[1:]], ['20.00', '40.00', '60.00', '45.00'])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        response = self.client.get(reverse('export_sales_report'), {'format': 'xlsx'})
+        book = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+        self.assertIsNone(book.testzip())
+        self.assertEqual(book.read('xl/worksheets/sheet1.xml').count(b'<row>'), 1 + 3 + 1)  # header, sales, total
+
+
+class ReceiptTests(TestCase):
+
+    def setUp(self):
+        caches[settings.RECEIPT_CACHE_ALIAS].clear()
+        self.shop = make_shop()
+        self.customer = Customer.objects.create(shop=self.shop, name='Ravi', mobile='9000000000')
+        self.token = QRToken.objects.create(customer=self.customer)
+
+        self.sale = Transaction.objects.create(
+            shop=self.shop, customer=self.customer, transaction_type=Transaction.CREDIT, total_amount=0
+        )
+        for i in range(5):
+            product = Product.objects.create(shop=self.shop, name=f'P{i}', default_price=10, stock_quantity=10)
+            TransactionItem.objects.create(transaction=self.sale, product=product, quantity=i + 1, price_at_sale=Decimal('2.50'))
+
+        self.client.force_login(self.shop.user)
+
+    def test_three_queries_with_line_totals(self):
+        with self.assertNumQueries(3):
+            receipt = load_receipt(self.sale.id)
+            items = list(receipt.items.all())
+            self.assertEqual([item.product.name for item in items], ['P0', 'P1', 'P2', 'P3', 'P4'])
+            self.assertEqual([item.line_total for item in items], [Decimal('2.50') * q for q in range(1, 6)])
+            self.assertEqual(receipt.customer.shop.shop_name, 'Test Shop')
+
+        # Only the customer is read again
+        with self.assertNumQueries(1):
+            self.assertEqual(load_receipt(self.sale.id).customer.name, 'Ravi')
+
+    def test_detail_views(self):
+        # session + user, then the three receipt queries
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('transaction_detail', args=[self.sale.id]))
+        self.assertContains(response, '₹12.50')
+
+        # QR token, then the customer of the (now cached) receipt
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('qr_transaction_detail', args=[self.token.secure_token, self.sale.id]))
+        self.assertContains(response, '5 x ₹2.50')
+
+    def test_other_owners_get_404(self):
+        other = make_shop('other')
+        self.client.force_login(other.user)
+        self.assertEqual(self.client.get(reverse('transaction_detail', args=[self.sale.id])).status_code, 404)
+
+        stranger = Customer.objects.create(shop=self.shop, name='Asha', mobile='9000000001')
+        token = QRToken.objects.create(customer=stranger)
+        response = self.client.get(reverse('qr_transaction_detail', args=[token.secure_token, self.sale.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_drop_the_cached_receipt(self):
+        load_receipt(self.sale.id)
+
+        self.sale.is_active = False
+        self.sale.save()
+        self.assertFalse(load_receipt(self.sale.id).is_active)
+
+    def test_customer_edits_show_without_touching_receipts(self):
+        load_receipt(self.sale.id)
+
+        # No per-transaction invalidation on a customer save
+        with self.assertNumQueries(1):
+            self.customer.name = 'Ravi Kumar'
+            self.customer.save()
+        self.assertEqual(load_receipt(self.sale.id).customer.name, 'Ravi Kumar')
 
-# Create your tests here.
@@ -5,6 +5,9 @@ urlpatterns = [
     # Sales
     path('add/', views.add_sale, name='add_sale'),
 
+    # Offline POS batch sync (JSON)
+    path('sync/', views.sync_transactions, name='sync_transactions'),
+
     # Payments
     path('payment/add/', views.add_payment, name='add_payment'),
     path('payment/add/<int:customer_id>/', views.add_payment_for_customer, name='add_payment_for_customer'),
@@ -12,6 +15,7 @@ urlpatterns = [
     # Read-only transactions
     path('transactions/', views.transaction_list, name='transaction_list'),
     path('transactions/<int:transaction_id>/', views.transaction_detail, name='transaction_detail'),
+    path('transactions/export/', views.export_transactions, name='export_transactions'),
 
     path('ajax-add/', views.ajax_add_customer, name='ajax_add_customer'),
 ]
@@ -2,26 +2,42 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from django.db import transaction as db_transaction
+from django.db import transaction as db_transaction, IntegrityError
 from django.db.models import Sum
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+import json
 
 from .models import Transaction, TransactionItem
+from .stock import parse_sale_lines, reserve_stock, InsufficientStock, UnknownProduct
+from .sync import ingest_batch, BatchError
 from products.models import Product
 from customers.models import Customer
-
+from qr.lifecycle import issue_token
+from reports.rollups import record_sale_items
+from LedgerX.pagination import keyset_page, page_size_from
+from LedgerX.dates import local_today, parse_day, window_filter
+from LedgerX.exports import streaming_export
+from LedgerX.instrumentation import query_budget
+from .exports import TRANSACTION_HEADER, transaction_rows
+from .receipts import load_receipt
 
 
 # Create your views here.
+@query_budget(20)
 @login_required
 def add_sale(request):
     shop = request.user.shop
-    products = Product.objects.filter(shop=shop, is_active=True)
-    customers = Customer.objects.filter(shop=shop, is_active=True)
 
     if request.method == 'POST':
         transaction_type = request.POST.get('transaction_type')
         customer = None
 
+        if transaction_type not in (Transaction.CASH, Transaction.CREDIT):
+            messages.error(request, 'Invalid sale type')
+            return redirect('add_sale')
+
         if transaction_type == Transaction.CREDIT:
             customer_id = request.POST.get('customer_id')
             customer = get_object_or_404(Customer, id=customer_id, shop=shop)
@@ -29,71 +45,70 @@ def add_sale(request):
         amount_paid = request.POST.get('amount_paid')
         amount_paid = float(amount_paid) if amount_paid else 0
 
-        total_amount = 0
-        items_to_create = []
-
-        with db_transaction.atomic():
+        # Only the submitted lines, not every product in the shop
+        lines = parse_sale_lines(request.POST)
+        if not lines:
+            messages.error(request, 'No products selected')
+            return redirect('add_sale')
 
-            # 1️⃣ Create SALE (CASH or CREDIT)
-            sale = Transaction.objects.create(
-                shop=shop,
-                customer=customer,
-                transaction_type=transaction_type,
-                total_amount=0,
-                transaction_date=timezone.now()
-            )
-
-            for product in products:
-                qty = int(request.POST.get(f'qty_{product.id}', 0))
-
-                if qty > 0:
-                    if product.stock_quantity < qty:
-                        messages.error(request, f'Not enough stock for {product.name}')
-                        raise Exception("Insufficient stock")
-
-                    product.stock_quantity -= qty
-                    product.save()
+        try:
+            with db_transaction.atomic():
 
-                    line_total = qty * product.default_price
-                    total_amount += line_total
+                # 1️⃣ Lock + decrement just the sold products (rolls back on shortage)
+                products = reserve_stock(shop, lines)
 
-                    items_to_create.append(
-                        TransactionItem(
-                            transaction=sale,
-                            product=product,
-                            quantity=qty,
-                            price_at_sale=product.default_price
-                        )
+                items_to_create = [
+                    TransactionItem(
+                        product=products[product_id],
+                        quantity=qty,
+                        price_at_sale=products[product_id].default_price
                     )
+                    for product_id, qty in lines.items()
+                ]
+                total_amount = sum(item.get_total_price() for item in items_to_create)
 
-            if not items_to_create:
-                messages.error(request, 'No products selected')
-                return redirect('add_sale')
-
-            TransactionItem.objects.bulk_create(items_to_create)
-
-            sale.total_amount = total_amount
-            sale.save()
-
-            # 2️⃣ CREATE PAYMENT IF AMOUNT PAID > 0
-            if amount_paid > 0:
-                Transaction.objects.create(
+                # 2️⃣ Create SALE (CASH or CREDIT) with its final total
+                sale = Transaction.objects.create(
                     shop=shop,
                     customer=customer,
-                    transaction_type=Transaction.PAYMENT,
-                    total_amount=amount_paid,
+                    transaction_type=transaction_type,
+                    total_amount=total_amount,
                     transaction_date=timezone.now()
                 )
 
+                for item in items_to_create:
+                    item.transaction = sale
+                TransactionItem.objects.bulk_create(items_to_create)
+                record_sale_items(sale, items_to_create)
+
+                # 3️⃣ CREATE PAYMENT IF AMOUNT PAID > 0
+                if amount_paid > 0:
+                    Transaction.objects.create(
+                        shop=shop,
+                        customer=customer,
+                        transaction_type=Transaction.PAYMENT,
+                        total_amount=amount_paid,
+                        transaction_date=timezone.now()
+                    )
+
+        except InsufficientStock as e:
+            messages.error(request, f"Not enough stock for {', '.join(e.product_names)}")
+            return redirect('add_sale')
+        except UnknownProduct:
+            messages.error(request, 'Some selected products are no longer available')
+            return redirect('add_sale')
+
         messages.success(request, 'Sale recorded successfully')
         return redirect('transaction_list')
 
+    products = Product.objects.filter(shop=shop, is_active=True)
+
     return render(
         request,
         'sales/add_sale.html',
         {
+            # Customers are looked up on demand via customer_search
             'products': products,
-            'customers': customers
         }
     )
 
@@ -149,18 +164,8 @@ def add_payment_for_customer(request, customer_id):
         is_active=True
     )
 
-    # Calculate outstanding
-    credit_total = Transaction.objects.filter(
-        customer=customer,
-        transaction_type=Transaction.CREDIT
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-    payment_total = Transaction.objects.filter(
-        customer=customer,
-        transaction_type=Transaction.PAYMENT
-    ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-    outstanding = credit_total - payment_total
+    # Outstanding (maintained on every CREDIT / PAYMENT write)
+    outstanding = customer.balance
 
     if request.method == 'POST':
         amount = request.POST.get('amount')
@@ -191,32 +196,128 @@ def add_payment_for_customer(request, customer_id):
 
 
 @login_required
-def transaction_list(request):
+@require_POST
+def sync_transactions(request):
     """
-    Shows a LIST of transactions.
-    Pagination is now handled on the Client Side (JS).
+    JSON batch endpoint for POS devices pushing offline sales / payments.
+    Body: {"transactions": [{idempotency_key, transaction_type, customer_id,
+           total_amount (PAYMENT), transaction_date, items: [{product_id, quantity, price}]}]}
+    All-or-nothing: a bad entry or a stock shortage writes nothing.
     """
-    shop = request.user.shop
-    # 1. Get ALL records
-    transactions_list = Transaction.objects.filter(shop=shop).order_by('-created_at')
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+
+    if not isinstance(payload, dict):
+        return JsonResponse({'status': 'error', 'message': 'Expected a JSON object'}, status=400)
+
+    try:
+        result = ingest_batch(request.user.shop, payload.get('transactions'))
+    except BatchError as e:
+        return JsonResponse({'status': 'error', 'message': 'Invalid transactions', 'errors': e.errors}, status=400)
+    except InsufficientStock as e:
+        return JsonResponse({'status': 'error', 'message': str(e), 'products': e.product_names}, status=409)
+    except UnknownProduct:
+        return JsonResponse({'status': 'error', 'message': 'Unknown or inactive product in batch'}, status=400)
+    except IntegrityError:
+        # Same keys being synced concurrently by another request; safe to retry
+        return JsonResponse({'status': 'error', 'message': 'Batch already in progress, retry'}, status=409)
 
-    # 2. Apply Filters (Date & Type)
-    date_filter = request.GET.get('date')
-    if date_filter == 'today':
-        today = timezone.localtime(timezone.now()).date()
-        transactions_list = transactions_list.filter(transaction_date__date=today)
+    return JsonResponse({'status': 'success', **result})
+
+
+def filtered_transactions(request):
+    """
+    The shop's transactions narrowed by the list filters:
+    ?date=today or ?start_date=&end_date=, and ?type=CASH,CREDIT
+    """
+    transactions = Transaction.objects.filter(shop=request.user.shop)
+
+    if request.GET.get('date') == 'today':
+        transactions = transactions.filter(**window_filter('transaction_date', local_today()))
+    else:
+        start_date = parse_day(request.GET.get('start_date'))
+        end_date = parse_day(request.GET.get('end_date'))
+        if start_date and end_date:
+            transactions = transactions.filter(**window_filter('transaction_date', start_date, end_date))
 
     type_filter = request.GET.get('type')
     if type_filter:
         types = type_filter.split(',')
-        transactions_list = transactions_list.filter(transaction_type__in=types)
+        transactions = transactions.filter(transaction_type__in=types)
+
+    return transactions
+
+
+@query_budget(6)
+@login_required
+def transaction_list(request):
+    """
+    Shows a LIST of transactions, newest first.
+    Keyset-paginated on (created_at, id): every page is one indexed query.
+    Send ?format=json (or an XHR) to get the page as JSON for infinite scroll.
+    """
+    # 1. Apply Filters (Date & Type) inside the same cursor query
+    transactions_list = filtered_transactions(request).select_related('customer')
+
+    # 2. One page after the cursor
+    transactions, next_cursor = keyset_page(
+        transactions_list,
+        ('-created_at', '-id'),
+        cursor=request.GET.get('cursor'),
+        page_size=page_size_from(request)
+    )
+
+    if request.GET.get('format') == 'json' or request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({
+            'results': [
+                {
+                    'id': tx.id,
+                    'url': reverse('transaction_detail', args=[tx.id]),
+                    'transaction_type': tx.transaction_type,
+                    'total_amount': str(tx.total_amount),
+                    'transaction_date': timezone.localtime(tx.transaction_date).isoformat(),
+                    'customer': {
+                        'id': tx.customer.id,
+                        'name': tx.customer.name,
+                        'mobile': tx.customer.mobile,
+                    } if tx.customer else None,
+                }
+                for tx in transactions
+            ],
+            'next_cursor': next_cursor,
+        })
+
+    # Keep the active filters on the "Load more" link
+    next_params = request.GET.copy()
+    next_params['cursor'] = next_cursor or ''
 
-    # 3. No Paginator - Return Full List
     return render(request, 'sales/transaction_list.html', {
-        'transactions': transactions_list
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+        'next_query': next_params.urlencode(),
     })
 
 
+@login_required
+def export_transactions(request):
+    """
+    Full transaction history (with items) as a streamed CSV / XLSX.
+    Accepts the same filters as transaction_list.
+    """
+    transactions = filtered_transactions(request).order_by('-created_at', '-id')
+
+    return streaming_export(
+        request,
+        'transactions_export',
+        TRANSACTION_HEADER,
+        transaction_rows(transactions),
+        sheet_name='Transactions'
+    )
+
+
+@query_budget(5)
 @login_required
 def transaction_detail(request, transaction_id):
     """
@@ -225,13 +326,10 @@ def transaction_detail(request, transaction_id):
     - Payments show amount only
     """
 
-    shop = request.user.shop
-
-    transaction_obj = get_object_or_404(
-        Transaction,
-        id=transaction_id,
-        shop=shop
-    )
+    # Transaction, shop, items and products in two (cached) queries, then the customer
+    transaction_obj = load_receipt(transaction_id)
+    if transaction_obj is None or transaction_obj.shop.user_id != request.user.id:
+        raise Http404("No Transaction matches the given query.")
 
     return render(
         request,
@@ -263,6 +361,7 @@ def ajax_add_customer(request):
             name=name,
             mobile=mobile
         )
+        issue_token(customer)
 
         return JsonResponse({
             'status': 'success',
@@ -273,4 +372,5 @@ def ajax_add_customer(request):
             }
         })
     except Exception as e:
-        return JsonResponse({'status': 'error', 'message': str(e)})
\ No newline at end of file
+        return JsonResponse({'status': 'error', 'message': str(e)})
+